@@ -1,8 +1,14 @@
 import os
-import base64
 from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.hazmat.primitives import serialization
 
+# pybase64 dispatches to SIMD codecs; the b64encode/b64decode API matches
+# the stdlib, which remains the fallback
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 class DocumentSigner:
     def __init__(self):
         self._private_key = self._load_private_key()
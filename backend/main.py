@@ -33,51 +33,91 @@ from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Depends,
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator, Tuple
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import shutil
 import uuid
 import httpx
+from cryptography.exceptions import UnsupportedAlgorithm
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from PIL import Image
 from datetime import datetime, timezone
 import re
 
 # Local imports
 try:
-    from utils import secure_hash, hash_stream, hash_string
+    from utils import secure_hash, hash_stream, hash_string, CHUNK_SIZE
     from crypto import DocumentSigner
     from qr_service import (
         generate_qr, stamp_document, generate_w3c_qr_payload,
         QRConfig, QRPosition
     )
-    from services.kms import KMSService, InstitutionSigner, InstitutionKeys, LegacyDocumentSigner
+    from services.kms import (
+        KMSService, InstitutionSigner, InstitutionKeys, LegacyDocumentSigner,
+        KeyNotFoundError, batch_verify_signatures, clear_verification_cache
+    )
     from services.templates import (
         TemplateEngine, MerkleTree, extract_page_hashes_from_pdf,
         DocumentType, W3CVerifiableCredential
     )
     from services.audit import AuditService, AuditEventType
+    from services.forensics import MicroBatcher, LazyModelLoader, preprocess_image
 except ImportError:
-    from backend.utils import secure_hash, hash_stream, hash_string
+    from backend.utils import secure_hash, hash_stream, hash_string, CHUNK_SIZE
     from backend.crypto import DocumentSigner
     from backend.qr_service import (
         generate_qr, stamp_document, generate_w3c_qr_payload,
         QRConfig, QRPosition
     )
-    from backend.services.kms import KMSService, InstitutionSigner, InstitutionKeys, LegacyDocumentSigner
+    from backend.services.kms import (
+        KMSService, InstitutionSigner, InstitutionKeys, LegacyDocumentSigner,
+        KeyNotFoundError, batch_verify_signatures, clear_verification_cache
+    )
     from backend.services.templates import (
         TemplateEngine, MerkleTree, extract_page_hashes_from_pdf,
         DocumentType, W3CVerifiableCredential
     )
     from backend.services.audit import AuditService, AuditEventType
+    from backend.services.forensics import MicroBatcher, LazyModelLoader, preprocess_image
 
 
 # ============================================================
 # Application Setup
 # ============================================================
 
+# Pooled HTTP client settings for Supabase REST calls
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+HTTP_TIMEOUT = httpx.Timeout(10.0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens pooled HTTP clients once per worker and closes them on shutdown,
+    along with the AI inference pool.
+    """
+    app.state.http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    app.state.audit_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    try:
+        yield
+    finally:
+        await app.state.http_client.aclose()
+        app.state.audit_client.close()
+        del app.state.http_client
+        del app.state.audit_client
+        _shutdown_ai_pool()
+
+
 app = FastAPI(
     title="CertiTrust Multi-Tenant Document Verification",
     description="DPI-3 Multi-Tenant Document Verification & Trust Layer",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend integration
@@ -153,6 +193,27 @@ class VerificationResponse(BaseModel):
     message: str
 
 
+class BatchVerificationItem(BaseModel):
+    """Single hash/signature pair within a batch verification request."""
+    document_hash: str
+    signature: str
+
+
+class BatchVerificationRequest(BaseModel):
+    """Request model for verifying many signatures made with one key."""
+    items: List[BatchVerificationItem] = Field(..., min_length=1, max_length=1000)
+    institution_id: Optional[str] = None
+    public_key_pem: Optional[str] = None  # For ad-hoc verification without institution
+
+
+class BatchVerificationResponse(BaseModel):
+    """Response model for batch verification results."""
+    results: List[bool]
+    all_valid: bool
+    valid_count: int
+    total: int
+
+
 class AuditLogResponse(BaseModel):
     """Response model for audit log entries."""
     entries: List[Dict[str, Any]]
@@ -185,6 +246,22 @@ def cleanup_files(*files):
                 pass
 
 
+def _write_upload(src, path: Path) -> None:
+    """Copies an upload's spooled file to disk in CHUNK_SIZE pieces."""
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(src, buffer, CHUNK_SIZE)
+
+
+async def save_upload(file: UploadFile, path: Path) -> None:
+    """
+    Saves an uploaded file to disk without blocking the event loop.
+    
+    The whole copy runs in Starlette's thread pool in a single hop, so
+    other requests keep being served while a large upload is written.
+    """
+    await run_in_threadpool(_write_upload, file.file, path)
+
+
 def get_client_info(request: Request) -> tuple:
     """Extract client IP and user agent from request."""
     ip_address = request.client.host if request.client else None
@@ -192,6 +269,42 @@ def get_client_info(request: Request) -> tuple:
     return ip_address, user_agent
 
 
+async def get_http_client(request: Request) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    FastAPI dependency providing the async HTTP client for Supabase calls.
+    
+    Yields the pooled client opened by the app lifespan so connections
+    are kept alive across requests. If the lifespan has not run (e.g. the
+    app is mounted without startup events), a short-lived client is used.
+    Tests swap in a MockTransport-backed client through
+    app.dependency_overrides.
+    """
+    client = getattr(request.app.state, "http_client", None)
+    if client is not None:
+        yield client
+        return
+    
+    async with httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT) as client:
+        yield client
+
+
+def get_audit_client(request: Request) -> Iterator[httpx.Client]:
+    """
+    FastAPI dependency providing the sync HTTP client used by AuditService.
+    
+    Yields the pooled client opened by the app lifespan, falling back to
+    a short-lived client when the lifespan has not run. Tests override it
+    with a MockTransport-backed client.
+    """
+    client = getattr(request.app.state, "audit_client", None)
+    if client is not None:
+        yield client
+        return
+    
+    with httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT) as client:
+        yield client
+
+
 def get_supabase_headers() -> Dict[str, str]:
     """Returns Supabase API headers."""
     return {
@@ -206,7 +319,12 @@ def get_supabase_headers() -> Dict[str, str]:
 # ============================================================
 
 @app.post("/admin/onboard", response_model=InstitutionResponse)
-async def onboard_institution(data: InstitutionOnboard, request: Request):
+async def onboard_institution(
+    data: InstitutionOnboard,
+    request: Request,
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
+):
     """
     Onboards a new institution with Ed25519 keypair generation.
     
@@ -247,17 +365,16 @@ async def onboard_institution(data: InstitutionOnboard, request: Request):
         headers = get_supabase_headers()
         headers["Prefer"] = "return=representation"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=institution_data)
+        response = await http_client.post(url, headers=headers, json=institution_data)
             
-            if response.status_code == 409:
-                raise HTTPException(status_code=409, detail="Institution slug already exists")
+        if response.status_code == 409:
+            raise HTTPException(status_code=409, detail="Institution slug already exists")
             
-            if response.status_code >= 400:
-                raise HTTPException(status_code=response.status_code, detail=response.text)
+        if response.status_code >= 400:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
         
         # Log audit event
-        audit = AuditService()
+        audit = AuditService(client=audit_client)
         ip_address, user_agent = get_client_info(request)
         audit.log_event(
             event_type=AuditEventType.INSTITUTION_ONBOARDED,
@@ -284,7 +401,8 @@ async def onboard_institution(data: InstitutionOnboard, request: Request):
 
 @app.get("/admin/institutions")
 async def list_institutions(
-    active_only: bool = Query(True, description="Only return active institutions")
+    active_only: bool = Query(True, description="Only return active institutions"),
+    http_client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """Lists all registered institutions."""
     if not SUPABASE_URL or not SUPABASE_KEY:
@@ -297,17 +415,19 @@ async def list_institutions(
         if active_only:
             params["is_active"] = "eq.true"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=get_supabase_headers(), params=params)
-            response.raise_for_status()
-            return response.json()
+        response = await http_client.get(url, headers=get_supabase_headers(), params=params)
+        response.raise_for_status()
+        return response.json()
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list institutions: {e}")
 
 
 @app.get("/admin/institutions/{institution_id}")
-async def get_institution(institution_id: str):
+async def get_institution(
+    institution_id: str,
+    http_client: httpx.AsyncClient = Depends(get_http_client)
+):
     """Gets details of a specific institution."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
@@ -319,15 +439,14 @@ async def get_institution(institution_id: str):
             "select": "id,name,slug,public_key_pem,contact_email,domain,is_active,created_at,key_rotated_at"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=get_supabase_headers(), params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await http_client.get(url, headers=get_supabase_headers(), params=params)
+        response.raise_for_status()
+        data = response.json()
             
-            if not data:
-                raise HTTPException(status_code=404, detail="Institution not found")
+        if not data:
+            raise HTTPException(status_code=404, detail="Institution not found")
             
-            return data[0]
+        return data[0]
             
     except HTTPException:
         raise
@@ -336,7 +455,12 @@ async def get_institution(institution_id: str):
 
 
 @app.post("/admin/institutions/{institution_id}/rotate-key")
-async def rotate_institution_key(institution_id: str, request: Request):
+async def rotate_institution_key(
+    institution_id: str,
+    request: Request,
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
+):
     """Rotates the Ed25519 keypair for an institution."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
@@ -362,16 +486,18 @@ async def rotate_institution_key(institution_id: str, request: Request):
         headers = get_supabase_headers()
         headers["Prefer"] = "return=representation"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.patch(url, headers=headers, params=params, json=update_data)
+        response = await http_client.patch(url, headers=headers, params=params, json=update_data)
             
-            if response.status_code == 404 or not response.json():
-                raise HTTPException(status_code=404, detail="Institution not found")
+        if response.status_code == 404 or not response.json():
+            raise HTTPException(status_code=404, detail="Institution not found")
             
-            response.raise_for_status()
+        response.raise_for_status()
+        
+        # Drop remembered verifications made under the retired key
+        clear_verification_cache()
         
         # Log audit event
-        audit = AuditService()
+        audit = AuditService(client=audit_client)
         ip_address, user_agent = get_client_info(request)
         audit.log_event(
             event_type=AuditEventType.KEY_ROTATED,
@@ -483,7 +609,9 @@ async def revoke_institution_api_key(institution_id: str, key_id: str):
 async def issue_document(
     file: UploadFile = File(...),
     institution_id: Optional[str] = None,
-    document_type: str = "generic"
+    document_type: str = "generic",
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
 ):
     """
     Issues a document by processing it through the CertiTrust pipeline.
@@ -506,8 +634,7 @@ async def issue_document(
 
     try:
         # Save the uploaded file
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, input_path)
 
         # 1. Calculate Document Hash (chunked for memory efficiency)
         doc_hash = secure_hash(input_path)
@@ -572,13 +699,12 @@ async def issue_document(
                 headers = get_supabase_headers()
                 headers["Prefer"] = "return=minimal"
                 
-                async with httpx.AsyncClient() as client:
-                    await client.post(url, headers=headers, json=doc_record)
+                await http_client.post(url, headers=headers, json=doc_record)
             except Exception as e:
                 print(f"Warning: Failed to store document record: {e}")
 
         # 8. Log to audit trail
-        audit = AuditService()
+        audit = AuditService(client=audit_client)
         audit.log_document_issued(
             institution_id=institution_id or "legacy",
             document_id=file_id,
@@ -606,7 +732,9 @@ async def issue_document(
 async def issue_document_authenticated(
     file: UploadFile = File(...),
     document_type: str = "generic",
-    institution: AuthenticatedInstitution = Depends(get_authenticated_institution)
+    institution: AuthenticatedInstitution = Depends(get_authenticated_institution),
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
 ):
     """
     Issues a document with API key authentication (v2 endpoint).
@@ -640,8 +768,7 @@ async def issue_document_authenticated(
 
     try:
         # Save the uploaded file
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, input_path)
 
         # 1. Calculate Document Hash (chunked for memory efficiency)
         doc_hash = secure_hash(input_path)
@@ -700,13 +827,12 @@ async def issue_document_authenticated(
                 headers = get_supabase_headers()
                 headers["Prefer"] = "return=minimal"
                 
-                async with httpx.AsyncClient() as client:
-                    await client.post(url, headers=headers, json=doc_record)
+                await http_client.post(url, headers=headers, json=doc_record)
             except Exception as e:
                 print(f"Warning: Failed to store document record: {e}")
 
         # 8. Log to audit trail
-        audit = AuditService()
+        audit = AuditService(client=audit_client)
         audit.log_document_issued(
             institution_id=institution.id,
             document_id=file_id,
@@ -744,7 +870,9 @@ async def issue_academic_credential(
     degree: str = None,
     major: str = None,
     graduation_date: str = None,
-    gpa: Optional[float] = None
+    gpa: Optional[float] = None,
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
 ):
     """
     Issues an academic credential following W3C Verifiable Credentials standard.
@@ -761,8 +889,7 @@ async def issue_academic_credential(
     
     try:
         # Save file
-        with open(input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, input_path)
         
         # Hash document
         doc_hash = secure_hash(input_path)
@@ -775,10 +902,9 @@ async def issue_academic_credential(
             url = f"{SUPABASE_URL}/rest/v1/institutions"
             params = {"id": f"eq.{institution_id}", "select": "name"}
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, headers=get_supabase_headers(), params=params)
-                inst_data = response.json()
-                institution_name = inst_data[0]["name"] if inst_data else "Unknown Institution"
+            response = await http_client.get(url, headers=get_supabase_headers(), params=params)
+            inst_data = response.json()
+            institution_name = inst_data[0]["name"] if inst_data else "Unknown Institution"
                 
         except Exception:
             signer = LegacyDocumentSigner()
@@ -816,7 +942,7 @@ async def issue_academic_credential(
         stamp_document(str(input_path), str(output_path), qr_img)
         
         # Audit log
-        audit = AuditService()
+        audit = AuditService(client=audit_client)
         audit.log_document_issued(
             institution_id=institution_id,
             document_id=file_id,
@@ -845,7 +971,11 @@ async def issue_academic_credential(
 # ============================================================
 
 @app.post("/verify/document", response_model=VerificationResponse)
-async def verify_document(data: VerificationRequest, request: Request):
+async def verify_document(
+    data: VerificationRequest,
+    request: Request,
+    audit_client: httpx.Client = Depends(get_audit_client)
+):
     """
     Verifies a document's hash and signature.
     
@@ -856,7 +986,7 @@ async def verify_document(data: VerificationRequest, request: Request):
     4. Log verification attempt
     """
     ip_address, user_agent = get_client_info(request)
-    audit = AuditService()
+    audit = AuditService(client=audit_client)
     
     try:
         # If institution_id provided, verify directly
@@ -886,7 +1016,6 @@ async def verify_document(data: VerificationRequest, request: Request):
         # Try ad-hoc verification with provided public key
         if data.public_key_pem:
             try:
-                from cryptography.hazmat.primitives import serialization
                 from cryptography.hazmat.primitives.asymmetric import ed25519
                 import base64
                 
@@ -959,11 +1088,64 @@ async def verify_document(data: VerificationRequest, request: Request):
         raise HTTPException(status_code=500, detail=f"Verification error: {e}")
 
 
+def _verify_batch(data: BatchVerificationRequest) -> List[bool]:
+    """
+    Resolves the batch's verification key and checks every item.
+    
+    Only an unknown institution or an unusable PEM is the caller's fault;
+    anything else (Supabase/KMS failures, bugs) propagates as a 5xx.
+    """
+    pairs = [(item.document_hash, item.signature) for item in data.items]
+    
+    if data.institution_id:
+        try:
+            return InstitutionSigner(data.institution_id).batch_verify(pairs)
+        except KeyNotFoundError:
+            raise HTTPException(status_code=404, detail="Institution not found")
+    if data.public_key_pem:
+        try:
+            public_key = serialization.load_pem_public_key(
+                data.public_key_pem.encode('utf-8')
+            )
+        except (ValueError, TypeError, UnsupportedAlgorithm) as e:
+            raise HTTPException(status_code=400, detail=f"Could not load verification key: {e}")
+        if not isinstance(public_key, ed25519.Ed25519PublicKey):
+            raise HTTPException(status_code=400, detail="Verification key must be Ed25519")
+        return batch_verify_signatures(public_key, pairs)
+    return LegacyDocumentSigner().batch_verify(pairs)
+
+
+@app.post("/verify/document/batch", response_model=BatchVerificationResponse)
+async def verify_document_batch(data: BatchVerificationRequest):
+    """
+    Verifies many document signatures against a single public key.
+    
+    The key is resolved once (institution, ad-hoc PEM, or legacy issuer)
+    and reused for every item instead of once per request. Results are
+    returned in input order. Batch checks are not written to the audit
+    trail; use /verify/document for audited single verifications.
+    
+    Key loading and up to 1000 Ed25519 verifies are CPU-bound, so they run
+    on the threadpool rather than the event loop.
+    """
+    results = await run_in_threadpool(_verify_batch, data)
+    
+    valid_count = sum(results)
+    return BatchVerificationResponse(
+        results=results,
+        all_valid=valid_count == len(results),
+        valid_count=valid_count,
+        total=len(results)
+    )
+
+
 @app.post("/verify/file")
 async def verify_file(
     file: UploadFile = File(...),
     expected_hash: Optional[str] = None,
-    request: Request = None
+    request: Request = None,
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
 ):
     """
     Verifies an uploaded stamped PDF file.
@@ -985,8 +1167,7 @@ async def verify_file(
     
     try:
         # Save file
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await save_upload(file, temp_path)
         
         # Import scanner service
         try:
@@ -1010,7 +1191,6 @@ async def verify_file(
         
         if not qr_data:
             # Still calculate hash for backwards compatibility
-            from utils import secure_hash
             file_hash = secure_hash(str(temp_path))
             
             return JSONResponse(
@@ -1078,16 +1258,15 @@ async def verify_file(
                     "select": "id,name,slug,public_key_pem,is_active"
                 }
                 
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(url, headers=get_supabase_headers(), params=params)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data:
-                            institution_data = data[0]
-                            institution_name = institution_data.get("name")
-                            public_key_pem = institution_data.get("public_key_pem")
-                            result["institution_name"] = institution_name
-                            result["institution_active"] = institution_data.get("is_active", False)
+                response = await http_client.get(url, headers=get_supabase_headers(), params=params)
+                if response.status_code == 200:
+                    data = response.json()
+                    if data:
+                        institution_data = data[0]
+                        institution_name = institution_data.get("name")
+                        public_key_pem = institution_data.get("public_key_pem")
+                        result["institution_name"] = institution_name
+                        result["institution_active"] = institution_data.get("is_active", False)
                             
             except Exception as e:
                 result["institution_lookup_error"] = str(e)
@@ -1149,14 +1328,18 @@ async def verify_file(
                 run_metadata=True
             )
             
+            # Serialize once: the report (with its heatmaps) feeds both the
+            # Trust Score and the response
+            forensic_dict = forensic_report.to_dict() if forensic_report else None
+            
             # Calculate Trust Score using weighted formula
             trust_score_result = quick_trust_score(
                 crypto_valid=signature_verified,
-                forensic_report=forensic_report.to_dict() if forensic_report else None
+                forensic_report=forensic_dict
             )
             
             # Add forensic results to response
-            result["forensic_analysis"] = forensic_report.to_dict() if forensic_report else None
+            result["forensic_analysis"] = forensic_dict
             result["trust_score"] = trust_score_result
             
             # Update overall validity based on trust score
@@ -1171,7 +1354,7 @@ async def verify_file(
         
         # Step 7: Log verification attempt with forensic data
         try:
-            audit = AuditService()
+            audit = AuditService(client=audit_client)
             
             # Include forensic data in audit metadata
             audit_metadata = {}
@@ -1212,7 +1395,10 @@ async def verify_file(
 
 
 @app.get("/verify/document/{document_id}")
-async def get_document_verification(document_id: str):
+async def get_document_verification(
+    document_id: str,
+    http_client: httpx.AsyncClient = Depends(get_http_client)
+):
     """Gets verification details for a specific document ID."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
@@ -1224,28 +1410,27 @@ async def get_document_verification(document_id: str):
             "select": "id,institution_id,document_hash,document_type,status,issued_at,merkle_root"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=get_supabase_headers(), params=params)
-            response.raise_for_status()
-            data = response.json()
+        response = await http_client.get(url, headers=get_supabase_headers(), params=params)
+        response.raise_for_status()
+        data = response.json()
             
-            if not data:
-                raise HTTPException(status_code=404, detail="Document not found")
+        if not data:
+            raise HTTPException(status_code=404, detail="Document not found")
             
-            doc = data[0]
+        doc = data[0]
             
-            # Get institution info
-            inst_url = f"{SUPABASE_URL}/rest/v1/institutions"
-            inst_params = {"id": f"eq.{doc['institution_id']}", "select": "name,public_key_pem"}
+        # Get institution info
+        inst_url = f"{SUPABASE_URL}/rest/v1/institutions"
+        inst_params = {"id": f"eq.{doc['institution_id']}", "select": "name,public_key_pem"}
             
-            inst_response = await client.get(inst_url, headers=get_supabase_headers(), params=inst_params)
-            inst_data = inst_response.json()
+        inst_response = await http_client.get(inst_url, headers=get_supabase_headers(), params=inst_params)
+        inst_data = inst_response.json()
             
-            if inst_data:
-                doc["institution_name"] = inst_data[0]["name"]
-                doc["public_key_pem"] = inst_data[0]["public_key_pem"]
+        if inst_data:
+            doc["institution_name"] = inst_data[0]["name"]
+            doc["public_key_pem"] = inst_data[0]["public_key_pem"]
             
-            return doc
+        return doc
             
     except HTTPException:
         raise
@@ -1262,10 +1447,11 @@ async def get_audit_logs(
     institution_id: Optional[str] = None,
     event_type: Optional[str] = None,
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    audit_client: httpx.Client = Depends(get_audit_client)
 ):
     """Retrieves audit logs with optional filtering."""
-    audit = AuditService()
+    audit = AuditService(client=audit_client)
     
     event_type_enum = None
     if event_type:
@@ -1292,12 +1478,25 @@ async def get_audit_logs(
 
 
 @app.get("/audit/verify-chain")
-async def verify_audit_chain(institution_id: Optional[str] = None):
-    """Verifies the integrity of the audit hash chain."""
-    audit = AuditService()
+async def verify_audit_chain(
+    institution_id: Optional[str] = None,
+    verify_hashes: bool = False,
+    incremental: bool = False,
+    audit_client: httpx.Client = Depends(get_audit_client)
+):
+    """
+    Verifies the integrity of the audit hash chain.
+    
+    Pass verify_hashes=true to also recompute every entry's log hash, and
+    incremental=true to check only entries added since the last verified
+    checkpoint (requires AUDIT_VERIFY_STATE_PATH).
+    """
+    audit = AuditService(client=audit_client)
     
     try:
-        is_valid, broken_position = audit.verify_chain_integrity(institution_id)
+        is_valid, broken_position = audit.verify_chain_integrity(
+            institution_id, verify_hashes=verify_hashes, incremental=incremental
+        )
         
         return {
             "chain_valid": is_valid,
@@ -1314,7 +1513,12 @@ async def verify_audit_chain(institution_id: Optional[str] = None):
 # ============================================================
 
 @app.post("/templates")
-async def create_template(data: TemplateCreate, request: Request):
+async def create_template(
+    data: TemplateCreate,
+    request: Request,
+    http_client: httpx.AsyncClient = Depends(get_http_client),
+    audit_client: httpx.Client = Depends(get_audit_client)
+):
     """Creates a new document template for an institution."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
@@ -1346,12 +1550,11 @@ async def create_template(data: TemplateCreate, request: Request):
         headers = get_supabase_headers()
         headers["Prefer"] = "return=representation"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=template_data)
-            response.raise_for_status()
+        response = await http_client.post(url, headers=headers, json=template_data)
+        response.raise_for_status()
         
         # Audit log
-        audit = AuditService()
+        audit = AuditService(client=audit_client)
         ip_address, user_agent = get_client_info(request)
         audit.log_event(
             event_type=AuditEventType.TEMPLATE_CREATED,
@@ -1370,7 +1573,10 @@ async def create_template(data: TemplateCreate, request: Request):
 
 
 @app.get("/templates")
-async def list_templates(institution_id: Optional[str] = None):
+async def list_templates(
+    institution_id: Optional[str] = None,
+    http_client: httpx.AsyncClient = Depends(get_http_client)
+):
     """Lists available document templates."""
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise HTTPException(status_code=500, detail="Supabase not configured")
@@ -1382,10 +1588,9 @@ async def list_templates(institution_id: Optional[str] = None):
         if institution_id:
             params["institution_id"] = f"eq.{institution_id}"
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=get_supabase_headers(), params=params)
-            response.raise_for_status()
-            return response.json()
+        response = await http_client.get(url, headers=get_supabase_headers(), params=params)
+        response.raise_for_status()
+        return response.json()
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list templates: {e}")
@@ -1406,6 +1611,135 @@ class AIDetectionResponse(BaseModel):
     processing_time_ms: float
 
 
+# Detector forward passes take 100-2000 ms of CPU; they run on this small
+# pool so the event loop keeps serving other requests. The bound caps how
+# many inferences (and their activations) are in RAM at once.
+AI_INFERENCE_WORKERS = int(os.getenv("AI_INFERENCE_WORKERS", "2"))
+
+
+# Concurrent requests are coalesced into one batched forward pass: up to
+# AI_BATCH_SIZE images that arrive within AI_BATCH_WAIT_MS of each other.
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "8"))
+AI_BATCH_WAIT_MS = float(os.getenv("AI_BATCH_WAIT_MS", "20"))
+
+
+async def score_ai_image(image_file) -> Optional[Tuple[float, float]]:
+    """
+    Runs the AI-image detector on an image.
+    
+    Decoding and preprocessing run on the inference pool (see
+    AI_INFERENCE_WORKERS); the forward pass is batched with other
+    concurrent requests by _ai_batcher.
+    
+    Args:
+        image_file: Path or binary file object of the image
+        
+    Returns:
+        Tuple of (human_score, artificial_score), or None if the model
+        is not available
+    """
+    loop = asyncio.get_running_loop()
+    inputs = await loop.run_in_executor(_ai_executor, _prepare_ai_image, image_file)
+    if inputs is None:
+        return None
+    return await _ai_batcher.submit(inputs)
+
+
+def _prepare_ai_image(image_file) -> Optional[Dict[str, Any]]:
+    """
+    Decodes an image into AI-detector inputs.
+    
+    The image is decoded straight from the given path or file object (the
+    upload's spooled file), so it is never copied to a temp file first.
+    
+    Args:
+        image_file: Path or binary file object of the image
+        
+    Returns:
+        Model inputs for a single image, or None if the model is not
+        available
+    """
+    with Image.open(image_file) as source:
+        img = source.convert("RGB")
+    
+    try:
+        # Resize for memory efficiency (max 2048px)
+        max_dim = 2048
+        if max(img.size) > max_dim:
+            ratio = max_dim / max(img.size)
+            new_size = (int(img.size[0] * ratio), int(img.size[1] * ratio))
+            resized = img.resize(new_size, Image.Resampling.LANCZOS)
+            img.close()
+            img = resized
+        
+        # Load model (lazy loaded, CPU optimized)
+        processor, model = LazyModelLoader.load_ai_detector()
+        if not processor or not model:
+            return None
+        
+        return preprocess_image(processor, img)
+    finally:
+        img.close()
+
+
+def _run_ai_detector_batch(batch: List[Dict[str, Any]]) -> List[Tuple[float, float]]:
+    """
+    Runs one AI-detector forward pass over a batch of prepared images.
+    
+    Args:
+        batch: Model inputs from _prepare_ai_image
+        
+    Returns:
+        (human_score, artificial_score) for each input, in order
+    """
+    import torch
+    
+    _, model = LazyModelLoader.load_ai_detector()
+    pixel_values = [inputs["pixel_values"] for inputs in batch]
+    
+    # inference_mode also skips autograd's version-counter bookkeeping
+    with torch.inference_mode():
+        if len({tuple(values.shape) for values in pixel_values}) == 1:
+            logits = model(pixel_values=torch.cat(pixel_values)).logits
+        else:
+            # Processor without a fixed output size: shapes can't be stacked
+            logits = torch.cat([model(pixel_values=values).logits for values in pixel_values])
+    
+    probs = torch.softmax(logits, dim=1)
+    
+    # Model has human=0, artificial=1 labels
+    return [(float(row[0]), float(row[1])) for row in probs]
+
+
+def _create_ai_pool() -> Tuple[ThreadPoolExecutor, MicroBatcher]:
+    """Builds the inference pool and the batcher that feeds it."""
+    executor = ThreadPoolExecutor(
+        max_workers=AI_INFERENCE_WORKERS, thread_name_prefix="ai-inference"
+    )
+    batcher = MicroBatcher(
+        _run_ai_detector_batch,
+        executor=executor,
+        max_batch=AI_BATCH_SIZE,
+        max_wait_ms=AI_BATCH_WAIT_MS
+    )
+    return executor, batcher
+
+
+def _shutdown_ai_pool() -> None:
+    """
+    Stops the inference pool without waiting for running inferences.
+    
+    Queued work is cancelled. A fresh pool takes its place (its threads
+    only start on first use), so a restarted app keeps working.
+    """
+    global _ai_executor, _ai_batcher
+    _ai_executor.shutdown(wait=False, cancel_futures=True)
+    _ai_executor, _ai_batcher = _create_ai_pool()
+
+
+_ai_executor, _ai_batcher = _create_ai_pool()
+
+
 @app.post("/ai/detect-image", response_model=AIDetectionResponse)
 async def detect_ai_image(
     file: UploadFile = File(...),
@@ -1433,57 +1767,17 @@ async def detect_ai_image(
             detail="Only image files are allowed (JPEG, PNG, WEBP, etc.)"
         )
     
-    file_id = str(uuid.uuid4())
-    temp_path = TEMP_DIR / f"{file_id}_ai_detect{Path(file.filename).suffix}"
-    
     try:
-        # Save file
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Import AI detector from forensics service
-        try:
-            from services.forensics import LazyModelLoader
-        except ImportError:
-            from backend.services.forensics import LazyModelLoader
-        
-        from PIL import Image
-        import torch
-        
-        # Load image
-        img = Image.open(temp_path).convert("RGB")
-        
-        # Resize for memory efficiency (max 2048px)
-        max_dim = 2048
-        if max(img.size) > max_dim:
-            ratio = max_dim / max(img.size)
-            new_size = (int(img.size[0] * ratio), int(img.size[1] * ratio))
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        # Decode the image straight from the upload (no temp file)
+        scores = await score_ai_image(file.file)
         
-        # Load model (lazy loaded, CPU optimized)
-        processor, model = LazyModelLoader.load_ai_detector()
-        
-        if not processor or not model:
+        if scores is None:
             raise HTTPException(
                 status_code=503,
                 detail="AI detector model not available. Install torch and transformers."
             )
         
-        # Run inference
-        inputs = processor(images=img, return_tensors="pt")
-        inputs = {k: v.to("cpu") for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            outputs = model(**inputs)
-        
-        probs = torch.softmax(outputs.logits, dim=1)[0]
-        
-        # Get scores (model has human=0, artificial=1 labels)
-        human_score = float(probs[0])
-        artificial_score = float(probs[1])
-        
-        # Cleanup
-        img.close()
+        human_score, artificial_score = scores
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -1510,8 +1804,6 @@ async def detect_ai_image(
             status_code=500,
             detail=f"AI detection failed: {str(e)}"
         )
-    finally:
-        cleanup_files(temp_path)
 
 
 @app.post("/verify-document")
@@ -1535,36 +1827,12 @@ async def verify_document_legacy(
             detail="Only image files are allowed"
         )
     
-    file_id = str(uuid.uuid4())
-    temp_path = TEMP_DIR / f"{file_id}_verify{Path(file.filename).suffix}"
-    
     try:
-        # Save file
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
         # QR check (placeholder - always true for now)
         qr_verified = True
         
-        # AI detection
-        try:
-            from services.forensics import LazyModelLoader
-        except ImportError:
-            from backend.services.forensics import LazyModelLoader
-        
-        from PIL import Image
-        import torch
-        
-        img = Image.open(temp_path).convert("RGB")
-        
-        # Resize for memory
-        max_dim = 2048
-        if max(img.size) > max_dim:
-            ratio = max_dim / max(img.size)
-            new_size = (int(img.size[0] * ratio), int(img.size[1] * ratio))
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
-        
-        processor, model = LazyModelLoader.load_ai_detector()
+        # AI detection, decoding the image straight from the upload
+        scores = await score_ai_image(file.file)
         
         ai_result = {
             "ai_manipulation_likely": False,
@@ -1572,16 +1840,8 @@ async def verify_document_legacy(
             "scores": {"human": 1.0, "artificial": 0.0}
         }
         
-        if processor and model:
-            inputs = processor(images=img, return_tensors="pt")
-            inputs = {k: v.to("cpu") for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                outputs = model(**inputs)
-            
-            probs = torch.softmax(outputs.logits, dim=1)[0]
-            human_score = float(probs[0])
-            artificial_score = float(probs[1])
+        if scores is not None:
+            human_score, artificial_score = scores
             
             ai_result = {
                 "ai_manipulation_likely": artificial_score > 0.2,
@@ -1592,8 +1852,6 @@ async def verify_document_legacy(
                 }
             }
         
-        img.close()
-        
         return {
             "status": "verified",
             "qr_verified": qr_verified,
@@ -1608,8 +1866,6 @@ async def verify_document_legacy(
             status_code=500,
             detail=f"Verification failed: {str(e)}"
         )
-    finally:
-        cleanup_files(temp_path)
 
 
 # ============================================================
@@ -1617,7 +1873,7 @@ async def verify_document_legacy(
 # ============================================================
 
 @app.get("/health")
-async def health_check():
+async def health_check(http_client: httpx.AsyncClient = Depends(get_http_client)):
     """Health check endpoint."""
     status = {
         "status": "healthy",
@@ -1628,13 +1884,12 @@ async def health_check():
     # Check Supabase connectivity
     if SUPABASE_URL and SUPABASE_KEY:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{SUPABASE_URL}/rest/v1/",
-                    headers=get_supabase_headers(),
-                    timeout=5.0
-                )
-                status["supabase_connected"] = response.status_code < 500
+            response = await http_client.get(
+                f"{SUPABASE_URL}/rest/v1/",
+                headers=get_supabase_headers(),
+                timeout=5.0
+            )
+            status["supabase_connected"] = response.status_code < 500
         except Exception:
             status["supabase_connected"] = False
     
@@ -1645,20 +1900,45 @@ async def health_check():
 # Legacy Compatibility
 # ============================================================
 
-def log_audit_event(doc_hash: str):
+def log_audit_event(doc_hash: str, client: Optional[httpx.Client] = None):
     """
     Legacy function for backward compatibility.
     Logs the document hash to Supabase audit_logs table.
+    
+    Returns the logged AuditEntry, or None if logging was skipped or failed.
     """
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("WARNING: Supabase credentials not found. Skipping audit log.")
-        return
+        return None
 
     try:
-        audit = AuditService()
-        audit.log_event(
+        audit = AuditService(client=client)
+        return audit.log_event(
             event_type=AuditEventType.DOCUMENT_ISSUED,
             document_hash=doc_hash
         )
     except Exception as e:
         print(f"Exception logging to Supabase: {e}")
+        return None
+
+
+# ============================================================
+# Entry Point
+# ============================================================
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    # One process runs one event loop and, in effect, one CPU-bound forward
+    # pass at a time, so several workers are needed for parallel verifies.
+    # Each worker loads its own copy of the models, which is why the
+    # default stays within the 8GB RAM budget (same cap as the Dockerfile).
+    # uvloop and httptools (uvicorn[standard]) are picked up automatically.
+    workers = int(os.getenv("WEB_CONCURRENCY", min(4, max(2, (os.cpu_count() or 1) // 2))))
+    
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers
+    )
@@ -165,27 +165,40 @@ def calculate_qr_position(
 
 
 def stamp_document(
-    input_pdf_path: str,
-    output_pdf_path: str,
+    input_pdf_path: Optional[str],
+    output_pdf_path: Optional[str],
     qr_image: Image.Image,
     config: Optional[QRConfig] = None,
-    pages: Optional[list] = None
-):
+    pages: Optional[list] = None,
+    in_stream: Optional[bytes] = None
+) -> Optional[bytes]:
     """
     Stamps QR code onto PDF pages using PyMuPDF (high-speed).
 
+    The source may be given as in-memory bytes instead of a path, and the
+    result is returned as bytes when no output path is given, so callers
+    that already hold the PDF skip the disk round-trip.
+
     Args:
-        input_pdf_path: Path to the source PDF.
-        output_pdf_path: Path where the stamped PDF will be saved.
+        input_pdf_path: Path to the source PDF (ignored if in_stream is set).
+        output_pdf_path: Path where the stamped PDF will be saved, or None
+                         to return the stamped PDF as bytes.
         qr_image: PIL Image of the QR code.
         config: Optional QR configuration.
         pages: Optional list of page indices to stamp (0-indexed). 
                If None, stamps only the first page.
+        in_stream: Optional source PDF bytes.
+
+    Returns:
+        Stamped PDF bytes if output_pdf_path is None, otherwise None.
     """
     if config is None:
         config = QRConfig()
     
-    doc = fitz.open(input_pdf_path)
+    if in_stream is not None:
+        doc = fitz.open(stream=in_stream, filetype="pdf")
+    else:
+        doc = fitz.open(input_pdf_path)
 
     try:
         # Determine which pages to stamp
@@ -214,6 +227,8 @@ def stamp_document(
             rect = fitz.Rect(x0, y0, x1, y1)
             page.insert_image(rect, stream=img_bytes)
         
+        if output_pdf_path is None:
+            return doc.tobytes()
         doc.save(output_pdf_path)
         
     finally:
@@ -15,12 +15,84 @@ Memory optimized for 8GB RAM environments.
 import os
 import hashlib
 import json
-from typing import Dict, Any, List, Optional, Tuple
-from dataclasses import dataclass, field, asdict
+import tempfile
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from enum import Enum
 import httpx
 
+try:
+    import fcntl  # POSIX only; checkpoint updates are unlocked elsewhere
+except ImportError:
+    fcntl = None
+
+try:
+    from utils import hash_bytes_batch
+    from services.templates import MerkleTree, MerkleProof
+except ImportError:
+    from backend.utils import hash_bytes_batch
+    from backend.services.templates import MerkleTree, MerkleProof
+
+
+# Canonical serializer for entry hashing. json.dumps(..., sort_keys=True)
+# constructs a fresh JSONEncoder on every call; reusing one instance gives
+# byte-identical output without that per-entry setup cost. Hashed fields
+# are plain JSON values, so the circular-reference bookkeeping is skipped.
+_CANONICAL_JSON = json.JSONEncoder(sort_keys=True, check_circular=False)
+
+
+def canonical_entry_payload(
+    event_type: str,
+    institution_id: Optional[str],
+    document_id: Optional[str],
+    document_hash: Optional[str],
+    previous_log_hash: Optional[str],
+    chain_position: int,
+    created_at: str,
+    metadata: Dict[str, Any]
+) -> bytes:
+    """
+    Serializes the hashed fields of an audit entry deterministically.
+    
+    Single source of truth for the log_hash input, shared by AuditEntry
+    and by chain verification over raw database rows.
+    
+    Returns:
+        Sorted-key JSON of the hashed fields, encoded as UTF-8
+    """
+    return _CANONICAL_JSON.encode({
+        "event_type": event_type,
+        "institution_id": institution_id,
+        "document_id": document_id,
+        "document_hash": document_hash,
+        "previous_log_hash": previous_log_hash,
+        "chain_position": chain_position,
+        "created_at": created_at,
+        "metadata": metadata
+    }).encode('utf-8')
+
+
+def row_canonical_payload(row: Dict[str, Any]) -> bytes:
+    """
+    Canonical payload for a stored audit_logs row.
+    
+    Equivalent to AuditEntry.from_dict(row).canonical_payload() without
+    constructing the (frozen) dataclass, which dominates per-row cost
+    when verifying long chains.
+    """
+    get = row.get
+    return canonical_entry_payload(
+        AuditEventType(row["event_type"]).value,
+        get("institution_id"),
+        get("document_id"),
+        get("document_hash"),
+        get("previous_log_hash"),
+        get("chain_position", 0),
+        get("created_at", ""),
+        get("metadata") or {}
+    )
+
 
 class AuditEventType(Enum):
     """Types of auditable events."""
@@ -34,9 +106,16 @@ class AuditEventType(Enum):
     TEMPLATE_UPDATED = "template_updated"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AuditEntry:
-    """Represents a single audit log entry."""
+    """
+    Represents a single audit log entry.
+    
+    Entries are immutable so the canonical payload can be serialized once
+    and reused; derive modified entries with dataclasses.replace(). The
+    metadata dict must likewise be treated as read-only. Slots drop the
+    per-instance __dict__, which adds up when a chain is loaded as entries.
+    """
     event_type: AuditEventType
     institution_id: Optional[str] = None
     document_id: Optional[str] = None
@@ -49,6 +128,7 @@ class AuditEntry:
     user_agent: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
     created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    _canonical: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
     
     def compute_hash(self) -> str:
         """
@@ -66,20 +146,55 @@ class AuditEntry:
         Returns:
             SHA-256 hex digest
         """
-        hash_input = {
-            "event_type": self.event_type.value,
-            "institution_id": self.institution_id,
-            "document_id": self.document_id,
-            "document_hash": self.document_hash,
-            "previous_log_hash": self.previous_log_hash,
-            "chain_position": self.chain_position,
-            "created_at": self.created_at,
-            "metadata": self.metadata
-        }
+        return hashlib.sha256(self.canonical_payload()).hexdigest()
+    
+    def canonical_payload(self) -> bytes:
+        """
+        Returns the deterministic UTF-8 serialization that compute_hash digests.
         
-        # Serialize deterministically
-        serialized = json.dumps(hash_input, sort_keys=True)
-        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+        Returns:
+            Sorted-key JSON of the hashed fields, encoded as UTF-8
+        """
+        # Serialized on first use and cached in a slot; replace() resets it
+        # since the field is excluded from __init__
+        if self._canonical is None:
+            object.__setattr__(self, "_canonical", canonical_entry_payload(
+                self.event_type.value,
+                self.institution_id,
+                self.document_id,
+                self.document_hash,
+                self.previous_log_hash,
+                self.chain_position,
+                self.created_at,
+                self.metadata
+            ))
+        return self._canonical
+    
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "AuditEntry":
+        """
+        Rebuilds an entry from a stored audit_logs row.
+        
+        Args:
+            row: Row as returned by the audit_logs table
+            
+        Returns:
+            AuditEntry with the stored values
+        """
+        return cls(
+            event_type=AuditEventType(row["event_type"]),
+            institution_id=row.get("institution_id"),
+            document_id=row.get("document_id"),
+            document_hash=row.get("document_hash"),
+            log_hash=row.get("log_hash", ""),
+            previous_log_hash=row.get("previous_log_hash"),
+            chain_position=row.get("chain_position", 0),
+            actor_id=row.get("actor_id"),
+            ip_address=row.get("ip_address"),
+            user_agent=row.get("user_agent"),
+            metadata=row.get("metadata") or {},
+            created_at=row.get("created_at", "")
+        )
     
     def to_dict(self) -> Dict[str, Any]:
         """Converts entry to dictionary for database storage."""
@@ -115,23 +230,91 @@ class AuditService:
     
     Implements a blockchain-lite audit trail where each entry contains
     the hash of the previous entry, creating a tamper-evident chain.
+    
+    Fixed windows of CHECKPOINT_WINDOW entries can additionally be sealed
+    with a Merkle root (audit_checkpoints table), so a single entry is
+    proven with log2(window) hashes instead of replaying the chain.
     """
     
+    CHECKPOINT_WINDOW = 1024
+    
+    # Caller-supplied fields accepted per event by log_events_batch (the
+    # keyword arguments of log_event); chain fields are always computed
+    BATCH_EVENT_FIELDS = frozenset({
+        "institution_id", "document_id", "document_hash", "actor_id",
+        "ip_address", "user_agent", "metadata"
+    })
+    
+    # Keep-alive pool for a service-owned client (see open/close)
+    POOL_LIMITS = httpx.Limits(max_keepalive_connections=8)
+    
     def __init__(self, supabase_url: Optional[str] = None,
-                 supabase_key: Optional[str] = None):
+                 supabase_key: Optional[str] = None,
+                 client: Optional[httpx.Client] = None,
+                 verify_state_path: Optional[str] = None):
         """
         Initialize audit service with Supabase connection.
         
         Args:
             supabase_url: Supabase project URL
             supabase_key: Supabase service role key
+            client: Optional httpx.Client for Supabase calls (defaults to
+                    the module-level httpx functions, or a pooled client
+                    owned by the service inside a ``with`` block)
+            verify_state_path: JSON file recording the last verified chain
+                               position per institution (defaults to
+                               AUDIT_VERIFY_STATE_PATH; unset disables
+                               incremental verification)
         """
         self._supabase_url = supabase_url or os.getenv("SUPABASE_URL")
         self._supabase_key = supabase_key or os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+        self._http = client if client is not None else httpx
+        self._owns_client = False
+        self._verify_state_path = verify_state_path or os.getenv("AUDIT_VERIFY_STATE_PATH")
+        
+        # Chain tip per institution, updated after each successful write so
+        # consecutive log_event calls skip the "latest entry" SELECT. Only
+        # valid while this instance is the sole writer, so keep instances
+        # short-lived (one per request) rather than process-wide.
+        self._chain_tips: Dict[Optional[str], Tuple[str, int]] = {}
+        
+        # Set once the verify_audit_chain RPC is found missing, so later
+        # verifications go straight to the row walk
+        self._verify_rpc_missing = False
         
         if not self._supabase_url or not self._supabase_key:
             print("WARNING: Supabase credentials not configured. Audit logging disabled.")
     
+    def open(self) -> "AuditService":
+        """
+        Switches to a service-owned keep-alive client.
+        
+        The module-level httpx functions open a new connection (and TLS
+        handshake) per call; paging through a long chain or logging many
+        events should reuse one pool instead. No-op when a client was
+        injected or one is already open.
+        
+        Returns:
+            self, for use as a context manager
+        """
+        if self._http is httpx:
+            self._http = httpx.Client(limits=self.POOL_LIMITS)
+            self._owns_client = True
+        return self
+    
+    def close(self) -> None:
+        """Closes the service-owned client, leaving injected clients open."""
+        if self._owns_client:
+            self._http.close()
+            self._http = httpx
+            self._owns_client = False
+    
+    def __enter__(self) -> "AuditService":
+        return self.open()
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
     def _get_headers(self) -> Dict[str, str]:
         """Returns Supabase API headers."""
         return {
@@ -153,6 +336,11 @@ class AuditService:
         if not self._supabase_url or not self._supabase_key:
             return None, 1
         
+        cached = self._chain_tips.get(institution_id)
+        if cached is not None:
+            prev_hash, prev_position = cached
+            return prev_hash, prev_position + 1
+        
         try:
             url = f"{self._supabase_url}/rest/v1/audit_logs"
             
@@ -166,7 +354,7 @@ class AuditService:
             if institution_id:
                 params["institution_id"] = f"eq.{institution_id}"
             
-            response = httpx.get(url, headers=self._get_headers(), params=params)
+            response = self._http.get(url, headers=self._get_headers(), params=params)
             
             if response.status_code == 200:
                 data = response.json()
@@ -231,25 +419,101 @@ class AuditService:
             )
             
             # Compute log hash
-            entry.log_hash = entry.compute_hash()
+            entry = replace(entry, log_hash=entry.compute_hash())
             
             # Store in database
             url = f"{self._supabase_url}/rest/v1/audit_logs"
             headers = self._get_headers()
             headers["Prefer"] = "return=minimal"
             
-            response = httpx.post(url, headers=headers, json=entry.to_dict())
+            response = self._http.post(url, headers=headers, json=entry.to_dict())
             
             if response.status_code >= 400:
                 print(f"Error logging audit event: {response.text}")
                 return None
             
+            self._chain_tips[institution_id] = (entry.log_hash, entry.chain_position)
             return entry
             
         except Exception as e:
             print(f"Exception logging audit event: {e}")
             return None
     
+    def log_events_batch(
+        self,
+        events: List[Tuple[AuditEventType, Dict[str, Any]]]
+    ) -> List[AuditEntry]:
+        """
+        Logs several audit events with a single bulk insert.
+        
+        The chain tip is fetched once per institution, then previous_log_hash
+        is threaded through the new entries locally, so N events cost one
+        SELECT and one POST instead of N of each.
+        
+        Args:
+            events: (event_type, kwargs) pairs, where kwargs are the
+                    keyword arguments accepted by log_event
+            
+        Returns:
+            List of stored AuditEntry objects in chain order, or an empty
+            list if logging is disabled or the insert fails
+            
+        Raises:
+            ValueError: If an event carries a field log_event does not
+                        accept (including computed chain fields)
+        """
+        if not events:
+            return []
+        
+        for _, fields in events:
+            unknown = fields.keys() - self.BATCH_EVENT_FIELDS
+            if unknown:
+                raise ValueError(f"Unsupported audit event fields: {sorted(unknown)}")
+        
+        if not self._supabase_url or not self._supabase_key:
+            print("Audit logging skipped: Supabase not configured")
+            return []
+        
+        try:
+            tips: Dict[Optional[str], Tuple[Optional[str], int]] = {}
+            entries: List[AuditEntry] = []
+            
+            for event_type, fields in events:
+                institution_id = fields.get("institution_id")
+                if institution_id not in tips:
+                    tips[institution_id] = self._get_previous_entry(institution_id)
+                previous_hash, chain_position = tips[institution_id]
+                
+                entry = AuditEntry(
+                    event_type=event_type,
+                    previous_log_hash=previous_hash,
+                    chain_position=chain_position,
+                    **{**fields, "metadata": fields.get("metadata") or {}}
+                )
+                entry = replace(entry, log_hash=entry.compute_hash())
+                entries.append(entry)
+                tips[institution_id] = (entry.log_hash, chain_position + 1)
+            
+            url = f"{self._supabase_url}/rest/v1/audit_logs"
+            headers = self._get_headers()
+            headers["Prefer"] = "return=minimal"
+            
+            response = self._http.post(
+                url, headers=headers, json=[entry.to_dict() for entry in entries]
+            )
+            
+            if response.status_code >= 400:
+                print(f"Error logging audit batch: {response.text}")
+                return []
+            
+            for institution_id, (tip_hash, next_position) in tips.items():
+                self._chain_tips[institution_id] = (tip_hash, next_position - 1)
+            return entries
+            
+        except Exception as e:
+            print(f"Exception logging audit batch: {e}")
+            return []
+    
     def log_document_issued(
         self,
         institution_id: str,
@@ -328,20 +592,278 @@ class AuditService:
             metadata=full_metadata if full_metadata else {}
         )
     
+    def _iter_chain_pages(
+        self,
+        select: str,
+        institution_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        page_size: int = 1000,
+        after_position: Optional[int] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yields audit entries in chain order, one page at a time.
+        
+        Only a single page is resident at once, so memory stays
+        O(page_size) regardless of chain length.
+        
+        Args:
+            select: Columns to fetch
+            institution_id: Institution ID (None for global chain)
+            limit: Maximum number of entries to yield (None for all)
+            page_size: Entries fetched per request
+            after_position: Only fetch entries past this chain position
+            
+        Raises:
+            AuditError: If a page cannot be fetched
+        """
+        url = f"{self._supabase_url}/rest/v1/audit_logs"
+        offset = 0
+        
+        while limit is None or offset < limit:
+            count = page_size if limit is None else min(page_size, limit - offset)
+            params = {
+                "select": select,
+                "order": "chain_position.asc",
+                "limit": str(count),
+                "offset": str(offset)
+            }
+            
+            if institution_id:
+                params["institution_id"] = f"eq.{institution_id}"
+            if after_position is not None:
+                params["chain_position"] = f"gt.{after_position}"
+            
+            response = self._http.get(url, headers=self._get_headers(), params=params)
+            
+            if response.status_code != 200:
+                raise AuditError(f"Failed to fetch audit logs: {response.text}")
+            
+            page = response.json()
+            if page:
+                yield page
+            
+            if len(page) < count:
+                return
+            offset += count
+    
+    def _load_verified_checkpoint(
+        self,
+        institution_id: Optional[str],
+        hashes_verified: bool = False
+    ) -> Optional[Tuple[int, str]]:
+        """
+        Reads the last verified (chain_position, log_hash) for a chain.
+        
+        Each chain keeps two records: the last entry whose links were
+        checked, and the last entry whose log_hash was also recomputed
+        (flagged hashes_verified). A hash-recomputing run may only resume
+        from the latter; a link-only run resumes from whichever is further.
+        
+        Args:
+            institution_id: Institution ID (None for global chain)
+            hashes_verified: Only accept a checkpoint whose run recomputed
+                             every entry's log_hash
+            
+        Returns:
+            Tuple of (position, log_hash) or None if nothing is recorded
+        """
+        if not self._verify_state_path:
+            return None
+        
+        records = self._read_verify_state().get(institution_id or "", [])
+        candidates = [
+            record for record in records
+            if record.get("hashes_verified") or not hashes_verified
+        ]
+        if not candidates:
+            return None
+        
+        record = max(candidates, key=lambda r: r["chain_position"])
+        return record["chain_position"], record["log_hash"]
+    
+    def _read_verify_state(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Loads the verify state file ({} if missing or unreadable)."""
+        try:
+            with open(self._verify_state_path, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        # Files written before the hashes_verified flag hold one bare
+        # record per chain; it was not necessarily hash-checked
+        return {
+            chain: [records] if isinstance(records, dict) else records
+            for chain, records in state.items()
+        }
+    
+    def _save_verified_checkpoint(
+        self,
+        institution_id: Optional[str],
+        position: int,
+        log_hash: str,
+        hashes_verified: bool = False
+    ) -> None:
+        """
+        Records the last verified entry for a chain.
+        
+        The record only ever moves forward: a shorter (e.g. limit-bounded)
+        run leaves a further checkpoint in place. The read-modify-write is
+        serialized across processes with a lock file, and the new state is
+        written to a unique temp file renamed over the state file, so a
+        crash mid-write never leaves a truncated checkpoint behind.
+        
+        Args:
+            institution_id: Institution ID (None for global chain)
+            position: Chain position of the last verified entry
+            log_hash: log_hash of that entry
+            hashes_verified: The run recomputed every entry's log_hash
+        """
+        if not self._verify_state_path:
+            return
+        
+        state_dir = os.path.dirname(os.path.abspath(self._verify_state_path))
+        try:
+            with open(f"{self._verify_state_path}.lock", "w") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                
+                state = self._read_verify_state()
+                records = state.setdefault(institution_id or "", [])
+                current = next(
+                    (r for r in records if bool(r.get("hashes_verified")) == hashes_verified),
+                    None
+                )
+                if current is not None and current["chain_position"] >= position:
+                    return
+                if current is not None:
+                    records.remove(current)
+                records.append({
+                    "chain_position": position,
+                    "log_hash": log_hash,
+                    "hashes_verified": hashes_verified
+                })
+                
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=state_dir,
+                    prefix=os.path.basename(self._verify_state_path) + ".",
+                    suffix=".tmp"
+                )
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self._verify_state_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        except OSError as e:
+            print(f"Warning: Could not save audit verification checkpoint: {e}")
+    
+    def _verify_links_rpc(
+        self,
+        institution_id: Optional[str],
+        limit: Optional[int],
+        after_position: Optional[int],
+        after_hash: Optional[str]
+    ) -> Optional[Tuple[bool, Optional[int], Optional[int], Optional[str]]]:
+        """
+        Runs the link check inside Postgres via the verify_audit_chain RPC.
+        
+        See scripts/migrate_audit_verify_chain.sql. Only the verdict row
+        crosses the network instead of every entry.
+        
+        Args:
+            institution_id: Institution ID (None for global chain)
+            limit: Maximum number of entries to check (None for all)
+            after_position: Only check entries past this chain position
+            after_hash: log_hash the first checked entry must link to
+            
+        Returns:
+            Tuple of (is_valid, broken_position, last_position, last_hash),
+            or None if the function is not deployed
+            
+        Raises:
+            AuditError: If the RPC fails for any other reason (auth,
+                        server error, bad arguments)
+        """
+        if self._verify_rpc_missing:
+            return None
+        
+        url = f"{self._supabase_url}/rest/v1/rpc/verify_audit_chain"
+        
+        response = self._http.post(url, headers=self._get_headers(), json={
+            "inst_id": institution_id,
+            "max_entries": limit,
+            "after_position": after_position,
+            "after_hash": after_hash
+        })
+        
+        if response.status_code != 200:
+            if self._is_missing_function(response):
+                print("Warning: verify_audit_chain RPC not deployed, walking rows instead")
+                self._verify_rpc_missing = True
+                return None
+            raise AuditError(
+                f"verify_audit_chain RPC failed ({response.status_code}): {response.text}"
+            )
+        
+        data = response.json()
+        row = data[0] if isinstance(data, list) else data
+        return (
+            row["is_valid"],
+            row.get("broken_at"),
+            row.get("last_position"),
+            row.get("last_hash")
+        )
+    
+    @staticmethod
+    def _is_missing_function(response: httpx.Response) -> bool:
+        """True if PostgREST reports the called function does not exist."""
+        try:
+            code = response.json().get("code")
+        except (ValueError, AttributeError):
+            code = None
+        return response.status_code == 404 or code == "PGRST202"
+    
     def verify_chain_integrity(
         self,
         institution_id: Optional[str] = None,
-        limit: int = 1000
+        limit: Optional[int] = 1000,
+        verify_hashes: bool = False,
+        page_size: int = 1000,
+        incremental: bool = False,
+        pushdown: bool = True
     ) -> Tuple[bool, Optional[int]]:
         """
         Verifies the integrity of the audit chain.
         
         Checks that each entry's previous_log_hash matches the
-        actual log_hash of the preceding entry.
+        actual log_hash of the preceding entry. With verify_hashes, every
+        entry's log_hash is also recomputed from its stored fields so
+        in-place edits are caught. Recomputation runs as one batch pass
+        per page before the serial link check, since no entry's hash
+        input depends on a recomputed value.
+        
+        Entries are streamed page by page and the last log_hash is carried
+        across page boundaries, so memory is bounded by page_size.
+        
+        With pushdown (and no verify_hashes), the link check runs in the
+        database as a single RPC; rows are only streamed here when the
+        function is not deployed or hashes must be recomputed, since the
+        log_hash input is Python's canonical JSON.
+        
+        Each successful run records its last entry in the verify state
+        file (only ever advancing it). With incremental, only entries after
+        that checkpoint are fetched, and the first one must link to the
+        recorded hash; a verify_hashes run resumes only from a checkpoint
+        whose run also recomputed hashes.
         
         Args:
             institution_id: Institution ID to verify (None for global chain)
-            limit: Maximum number of entries to check
+            limit: Maximum number of entries to check (None for the whole chain)
+            verify_hashes: Also recompute and compare each entry's log_hash
+            page_size: Entries fetched per request
+            incremental: Resume from the last verified checkpoint
+            pushdown: Check links in Postgres when hashes are not recomputed
             
         Returns:
             Tuple of (is_valid, broken_position)
@@ -351,44 +873,61 @@ class AuditService:
         if not self._supabase_url or not self._supabase_key:
             return True, None  # Can't verify without database
         
+        select = "*" if verify_hashes else "log_hash,previous_log_hash,chain_position"
+        last_hash: Optional[str] = None
+        last_position: Optional[int] = None
+        is_first = True
+        
+        checkpoint = (
+            self._load_verified_checkpoint(institution_id, hashes_verified=verify_hashes)
+            if incremental else None
+        )
+        if checkpoint is not None:
+            last_position, last_hash = checkpoint
+            is_first = False
+        
         try:
-            url = f"{self._supabase_url}/rest/v1/audit_logs"
-            
-            params = {
-                "select": "log_hash,previous_log_hash,chain_position",
-                "order": "chain_position.asc",
-                "limit": str(limit)
-            }
-            
-            if institution_id:
-                params["institution_id"] = f"eq.{institution_id}"
-            
-            response = httpx.get(url, headers=self._get_headers(), params=params)
+            if pushdown and not verify_hashes:
+                result = self._verify_links_rpc(
+                    institution_id, limit, last_position, last_hash
+                )
+                if result is not None:
+                    is_valid, broken_position, tip_position, tip_hash = result
+                    if is_valid and tip_position is not None and tip_hash is not None:
+                        self._save_verified_checkpoint(institution_id, tip_position, tip_hash)
+                    return is_valid, broken_position
             
-            if response.status_code != 200:
-                raise AuditError(f"Failed to fetch audit logs: {response.text}")
-            
-            entries = response.json()
-            
-            if not entries:
-                return True, None
-            
-            # Verify chain
-            for i, entry in enumerate(entries):
-                if i == 0:
-                    # First entry should have no previous hash
-                    if entry.get("previous_log_hash") is not None:
-                        # This could be valid if it's not position 1
-                        if entry.get("chain_position") == 1:
-                            continue
-                else:
-                    # Each entry's previous_log_hash should match prior entry's log_hash
-                    expected_prev = entries[i - 1].get("log_hash")
-                    actual_prev = entry.get("previous_log_hash")
+            pages = self._iter_chain_pages(
+                select, institution_id, limit, page_size,
+                after_position=last_position
+            )
+            for page in pages:
+                # Pass 1: recompute this page's entry hashes in one batch
+                recomputed = None
+                if verify_hashes:
+                    recomputed = hash_bytes_batch([
+                        row_canonical_payload(entry) for entry in page
+                    ])
+                
+                # Pass 2: serial link check, carrying last_hash across pages
+                for i, entry in enumerate(page):
+                    if recomputed is not None and recomputed[i] != entry.get("log_hash"):
+                        return False, entry.get("chain_position")
                     
-                    if actual_prev != expected_prev:
+                    # The first entry may link to a position outside the
+                    # checked range, so only later entries are compared
+                    if not is_first and entry.get("previous_log_hash") != last_hash:
                         return False, entry.get("chain_position")
+                    
+                    is_first = False
+                    last_hash = entry.get("log_hash")
+                    last_position = entry.get("chain_position")
             
+            if last_hash is not None and last_position is not None:
+                self._save_verified_checkpoint(
+                    institution_id, last_position, last_hash,
+                    hashes_verified=verify_hashes
+                )
             return True, None
             
         except AuditError:
@@ -396,6 +935,134 @@ class AuditService:
         except Exception as e:
             raise AuditError(f"Chain verification failed: {e}")
     
+    def _fetch_window_hashes(
+        self,
+        window_start: int,
+        window_end: int,
+        institution_id: Optional[str] = None
+    ) -> List[str]:
+        """
+        Fetches log hashes for chain positions window_start..window_end (inclusive).
+        
+        The window is read through _iter_chain_pages, so a window larger
+        than PostgREST's per-request row cap is fetched in full.
+        
+        Raises:
+            AuditError: If the entries cannot be fetched
+        """
+        log_hashes = []
+        pages = self._iter_chain_pages(
+            "log_hash,chain_position",
+            institution_id=institution_id,
+            limit=window_end - window_start + 1,
+            after_position=window_start - 1
+        )
+        for page in pages:
+            log_hashes.extend(
+                entry.get("log_hash") for entry in page
+                if entry.get("chain_position", window_end) <= window_end
+            )
+        
+        return log_hashes
+    
+    @staticmethod
+    def compute_window_root(log_hashes: List[str]) -> Optional[str]:
+        """
+        Builds a Merkle tree over a window of log hashes.
+        
+        Args:
+            log_hashes: Entry hashes in chain order
+            
+        Returns:
+            Merkle root hash (None for an empty window)
+        """
+        return MerkleTree(log_hashes).root_hash
+    
+    @staticmethod
+    def get_window_proof(log_hashes: List[str], index: int) -> MerkleProof:
+        """
+        Generates the inclusion proof for one entry of a window.
+        
+        Args:
+            log_hashes: Entry hashes in chain order
+            index: Zero-based offset of the entry within the window
+            
+        Returns:
+            MerkleProof checkable with MerkleTree.verify_proof
+        """
+        return MerkleTree(log_hashes).get_proof(index)
+    
+    def verify_window(
+        self,
+        window_start: int,
+        window_end: int,
+        expected_root: str,
+        institution_id: Optional[str] = None
+    ) -> bool:
+        """
+        Checks a window of entries against its checkpointed Merkle root.
+        
+        Args:
+            window_start: First chain position in the window
+            window_end: Last chain position in the window (inclusive)
+            expected_root: Merkle root stored when the window was sealed
+            institution_id: Institution ID (None for global chain)
+            
+        Returns:
+            True if the window's current log hashes reproduce the root
+        """
+        log_hashes = self._fetch_window_hashes(window_start, window_end, institution_id)
+        return self.compute_window_root(log_hashes) == expected_root
+    
+    def create_checkpoint(
+        self,
+        window_start: int,
+        institution_id: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Seals the CHECKPOINT_WINDOW entries starting at window_start.
+        
+        Args:
+            window_start: First chain position of the window
+            institution_id: Institution ID (None for global chain)
+            
+        Returns:
+            The stored Merkle root, or None if the window is empty or
+            could not be stored
+        """
+        if not self._supabase_url or not self._supabase_key:
+            return None
+        
+        window_end = window_start + self.CHECKPOINT_WINDOW - 1
+        
+        try:
+            log_hashes = self._fetch_window_hashes(window_start, window_end, institution_id)
+            merkle_root = self.compute_window_root(log_hashes)
+            if merkle_root is None:
+                return None
+            
+            url = f"{self._supabase_url}/rest/v1/audit_checkpoints"
+            headers = self._get_headers()
+            headers["Prefer"] = "return=minimal"
+            
+            response = self._http.post(url, headers=headers, json={
+                "institution_id": institution_id,
+                "window_start": window_start,
+                "window_end": window_start + len(log_hashes) - 1,
+                "entry_count": len(log_hashes),
+                "merkle_root": merkle_root
+            })
+            
+            if response.status_code >= 400:
+                print(f"Error storing audit checkpoint: {response.text}")
+                return None
+            
+            return merkle_root
+            
+        except Exception as e:
+            print(f"Exception creating audit checkpoint: {e}")
+            return None
+    
     def get_audit_trail(
         self,
         institution_id: Optional[str] = None,
@@ -449,7 +1116,7 @@ class AuditService:
             if end_date:
                 params["created_at"] = f"lte.{end_date}"
             
-            response = httpx.get(url, headers=self._get_headers(), params=params)
+            response = self._http.get(url, headers=self._get_headers(), params=params)
             
             if response.status_code == 200:
                 return response.json()
@@ -18,7 +18,9 @@ import io
 import base64
 import asyncio
 import logging
-from typing import Dict, Any, Optional, Tuple, List, Union
+import threading
+from concurrent.futures import Executor
+from typing import Dict, Any, Optional, Tuple, List, Union, Callable, Set
 from dataclasses import dataclass, field, asdict
 from pathlib import Path
 from enum import Enum
@@ -55,6 +57,11 @@ VIT_MODEL_NAME = "ashish-001/deepfake-detection-using-ViT"
 AI_DETECTOR_MODEL_NAME = "umm-maybe/AI-image-detector"
 CLOUD_MODEL_NAME = "zhipeixu/fakeshield-v1-22b"
 
+# Dynamic int8 quantization of the classifiers' Linear layers on CPU.
+# Opt-in: it shifts scores slightly, so thresholds should be re-checked
+# before enabling it in production.
+QUANTIZE_CPU_MODELS = os.getenv("AI_MODEL_INT8", "").lower() in ("1", "true", "yes")
+
 # Hugging Face API configuration
 HF_API_URL = "https://api-inference.huggingface.co/models"
 HF_API_TOKEN = os.getenv("HUGGING_FACE_TOKEN")
@@ -331,6 +338,219 @@ class ELAAnalyzer:
 # TIER 2: Local AI Detection (ViT + AI Image Detector)
 # ============================================================
 
+class FusedImageTransform:
+    """
+    ViT preprocessing (resize -> rescale -> normalize) in one buffer.
+    
+    Mean/std are prepared once as channel-first arrays and the pixels are
+    transposed while still uint8, so rescale and normalize run in place on
+    a single float32 array instead of the processor's per-call validation,
+    format inference and intermediate copies. The dtype steps match the
+    HuggingFace processor, so the pixel values are identical to
+    processor(images=img).
+    """
+    
+    # Processors whose pipeline is exactly resize/rescale/normalize
+    SUPPORTED_PROCESSORS = ("ViTImageProcessor", "ViTImageProcessorPil", "ViTFeatureExtractor")
+    # Backends that resize with torchvision rather than PIL (transformers 5
+    # names its torchvision ViT processor plain "ViTImageProcessor")
+    UNSUPPORTED_BACKENDS = ("TorchvisionBackend", "BaseImageProcessorFast")
+    
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        resample: int,
+        rescale_factor: float,
+        image_mean: List[float],
+        image_std: List[float]
+    ):
+        """
+        Args:
+            size: Target (width, height)
+            resample: PIL resampling filter
+            rescale_factor: Multiplier applied to raw pixel values
+            image_mean: Per-channel normalization mean
+            image_std: Per-channel normalization std
+        """
+        self.size = size
+        self.resample = resample
+        self.rescale_factor = rescale_factor
+        self._mean = np.asarray(image_mean, dtype=np.float32)[:, None, None]
+        self._std = np.asarray(image_std, dtype=np.float32)[:, None, None]
+    
+    @classmethod
+    def from_processor(cls, processor: Any) -> Optional["FusedImageTransform"]:
+        """
+        Build the transform from a loaded HuggingFace image processor.
+        
+        Returns:
+            FusedImageTransform, or None if the processor does anything
+            beyond resize/rescale/normalize (it must then be called as-is)
+        """
+        if type(processor).__name__ not in cls.SUPPORTED_PROCESSORS:
+            return None
+        if any(base.__name__ in cls.UNSUPPORTED_BACKENDS for base in type(processor).__mro__):
+            return None
+        
+        # A plain dict, or transformers 5's SizeDict
+        size = getattr(processor, "size", None)
+        height = size.get("height") if hasattr(size, "get") else None
+        width = size.get("width") if hasattr(size, "get") else None
+        if not (
+            getattr(processor, "do_resize", False)
+            and getattr(processor, "do_rescale", False)
+            and getattr(processor, "do_normalize", False)
+            and not getattr(processor, "do_center_crop", False)
+            and height and width
+        ):
+            return None
+        
+        return cls(
+            size=(width, height),
+            resample=int(processor.resample),
+            rescale_factor=processor.rescale_factor,
+            image_mean=processor.image_mean,
+            image_std=processor.image_std
+        )
+    
+    def __call__(self, img: Image.Image) -> np.ndarray:
+        """
+        Preprocess an RGB image.
+        
+        Returns:
+            float32 array of shape (1, 3, height, width)
+        """
+        resized = img.resize(self.size, resample=self.resample)
+        pixels = np.ascontiguousarray(np.asarray(resized).transpose(2, 0, 1))
+        
+        # Rescale in float64 and store as float32, as the processor does
+        values = np.empty(pixels.shape, dtype=np.float32)
+        np.multiply(pixels, self.rescale_factor, out=values, dtype=np.float64, casting="unsafe")
+        values -= self._mean
+        values /= self._std
+        return values[None]
+
+
+# Fused transform per loaded processor: id -> (processor, transform or None)
+_fused_transforms: Dict[int, Tuple[Any, Optional[FusedImageTransform]]] = {}
+
+
+def preprocess_image(processor: Any, img: Image.Image) -> Dict[str, Any]:
+    """
+    Model inputs for an RGB image, via FusedImageTransform when the
+    processor supports it and processor(images=img) otherwise.
+    
+    Args:
+        processor: HuggingFace image processor the model was loaded with
+        img: RGB image
+        
+    Returns:
+        Dict of CPU tensors to pass to model(**inputs)
+    """
+    entry = _fused_transforms.get(id(processor))
+    if entry is None or entry[0] is not processor:
+        entry = (processor, FusedImageTransform.from_processor(processor))
+        _fused_transforms[id(processor)] = entry
+    
+    transform = entry[1]
+    if transform is None or img.mode != "RGB":
+        inputs = processor(images=img, return_tensors="pt")
+        return {k: v.to("cpu") for k, v in inputs.items()}
+    
+    import torch
+    return {"pixel_values": torch.from_numpy(transform(img))}
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent inference requests into batched forward passes.
+    
+    Requests submitted within max_wait_ms of each other (up to max_batch)
+    are handed to run_batch together on the executor, so N concurrent
+    uploads share one forward pass instead of paying for N. A full batch
+    is dispatched immediately; a lone request waits at most max_wait_ms.
+    """
+    
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        executor: Optional[Executor] = None,
+        max_batch: int = 8,
+        max_wait_ms: float = 20.0
+    ):
+        """
+        Args:
+            run_batch: Blocking function mapping a list of inputs to a list
+                of results in the same order
+            executor: Executor run_batch is called on (default: the loop's)
+            max_batch: Largest number of inputs per run_batch call
+            max_wait_ms: How long the first request waits for company
+        """
+        self._run_batch = run_batch
+        self._executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._running: Set[asyncio.Task] = set()
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one input and wait for its result.
+        
+        Args:
+            item: Input for run_batch
+            
+        Returns:
+            The result run_batch produced for this input
+        
+        Raises:
+            Whatever run_batch raised for the batch this input was in
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Dispatch pending requests, max_batch at a time."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            # Keep a reference so the task is not garbage-collected mid-run
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run one batch on the executor and resolve its futures."""
+        loop = asyncio.get_running_loop()
+        items = [item for item, _ in batch]
+        
+        try:
+            results = await loop.run_in_executor(self._executor, self._run_batch, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            # Skip requests whose client went away (future cancelled)
+            if not future.done():
+                future.set_result(result)
+
+
 class LazyModelLoader:
     """
     Lazy loader for ML models to minimize RAM usage.
@@ -344,6 +564,9 @@ class LazyModelLoader:
     _ai_detector_model = None
     _ai_detector_processor = None
     _models_loaded = False
+    # Serializes first loads: inference runs on worker threads, and two
+    # concurrent loads would hold the model in RAM twice
+    _load_lock = threading.Lock()
     
     @classmethod
     def _ensure_torch_available(cls) -> bool:
@@ -365,6 +588,34 @@ class LazyModelLoader:
             logger.warning("Transformers not installed - AI detection disabled")
             return False
     
+    @classmethod
+    def _prepare_for_cpu(cls, model: Any) -> Any:
+        """
+        Move a loaded model to CPU in eval mode, int8-quantizing its
+        Linear layers when QUANTIZE_CPU_MODELS is set.
+        
+        Args:
+            model: Freshly loaded transformers model
+            
+        Returns:
+            The model ready for CPU inference
+        """
+        import torch
+        
+        model = model.to("cpu")
+        model.eval()
+        
+        if QUANTIZE_CPU_MODELS:
+            try:
+                from torch.ao.quantization import quantize_dynamic
+                model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                logger.info("Quantized model Linear layers to int8")
+            except Exception as e:
+                # No quantized engine on this CPU/build: keep FP32
+                logger.warning(f"int8 quantization unavailable, using FP32: {e}")
+        
+        return model
+    
     @classmethod
     def load_ai_detector(cls) -> Tuple[Any, Any]:
         """
@@ -379,34 +630,42 @@ class LazyModelLoader:
         if cls._ai_detector_model is not None:
             return cls._ai_detector_processor, cls._ai_detector_model
         
-        if not cls._ensure_torch_available() or not cls._ensure_transformers_available():
-            return None, None
-        
-        try:
-            import torch
-            from transformers import AutoImageProcessor, AutoModelForImageClassification
-            
-            logger.info(f"Loading AI Detector model: {AI_DETECTOR_MODEL_NAME}")
+        with cls._load_lock:
+            # Another thread may have finished loading while we waited
+            if cls._ai_detector_model is not None:
+                return cls._ai_detector_processor, cls._ai_detector_model
             
-            cls._ai_detector_processor = AutoImageProcessor.from_pretrained(
-                AI_DETECTOR_MODEL_NAME
-            )
-            cls._ai_detector_model = AutoModelForImageClassification.from_pretrained(
-                AI_DETECTOR_MODEL_NAME,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                low_cpu_mem_usage=True
-            )
-            
-            # Force CPU execution for memory constraint
-            cls._ai_detector_model = cls._ai_detector_model.to("cpu")
-            cls._ai_detector_model.eval()
-            
-            logger.info("AI Detector model loaded successfully")
-            return cls._ai_detector_processor, cls._ai_detector_model
+            if not cls._ensure_torch_available() or not cls._ensure_transformers_available():
+                return None, None
             
-        except Exception as e:
-            logger.error(f"Failed to load AI Detector model: {e}")
-            return None, None
+            try:
+                import torch
+                from transformers import AutoImageProcessor, AutoModelForImageClassification
+                
+                logger.info(f"Loading AI Detector model: {AI_DETECTOR_MODEL_NAME}")
+                
+                processor = AutoImageProcessor.from_pretrained(
+                    AI_DETECTOR_MODEL_NAME
+                )
+                model = AutoModelForImageClassification.from_pretrained(
+                    AI_DETECTOR_MODEL_NAME,
+                    torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+                    low_cpu_mem_usage=True
+                )
+                
+                # Force CPU execution for memory constraint
+                model = cls._prepare_for_cpu(model)
+                
+                # Publish only the finished model; readers skip the lock
+                cls._ai_detector_processor = processor
+                cls._ai_detector_model = model
+                
+                logger.info("AI Detector model loaded successfully")
+                return processor, model
+                
+            except Exception as e:
+                logger.error(f"Failed to load AI Detector model: {e}")
+                return None, None
     
     @classmethod
     def load_vit_model(cls) -> Tuple[Any, Any]:
@@ -422,34 +681,42 @@ class LazyModelLoader:
         if cls._vit_model is not None:
             return cls._vit_processor, cls._vit_model
         
-        if not cls._ensure_torch_available() or not cls._ensure_transformers_available():
-            return None, None
-        
-        try:
-            import torch
-            from transformers import AutoImageProcessor, AutoModelForImageClassification
+        with cls._load_lock:
+            # Another thread may have finished loading while we waited
+            if cls._vit_model is not None:
+                return cls._vit_processor, cls._vit_model
             
-            logger.info(f"Loading ViT model: {VIT_MODEL_NAME}")
+            if not cls._ensure_torch_available() or not cls._ensure_transformers_available():
+                return None, None
             
-            cls._vit_processor = AutoImageProcessor.from_pretrained(
-                VIT_MODEL_NAME
-            )
-            cls._vit_model = AutoModelForImageClassification.from_pretrained(
-                VIT_MODEL_NAME,
-                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-                low_cpu_mem_usage=True
-            )
-            
-            # Force CPU execution for memory constraint
-            cls._vit_model = cls._vit_model.to("cpu")
-            cls._vit_model.eval()
-            
-            logger.info("ViT model loaded successfully")
-            return cls._vit_processor, cls._vit_model
-            
-        except Exception as e:
-            logger.error(f"Failed to load ViT model: {e}")
-            return None, None
+            try:
+                import torch
+                from transformers import AutoImageProcessor, AutoModelForImageClassification
+                
+                logger.info(f"Loading ViT model: {VIT_MODEL_NAME}")
+                
+                processor = AutoImageProcessor.from_pretrained(
+                    VIT_MODEL_NAME
+                )
+                model = AutoModelForImageClassification.from_pretrained(
+                    VIT_MODEL_NAME,
+                    torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+                    low_cpu_mem_usage=True
+                )
+                
+                # Force CPU execution for memory constraint
+                model = cls._prepare_for_cpu(model)
+                
+                # Publish only the finished model; readers skip the lock
+                cls._vit_processor = processor
+                cls._vit_model = model
+                
+                logger.info("ViT model loaded successfully")
+                return processor, model
+                
+            except Exception as e:
+                logger.error(f"Failed to load ViT model: {e}")
+                return None, None
     
     @classmethod
     def unload_models(cls):
@@ -459,6 +726,7 @@ class LazyModelLoader:
         cls._ai_detector_model = None
         cls._ai_detector_processor = None
         cls._models_loaded = False
+        _fused_transforms.clear()
         
         # Force garbage collection
         import gc
@@ -608,14 +876,12 @@ class LocalAIDetector:
         try:
             import torch
             
-            # Process image
-            inputs = processor(images=img, return_tensors="pt")
-            
-            # Move to CPU
-            inputs = {k: v.to("cpu") for k, v in inputs.items()}
+            # Process image (CPU tensors)
+            inputs = preprocess_image(processor, img)
             
-            # Run inference
-            with torch.no_grad():
+            # Run inference (inference_mode also skips autograd's
+            # version-counter bookkeeping, unlike no_grad)
+            with torch.inference_mode():
                 outputs = model(**inputs)
             
             # Get probabilities
@@ -13,17 +13,100 @@ Memory Optimized for 8GB RAM environments.
 """
 
 import os
-import base64
 import hashlib
-import secrets
-from typing import Tuple, Optional, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import Tuple, Optional, Dict, Any, List
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timezone
 
 from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+# pybase64 dispatches to SIMD codecs; the b64encode/b64decode API matches
+# the stdlib, which remains the fallback
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+
+# Successful verifications remembered per process (see verify_signature_cached)
+VERIFIED_CACHE_SIZE = 65536
+
+_verified_signatures: "OrderedDict[bytes, None]" = OrderedDict()
+_verified_lock = threading.Lock()
+
+
+class _NonceRing:
+    """
+    Hands out AES-GCM nonces sliced from a pre-generated CSPRNG buffer.
+    
+    One os.urandom() call fills `count` nonces, replacing a getrandom
+    syscall per encryption. Bytes are never handed out twice: the cursor
+    only advances and the buffer is replaced once exhausted. A forked child
+    discards the inherited buffer (see os.register_at_fork below) so parent
+    and child can never emit the same nonce under the same master key.
+    
+    Only for nonces - never use this for key material.
+    """
+    
+    def __init__(self, size: int = 12, count: int = 1024):
+        self._size = size
+        self._count = count
+        self._lock = threading.Lock()
+        self._buf = b""
+        self._pos = 0
+    
+    def next(self) -> bytes:
+        """Returns the next unused nonce, refilling the pool when empty."""
+        with self._lock:
+            if self._pos >= len(self._buf):
+                self._buf = os.urandom(self._size * self._count)
+                self._pos = 0
+            start = self._pos
+            self._pos = start + self._size
+            return self._buf[start:self._pos]
+    
+    def _reset_after_fork(self) -> None:
+        """Drops the inherited pool; the parent's lock may be held, so replace it."""
+        self._lock = threading.Lock()
+        self._buf = b""
+        self._pos = 0
+
+
+_NONCE_RING = _NonceRing()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_NONCE_RING._reset_after_fork)
+
+
+@lru_cache(maxsize=16)
+def _derive_master_key(supabase_key: str) -> bytes:
+    """
+    Derives a 256-bit encryption key from the service role key.
+    Uses HKDF-like derivation with SHA-256.
+    
+    Memoized: the result is a pure function of the key, and services are
+    constructed per request with the same credentials. The small maxsize
+    bounds the cache if callers pass many distinct keys; the returned
+    bytes are immutable, so sharing them is safe.
+    
+    Args:
+        supabase_key: Supabase service role key
+        
+    Returns:
+        32-byte key suitable for AES-256
+    """
+    # Use SHA-256 to derive a consistent key from the service role JWT
+    key_material = supabase_key.encode('utf-8')
+    # Add domain separation to prevent key reuse attacks
+    domain = b"CertiTrust-KMS-v2"
+    
+    return hashlib.sha256(domain + key_material).digest()
+
 
 @dataclass
 class InstitutionKeys:
@@ -83,23 +166,9 @@ class KMSService:
             raise KMSError("Supabase credentials not configured")
         
         # Derive master encryption key from service role key
-        self._master_key = self._derive_master_key()
-    
-    def _derive_master_key(self) -> bytes:
-        """
-        Derives a 256-bit encryption key from the service role key.
-        Uses HKDF-like derivation with SHA-256.
-        
-        Returns:
-            32-byte key suitable for AES-256
-        """
-        # Use SHA-256 to derive a consistent key from the service role JWT
-        key_material = self._supabase_key.encode('utf-8')
-        # Add domain separation to prevent key reuse attacks
-        domain = b"CertiTrust-KMS-v2"
-        
-        derived = hashlib.sha256(domain + key_material).digest()
-        return derived
+        self._master_key = _derive_master_key(self._supabase_key)
+        # Expand the AES key schedule once; nonces stay fresh per message
+        self._aesgcm = AESGCM(self._master_key)
     
     def generate_keypair(self) -> Tuple[ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey]:
         """
@@ -167,12 +236,11 @@ class KMSService:
             # Serialize private key to PEM
             pem_bytes = self.serialize_private_key(private_key)
             
-            # Generate random nonce
-            nonce = secrets.token_bytes(self.NONCE_SIZE)
+            # Fresh random nonce from the pre-generated CSPRNG pool
+            nonce = _NONCE_RING.next()
             
             # Encrypt with AES-256-GCM
-            aesgcm = AESGCM(self._master_key)
-            ciphertext = aesgcm.encrypt(nonce, pem_bytes, None)
+            ciphertext = self._aesgcm.encrypt(nonce, pem_bytes, None)
             
             # Encode to base64 for storage
             encrypted_b64 = base64.b64encode(ciphertext).decode('utf-8')
@@ -203,8 +271,7 @@ class KMSService:
             nonce = base64.b64decode(nonce_b64)
             
             # Decrypt with AES-256-GCM
-            aesgcm = AESGCM(self._master_key)
-            pem_bytes = aesgcm.decrypt(nonce, ciphertext, None)
+            pem_bytes = self._aesgcm.decrypt(nonce, ciphertext, None)
             
             # Load private key from PEM
             private_key = serialization.load_pem_private_key(pem_bytes, password=None)
@@ -287,6 +354,7 @@ class InstitutionSigner:
         # Lazy-loaded keys
         self._private_key: Optional[ed25519.Ed25519PrivateKey] = None
         self._public_key: Optional[ed25519.Ed25519PublicKey] = None
+        self._public_key_id: Optional[bytes] = None
         self._institution_data: Optional[Dict[str, Any]] = None
     
     def _fetch_institution(self) -> Dict[str, Any]:
@@ -334,6 +402,7 @@ class InstitutionSigner:
         
         self._private_key = self._kms.decrypt_private_key(encrypted_key, nonce)
         self._public_key = self._private_key.public_key()
+        self._public_key_id = _public_key_id(self._public_key)
     
     @property
     def institution_id(self) -> str:
@@ -379,13 +448,154 @@ class InstitutionSigner:
             True if valid, False otherwise
         """
         self._load_keys()
+        return verify_signature_cached(
+            self._public_key, data_hash, signature_b64, self._public_key_id
+        )
+    
+    def batch_verify(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Verifies many signatures, loading the institution key only once.
         
-        try:
-            signature = base64.b64decode(signature_b64)
-            self._public_key.verify(signature, data_hash.encode('utf-8'))
+        Args:
+            pairs: List of (data_hash, signature_b64) tuples
+            
+        Returns:
+            List of booleans, one per pair, in input order
+        """
+        self._load_keys()
+        return batch_verify_signatures(self._public_key, pairs, self._public_key_id)
+
+
+def _public_key_id(public_key: ed25519.Ed25519PublicKey) -> bytes:
+    """Raw 32-byte encoding of an Ed25519 public key."""
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.Raw,
+        format=serialization.PublicFormat.Raw
+    )
+
+
+def verify_signature_cached(
+    public_key: ed25519.Ed25519PublicKey,
+    data_hash: str,
+    signature_b64: str,
+    key_id: Optional[bytes] = None
+) -> bool:
+    """
+    Verifies an Ed25519 signature, skipping exact repeats of a past success.
+    
+    Public verification traffic re-checks the same (key, hash, signature)
+    triple many times. Successes are remembered in a bounded LRU keyed by
+    a digest of all three, so a repeat costs one SHA-256 instead of a
+    curve verification. The set is exact rather than probabilistic: a
+    false positive would accept an unverified signature. Failures are
+    never cached.
+    
+    Args:
+        public_key: Ed25519 public key
+        data_hash: Hex string of the document hash
+        signature_b64: Base64 encoded signature
+        key_id: Raw public key bytes, if the caller already has them
+        
+    Returns:
+        True if valid, False otherwise
+    """
+    if key_id is None:
+        key_id = _public_key_id(public_key)
+    message = data_hash.encode('utf-8')
+    cache_key = hashlib.sha256(
+        key_id + len(message).to_bytes(8, "big") + message + signature_b64.encode('utf-8')
+    ).digest()
+    
+    with _verified_lock:
+        if cache_key in _verified_signatures:
+            _verified_signatures.move_to_end(cache_key)
             return True
-        except Exception:
-            return False
+    
+    try:
+        public_key.verify(base64.b64decode(signature_b64), message)
+    except Exception:
+        return False
+    
+    with _verified_lock:
+        _verified_signatures[cache_key] = None
+        if len(_verified_signatures) > VERIFIED_CACHE_SIZE:
+            _verified_signatures.popitem(last=False)
+    return True
+
+
+def clear_verification_cache() -> None:
+    """
+    Forgets every remembered successful verification.
+    
+    Entries are keyed by the raw public key, so a rotated key never makes
+    a cached result wrong; clearing after a rotation just drops entries
+    for the retired key instead of waiting for LRU eviction.
+    """
+    with _verified_lock:
+        _verified_signatures.clear()
+
+
+def batch_verify_signatures(
+    public_key: ed25519.Ed25519PublicKey,
+    pairs: List[Tuple[str, str]],
+    key_id: Optional[bytes] = None
+) -> List[bool]:
+    """
+    Verifies a batch of Ed25519 signatures made with a single key.
+    
+    Args:
+        public_key: Ed25519 public key shared by the whole batch
+        pairs: List of (data_hash, signature_b64) tuples
+        key_id: Raw public key bytes, if the caller already has them
+        
+    Returns:
+        List of booleans, one per pair, in input order
+    """
+    if key_id is None:
+        key_id = _public_key_id(public_key)
+    return [
+        verify_signature_cached(public_key, data_hash, signature_b64, key_id)
+        for data_hash, signature_b64 in pairs
+    ]
+
+
+def verify_signatures_batch(
+    public_keys: List[ed25519.Ed25519PublicKey],
+    data_hashes: List[str],
+    signatures: List[str]
+) -> List[bool]:
+    """
+    Verifies a batch of Ed25519 signatures made with possibly different keys.
+    
+    Each distinct key object is encoded once for the whole batch, and every
+    check goes through the verified-signature cache. The cryptography
+    package has no true batch verification, so signatures are still
+    checked one by one and a bad one cannot mask the others.
+    
+    Args:
+        public_keys: Ed25519 public key for each signature
+        data_hashes: Hex string of the signed document hash for each signature
+        signatures: Base64 encoded signatures
+        
+    Returns:
+        List of booleans, one per signature, in input order
+        
+    Raises:
+        KMSError: If the three lists differ in length
+    """
+    if not (len(public_keys) == len(data_hashes) == len(signatures)):
+        raise KMSError("public_keys, data_hashes and signatures must be the same length")
+    
+    key_ids: Dict[int, bytes] = {}
+    results = []
+    
+    for public_key, data_hash, signature_b64 in zip(public_keys, data_hashes, signatures):
+        key_id = key_ids.get(id(public_key))
+        if key_id is None:
+            key_id = key_ids[id(public_key)] = _public_key_id(public_key)
+        results.append(verify_signature_cached(public_key, data_hash, signature_b64, key_id))
+    
+    return results
 
 
 # Legacy compatibility - wraps the old DocumentSigner interface
@@ -396,12 +606,26 @@ class LegacyDocumentSigner:
     This is for legacy single-tenant mode or development.
     """
     
-    def __init__(self):
-        self._private_key = self._load_private_key()
+    def __init__(self, key_pem: Optional[bytes] = None):
+        """
+        Args:
+            key_pem: Optional PEM-encoded Ed25519 private key. When given,
+                     it is used instead of ISSUER_PRIVATE_KEY (e.g. a fixed
+                     test keypair).
+        """
+        self._private_key = self._load_private_key(key_pem)
         self._public_key = self._private_key.public_key()
+        
+        # The key never changes after construction, so its encodings are
+        # computed once rather than per verification / PEM request
+        self._public_key_id = _public_key_id(self._public_key)
+        self._public_key_pem: Optional[str] = None
     
-    def _load_private_key(self) -> ed25519.Ed25519PrivateKey:
-        """Loads the ISSUER_PRIVATE_KEY from environment variables."""
+    def _load_private_key(self, key_pem: Optional[bytes] = None) -> ed25519.Ed25519PrivateKey:
+        """Loads an injected PEM key, else ISSUER_PRIVATE_KEY from the environment."""
+        if key_pem is not None:
+            return serialization.load_pem_private_key(key_pem, password=None)
+        
         key_b64 = os.getenv("ISSUER_PRIVATE_KEY")
         if key_b64:
             try:
@@ -427,17 +651,32 @@ class LegacyDocumentSigner:
     
     def verify_signature(self, data_hash: str, signature_b64: str) -> bool:
         """Verifies the signature of a document hash."""
-        try:
-            signature = base64.b64decode(signature_b64)
-            self._public_key.verify(signature, data_hash.encode('utf-8'))
-            return True
-        except Exception:
-            return False
+        return verify_signature_cached(
+            self._public_key, data_hash, signature_b64, self._public_key_id
+        )
+    
+    def batch_verify(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Verifies many (data_hash, signature_b64) pairs against this key.
+        
+        The public key is resolved once for the whole batch; each pair is
+        then checked independently, so one bad signature does not mask
+        the others.
+        
+        Args:
+            pairs: List of (data_hash, signature_b64) tuples
+            
+        Returns:
+            List of booleans, one per pair, in input order
+        """
+        return batch_verify_signatures(self._public_key, pairs, self._public_key_id)
     
     def get_public_key_pem(self) -> str:
-        """Returns the public key in PEM format."""
-        pem_bytes = self._public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        return pem_bytes.decode('utf-8')
+        """Returns the public key in PEM format (serialized once per signer)."""
+        if self._public_key_pem is None:
+            pem_bytes = self._public_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+            self._public_key_pem = pem_bytes.decode('utf-8')
+        return self._public_key_pem
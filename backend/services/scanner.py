@@ -13,14 +13,34 @@ Optimized for 8GB RAM environments.
 """
 
 import io
+import os
 import json
-import base64
-import hashlib
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, Tuple, List
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 
 import fitz  # PyMuPDF
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+# pybase64 dispatches to SIMD codecs; the b64encode/b64decode API matches
+# the stdlib, which remains the fallback
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+try:
+    from services.kms import verify_signature_cached, verify_signatures_batch
+    from qr_service import QRConfig, calculate_qr_position
+    from utils import secure_hash, CHUNK_SIZE
+except ImportError:
+    from backend.services.kms import verify_signature_cached, verify_signatures_batch
+    from backend.qr_service import QRConfig, calculate_qr_position
+    from backend.utils import secure_hash, CHUNK_SIZE
 
 # Try importing OpenCV (headless version preferred)
 try:
@@ -33,11 +53,23 @@ except ImportError:
 # Try importing pyzbar as fallback
 try:
     from pyzbar import pyzbar
+    from PIL import Image
     PYZBAR_AVAILABLE = True
 except ImportError:
     PYZBAR_AVAILABLE = False
 
 
+# Decoded QR text remembered per (file identity, page, dpi); see
+# PDFQRScanner.extract_qr_from_page
+QR_CACHE_SIZE = 1024
+
+_qr_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_qr_cache_lock = threading.Lock()
+
+# Raw Ed25519 signature length; anything else is rejected before verify()
+ED25519_SIGNATURE_SIZE = 64
+
+
 class ScannerError(Exception):
     """Base exception for scanner operations."""
     pass
@@ -226,17 +258,29 @@ class PDFQRScanner:
     FALLBACK_DPI = 150
     # Maximum image size to process (prevent OOM)
     MAX_IMAGE_PIXELS = 20_000_000  # ~20 megapixels
+    # Points added around the default stamp rect when rendering only that
+    # region, so the QR's quiet zone survives small placement differences
+    STAMP_REGION_PADDING = 18
     
-    def __init__(self, dpi: int = RENDER_DPI):
+    def __init__(self, dpi: int = RENDER_DPI, min_dpi: Optional[int] = FALLBACK_DPI):
         """
         Initialize scanner with specified DPI.
         
         Args:
             dpi: Rendering DPI (default 300 for reliable detection)
+            min_dpi: DPI tried first when rendering; escalates to dpi only if
+                decoding fails there (None renders at dpi only)
         """
         self.dpi = dpi
+        self.min_dpi = min_dpi
         self._check_dependencies()
     
+    def _render_dpis(self) -> Tuple[int, ...]:
+        """Rendering DPIs to try, cheapest first."""
+        if self.min_dpi and self.min_dpi < self.dpi:
+            return (self.min_dpi, self.dpi)
+        return (self.dpi,)
+    
     def _check_dependencies(self):
         """Verify required dependencies are available."""
         if not OPENCV_AVAILABLE and not PYZBAR_AVAILABLE:
@@ -247,14 +291,16 @@ class PDFQRScanner:
     def _render_page_to_image(
         self, 
         page: fitz.Page, 
-        dpi: int
+        dpi: int,
+        clip: Optional[fitz.Rect] = None
     ) -> Tuple[bytes, int, int]:
         """
-        Renders PDF page to PNG image bytes at specified DPI.
+        Renders PDF page (or a region of it) to PNG image bytes at specified DPI.
         
         Args:
             page: PyMuPDF page object
             dpi: Target DPI for rendering
+            clip: Optional page region to render instead of the whole page
             
         Returns:
             Tuple of (png_bytes, width, height)
@@ -264,7 +310,7 @@ class PDFQRScanner:
         matrix = fitz.Matrix(zoom, zoom)
         
         # Render to pixmap
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
+        pix = page.get_pixmap(matrix=matrix, alpha=False, clip=clip)
         
         # Check if image is too large
         if pix.width * pix.height > self.MAX_IMAGE_PIXELS:
@@ -272,7 +318,7 @@ class PDFQRScanner:
             # Fall back to lower DPI
             zoom = self.FALLBACK_DPI / 72.0
             matrix = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=matrix, alpha=False)
+            pix = page.get_pixmap(matrix=matrix, alpha=False, clip=clip)
         
         png_bytes = pix.tobytes("png")
         width, height = pix.width, pix.height
@@ -349,8 +395,6 @@ class PDFQRScanner:
             return None
         
         try:
-            from PIL import Image
-            
             img = Image.open(io.BytesIO(img_bytes))
             results = pyzbar.decode(img)
             
@@ -416,18 +460,28 @@ class PDFQRScanner:
     def extract_qr_from_page(
         self, 
         pdf_path: str, 
-        page_num: int = 0
+        page_num: int = 0,
+        region_hint: Optional[fitz.Rect] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Extracts and decodes QR code from a specific PDF page.
         
         Uses a multi-strategy approach:
         1. First try to extract embedded images directly (most reliable)
-        2. Fall back to full page rendering if no embedded QR found
+        2. Fall back to page rendering if no embedded QR found: first only
+           the stamp region (region_hint, or where stamp_document puts the
+           QR by default), then the full page
+        
+        Rendering and decoding dominate the cost, so successfully decoded
+        text is cached per file identity: device, inode, size and
+        nanosecond mtime/ctime, plus page and DPI. Any write to the file
+        changes the key; each call still returns a freshly parsed dict.
+        Misses are not cached so a later attempt can still succeed.
         
         Args:
             pdf_path: Path to PDF file
             page_num: Page number (0-indexed)
+            region_hint: Optional page rect (in points) expected to hold the QR
             
         Returns:
             Decoded JSON dict or None if not found
@@ -436,6 +490,75 @@ class PDFQRScanner:
             QRNotFoundError: If no QR code found
             QRDecodeError: If QR found but could not decode
         """
+        identity = self._file_identity(pdf_path)
+        qr_data = self._cached_decode(
+            identity, page_num,
+            lambda: self._decode_page(pdf_path, page_num, region_hint),
+            region_hint
+        )
+        return self._parse_qr_json(qr_data)
+    
+    @staticmethod
+    def _file_identity(pdf_path: str) -> Optional[tuple]:
+        """Returns the stat-based cache identity of a file, or None if unreadable."""
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns
+    
+    def _cached_decode(
+        self,
+        identity: Optional[tuple],
+        page_num: int,
+        decode,
+        region_hint: Optional[fitz.Rect] = None
+    ) -> Optional[str]:
+        """Returns cached QR text for a page, calling decode() on a miss."""
+        region = tuple(region_hint) if region_hint is not None else None
+        key = None if identity is None else identity + (page_num, self.dpi, region)
+        
+        with _qr_cache_lock:
+            if key is not None and key in _qr_cache:
+                _qr_cache.move_to_end(key)
+                return _qr_cache[key]
+        
+        qr_data = decode()
+        if key is not None and qr_data:
+            with _qr_cache_lock:
+                _qr_cache[key] = qr_data
+                if len(_qr_cache) > QR_CACHE_SIZE:
+                    _qr_cache.popitem(last=False)
+        return qr_data
+    
+    @staticmethod
+    def _parse_qr_json(qr_data: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Parses decoded QR text, raising QRDecodeError for invalid JSON."""
+        if not qr_data:
+            return None
+        
+        try:
+            return json.loads(qr_data)
+        except json.JSONDecodeError as e:
+            raise QRDecodeError(f"QR contains invalid JSON: {e}")
+    
+    def _decode_page(
+        self,
+        pdf_path: str,
+        page_num: int,
+        region_hint: Optional[fitz.Rect] = None
+    ) -> Optional[str]:
+        """
+        Decodes the raw QR text on one page, uncached.
+        
+        Args:
+            pdf_path: Path to PDF file
+            page_num: Page number (0-indexed)
+            region_hint: Optional page rect expected to hold the QR
+            
+        Returns:
+            Decoded QR string or None if not found
+        """
         doc = None
         try:
             doc = fitz.open(pdf_path)
@@ -443,13 +566,44 @@ class PDFQRScanner:
             if page_num >= len(doc):
                 raise ScannerError(f"Page {page_num} not found (doc has {len(doc)} pages)")
             
-            # Strategy 1: Try embedded image extraction (most reliable)
-            qr_data = self._decode_embedded_images(doc, page_num)
+            return self._decode_doc_page(doc, page_num, region_hint)
+                
+        finally:
+            if doc:
+                doc.close()
+    
+    def _decode_doc_page(
+        self,
+        doc: fitz.Document,
+        page_num: int,
+        region_hint: Optional[fitz.Rect] = None
+    ) -> Optional[str]:
+        """
+        Decodes the raw QR text on one page of an already-open document.
+        
+        Args:
+            doc: PyMuPDF document
+            page_num: Page number (0-indexed, must exist)
+            region_hint: Optional page rect expected to hold the QR
             
-            # Strategy 2: Fall back to full page rendering
-            if not qr_data:
-                page = doc[page_num]
-                img_bytes, width, height = self._render_page_to_image(page, self.dpi)
+        Returns:
+            Decoded QR string or None if not found
+        """
+        # Strategy 1: Try embedded image extraction (most reliable)
+        qr_data = self._decode_embedded_images(doc, page_num)
+        
+        # Strategy 2: Fall back to rendering, stamp region before full page,
+        # each at min_dpi first (a quarter of the pixels) and then full dpi
+        if not qr_data:
+            page = doc[page_num]
+            region = self._stamp_region(page, region_hint)
+            attempts = [
+                (clip, dpi)
+                for clip in ((region, None) if not region.is_empty else (None,))
+                for dpi in self._render_dpis()
+            ]
+            for clip, dpi in attempts:
+                img_bytes, width, height = self._render_page_to_image(page, dpi, clip)
                 
                 # Try pyzbar first - handles Level H QR codes better
                 if PYZBAR_AVAILABLE:
@@ -461,19 +615,41 @@ class PDFQRScanner:
                 
                 # Cleanup
                 img_bytes = None
-            
-            if not qr_data:
-                return None
-            
-            # Parse JSON
-            try:
-                return json.loads(qr_data)
-            except json.JSONDecodeError as e:
-                raise QRDecodeError(f"QR contains invalid JSON: {e}")
                 
-        finally:
-            if doc:
-                doc.close()
+                if qr_data:
+                    break
+        
+        return qr_data or None
+    
+    def _stamp_region(
+        self,
+        page: fitz.Page,
+        region_hint: Optional[fitz.Rect] = None
+    ) -> fitz.Rect:
+        """
+        Returns the page region to render first when looking for the QR.
+        
+        Without a hint this is where stamp_document places the QR with the
+        default QRConfig, padded by STAMP_REGION_PADDING and clipped to the
+        page; at 300 DPI that is a few percent of a full-page render.
+        
+        Args:
+            page: PyMuPDF page object
+            region_hint: Optional page rect expected to hold the QR
+            
+        Returns:
+            Region to render, in page coordinates
+        """
+        if region_hint is not None:
+            return fitz.Rect(region_hint) & page.rect
+        
+        config = QRConfig()
+        rect = fitz.Rect(calculate_qr_position(
+            page.rect.width, page.rect.height,
+            config.size, config.margin, config.position
+        ))
+        pad = self.STAMP_REGION_PADDING
+        return (rect + (-pad, -pad, pad, pad)) & page.rect
     
     def scan_all_pages(
         self, 
@@ -482,19 +658,28 @@ class PDFQRScanner:
         """
         Scans all pages for QR code, returns first found.
         
+        The document is opened once and pages are decoded from that handle
+        in order, stopping at the first QR; previously decoded pages come
+        from the same cache as extract_qr_from_page.
+        
         Args:
             pdf_path: Path to PDF file
             
         Returns:
             Tuple of (decoded_dict, page_number) or (None, -1)
         """
+        identity = self._file_identity(pdf_path)
         doc = None
         try:
             doc = fitz.open(pdf_path)
             
             for page_num in range(len(doc)):
                 try:
-                    result = self.extract_qr_from_page(pdf_path, page_num)
+                    qr_data = self._cached_decode(
+                        identity, page_num,
+                        lambda: self._decode_doc_page(doc, page_num)
+                    )
+                    result = self._parse_qr_json(qr_data)
                     if result:
                         return result, page_num
                 except Exception:
@@ -515,8 +700,8 @@ class CleanDocumentHasher:
     and calculates the hash of the byte stream excluding that object.
     """
     
-    # Chunk size for memory-efficient hashing
-    CHUNK_SIZE = 65536  # 64KB
+    # Chunk size for memory-efficient hashing (shared with utils.secure_hash)
+    CHUNK_SIZE = CHUNK_SIZE
     
     def calculate_clean_hash(
         self, 
@@ -544,9 +729,9 @@ class CleanDocumentHasher:
     
     def _hash_file_chunked(self, file_path: str) -> str:
         """
-        Calculates SHA-256 hash in 64KB chunks.
+        Calculates SHA-256 hash of a file via utils.secure_hash.
         
-        Memory-efficient implementation.
+        Memory-efficient: memory-mapped or streamed in CHUNK_SIZE pieces.
         
         Args:
             file_path: Path to file
@@ -554,13 +739,7 @@ class CleanDocumentHasher:
         Returns:
             Hex digest of SHA-256 hash
         """
-        sha256 = hashlib.sha256()
-        
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
-                sha256.update(chunk)
-        
-        return sha256.hexdigest()
+        return secure_hash(file_path)
     
     def calculate_original_hash_from_stripped_pdf(
         self,
@@ -606,6 +785,28 @@ class CleanDocumentHasher:
                 doc.close()
 
 
+@lru_cache(maxsize=4096)
+def _load_ed25519_public_key(public_key_pem: str) -> Optional[ed25519.Ed25519PublicKey]:
+    """
+    Parses a PEM public key, memoized per PEM string.
+    
+    PEM/DER parsing costs more than verifying a short Ed25519 message, and
+    the same few issuer keys are resolved for every document. Key objects
+    are immutable, so cached instances are safely shared across threads.
+    
+    Args:
+        public_key_pem: PEM encoded public key
+        
+    Returns:
+        Ed25519PublicKey, or None if the PEM is invalid or not Ed25519
+    """
+    try:
+        public_key = serialization.load_pem_public_key(public_key_pem.encode('utf-8'))
+    except Exception:
+        return None
+    return public_key if isinstance(public_key, ed25519.Ed25519PublicKey) else None
+
+
 def verify_document_signature(
     document_hash: str,
     signature_b64: str,
@@ -623,52 +824,64 @@ def verify_document_signature(
         True if signature is valid
     """
     try:
-        from cryptography.hazmat.primitives import serialization
-        from cryptography.hazmat.primitives.asymmetric import ed25519
-        
-        # Load public key
-        public_key = serialization.load_pem_public_key(public_key_pem.encode('utf-8'))
+        # Load public key (parsed once per distinct PEM)
+        public_key = _load_ed25519_public_key(public_key_pem)
         
-        if not isinstance(public_key, ed25519.Ed25519PublicKey):
+        if public_key is None:
             return False
         
-        # Decode signature
-        signature = base64.b64decode(signature_b64)
-        
-        # Verify (the hash string was signed as UTF-8 bytes)
-        message = document_hash.encode('utf-8')
-        
-        try:
-            public_key.verify(signature, message)
-            return True
-        except Exception:
+        # Truncated or padded signatures fail without raising out of verify()
+        if len(base64.b64decode(signature_b64)) != ED25519_SIGNATURE_SIZE:
             return False
+        
+        # Verify (the hash string was signed as UTF-8 bytes); repeats of a
+        # past success are answered from the kms verified-signature cache
+        return verify_signature_cached(public_key, document_hash, signature_b64)
             
     except Exception:
         return False
 
 
-def scan_and_verify(
-    pdf_path: str,
-    fetch_institution_callback=None
-) -> ScanResult:
+def verify_document_signatures_batch(
+    items: List[Tuple[str, str, str]]
+) -> List[bool]:
     """
-    Complete scan and verification pipeline.
+    Verifies many document signatures, loading each distinct key once.
     
-    1. Extract QR code from PDF
-    2. Parse and validate payload
-    3. Verify signature if institution can be fetched
+    Each public key PEM is parsed once (see _load_ed25519_public_key) and
+    the signatures are checked through kms.verify_signatures_batch, which
+    shares its verified-signature cache with the signers. Items with an
+    unparsable or non-Ed25519 key are reported invalid.
     
     Args:
-        pdf_path: Path to stamped PDF
-        fetch_institution_callback: Async function to fetch institution by ID
-            Expected signature: (institution_id: str) -> Dict with public_key_pem
-            
+        items: (document_hash, signature_b64, public_key_pem) tuples
+        
     Returns:
-        ScanResult with all verification details
+        List of booleans, one per item, in input order
     """
-    scanner = PDFQRScanner()
+    indices, public_keys, data_hashes, signatures = [], [], [], []
+    
+    for i, (document_hash, signature_b64, public_key_pem) in enumerate(items):
+        public_key = _load_ed25519_public_key(public_key_pem)
+        if public_key is not None:
+            indices.append(i)
+            public_keys.append(public_key)
+            data_hashes.append(document_hash)
+            signatures.append(signature_b64)
     
+    results = [False] * len(items)
+    for i, valid in zip(indices, verify_signatures_batch(public_keys, data_hashes, signatures)):
+        results[i] = valid
+    return results
+
+
+def _scan_payload(pdf_path: str, scanner: "PDFQRScanner") -> ScanResult:
+    """
+    Extracts and parses the QR payload of a stamped PDF (no signature check).
+    
+    Returns a successful ScanResult carrying the payload, or a failed one
+    describing why no payload could be read.
+    """
     try:
         # Step 1: Extract QR
         qr_data = scanner.extract_qr_from_page(pdf_path, page_num=0)
@@ -702,7 +915,7 @@ def scan_and_verify(
         # because the QR was added after signing.
         # The QR contains the ORIGINAL document hash.
         
-        result = ScanResult(
+        return ScanResult(
             success=True,
             error_code=VerificationErrorCode.SUCCESS,
             message="QR payload extracted successfully",
@@ -712,38 +925,6 @@ def scan_and_verify(
             signature_valid=None
         )
         
-        # Step 4: Verify signature if callback provided
-        if fetch_institution_callback:
-            try:
-                institution = fetch_institution_callback(payload.issuer_id)
-                
-                if institution and 'public_key_pem' in institution:
-                    sig_valid = verify_document_signature(
-                        payload.document_hash,
-                        payload.signature,
-                        institution['public_key_pem']
-                    )
-                    
-                    result.signature_valid = sig_valid
-                    result.institution_name = institution.get('name')
-                    
-                    if sig_valid:
-                        result.message = "Document verified successfully"
-                    else:
-                        result.success = False
-                        result.error_code = VerificationErrorCode.SIGNATURE_MISMATCH
-                        result.message = "Signature verification failed"
-                else:
-                    result.success = False
-                    result.error_code = VerificationErrorCode.INSTITUTION_NOT_FOUND
-                    result.message = f"Institution {payload.issuer_id} not found"
-                    
-            except Exception as e:
-                # Log but don't fail - return partial result
-                result.message = f"Could not verify signature: {e}"
-        
-        return result
-        
     except ScannerError as e:
         return ScanResult(
             success=False,
@@ -756,3 +937,128 @@ def scan_and_verify(
             error_code=VerificationErrorCode.INTERNAL_ERROR,
             message=f"Unexpected error: {e}"
         )
+
+
+def _apply_signature_result(
+    result: ScanResult,
+    institution: Optional[Dict[str, Any]],
+    sig_valid: Optional[bool]
+) -> None:
+    """Records the institution lookup and signature outcome on a scan result."""
+    if institution and 'public_key_pem' in institution:
+        result.signature_valid = sig_valid
+        result.institution_name = institution.get('name')
+        
+        if sig_valid:
+            result.message = "Document verified successfully"
+        else:
+            result.success = False
+            result.error_code = VerificationErrorCode.SIGNATURE_MISMATCH
+            result.message = "Signature verification failed"
+    else:
+        result.success = False
+        result.error_code = VerificationErrorCode.INSTITUTION_NOT_FOUND
+        result.message = f"Institution {result.payload.issuer_id} not found"
+
+
+def scan_and_verify(
+    pdf_path: str,
+    fetch_institution_callback=None
+) -> ScanResult:
+    """
+    Complete scan and verification pipeline.
+    
+    1. Extract QR code from PDF
+    2. Parse and validate payload
+    3. Verify signature if institution can be fetched
+    
+    Args:
+        pdf_path: Path to stamped PDF
+        fetch_institution_callback: Async function to fetch institution by ID
+            Expected signature: (institution_id: str) -> Dict with public_key_pem
+            
+    Returns:
+        ScanResult with all verification details
+    """
+    result = _scan_payload(pdf_path, PDFQRScanner())
+    
+    # Step 4: Verify signature if callback provided
+    if result.payload is None or not fetch_institution_callback:
+        return result
+    
+    try:
+        institution = fetch_institution_callback(result.payload.issuer_id)
+        
+        sig_valid = None
+        if institution and 'public_key_pem' in institution:
+            sig_valid = verify_document_signature(
+                result.payload.document_hash,
+                result.payload.signature,
+                institution['public_key_pem']
+            )
+        
+        _apply_signature_result(result, institution, sig_valid)
+        
+    except Exception as e:
+        # Log but don't fail - return partial result
+        result.message = f"Could not verify signature: {e}"
+    
+    return result
+
+
+def scan_and_verify_batch(
+    pdf_paths: List[str],
+    fetch_institution_callback=None
+) -> List[ScanResult]:
+    """
+    Scan and verification pipeline for many PDFs at once.
+    
+    Same per-document result as scan_and_verify, but each issuer is
+    fetched once and all signatures are checked together through
+    verify_document_signatures_batch, so shared institution keys are
+    parsed once for the whole batch.
+    
+    Args:
+        pdf_paths: Paths to stamped PDFs
+        fetch_institution_callback: Function to fetch institution by ID
+            Expected signature: (institution_id: str) -> Dict with public_key_pem
+            
+    Returns:
+        List of ScanResult, one per path, in input order
+    """
+    scanner = PDFQRScanner()
+    results = [_scan_payload(path, scanner) for path in pdf_paths]
+    
+    if not fetch_institution_callback:
+        return results
+    
+    institutions: Dict[str, Any] = {}
+    pending: List[Tuple[ScanResult, Dict[str, Any]]] = []
+    
+    for result in results:
+        if result.payload is None:
+            continue
+        
+        issuer_id = result.payload.issuer_id
+        if issuer_id not in institutions:
+            try:
+                institutions[issuer_id] = fetch_institution_callback(issuer_id)
+            except Exception as e:
+                institutions[issuer_id] = e
+        institution = institutions[issuer_id]
+        
+        if isinstance(institution, Exception):
+            result.message = f"Could not verify signature: {institution}"
+        elif institution and 'public_key_pem' in institution:
+            pending.append((result, institution))
+        else:
+            _apply_signature_result(result, institution, None)
+    
+    verdicts = verify_document_signatures_batch([
+        (result.payload.document_hash, result.payload.signature, institution['public_key_pem'])
+        for result, institution in pending
+    ])
+    for (result, institution), sig_valid in zip(pending, verdicts):
+        _apply_signature_result(result, institution, sig_valid)
+    
+    return results
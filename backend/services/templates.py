@@ -11,6 +11,7 @@ Includes Merkle Tree hashing for multi-page PDF tamper localization.
 Memory optimized for 8GB RAM environments.
 """
 
+import copy
 import os
 import json
 import hashlib
@@ -19,6 +20,7 @@ from typing import Dict, Any, List, Optional, Tuple, Generator
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
+from types import MappingProxyType
 import uuid
 
 
@@ -112,9 +114,17 @@ class MerkleTree:
     
     @staticmethod
     def hash_pair(left: str, right: str) -> str:
-        """Hash two node hashes together."""
-        combined = (left + right).encode('utf-8')
-        return hashlib.sha256(combined).hexdigest()
+        """
+        Hash two node hashes together.
+        
+        Equivalent to sha256((left + right).encode('utf-8')), but feeds the
+        two halves to one hasher instead of building a concatenated copy.
+        Already-encoded bytes are accepted as-is.
+        """
+        h = hashlib.sha256()
+        h.update(left.encode('utf-8') if isinstance(left, str) else left)
+        h.update(right.encode('utf-8') if isinstance(right, str) else right)
+        return h.hexdigest()
     
     def _build_tree(self):
         """Builds the Merkle tree from leaf hashes."""
@@ -125,26 +135,22 @@ class MerkleTree:
         n = len(self._page_hashes)
         padded_size = 2 ** math.ceil(math.log2(max(n, 1)))
         
-        # Create leaf level
-        leaves = self._page_hashes.copy()
-        
-        # Pad with duplicate of last hash if needed
-        while len(leaves) < padded_size:
-            leaves.append(leaves[-1])
+        # Create leaf level, padded with duplicates of the last hash
+        leaves = self._page_hashes + [self._page_hashes[-1]] * (padded_size - n)
         
         self._tree_levels = [leaves]
         
-        # Build tree bottom-up
+        # Build tree bottom-up. Levels are always even-sized after padding,
+        # so siblings pair up by slicing; this inlines hash_pair to avoid a
+        # method call and index arithmetic per node.
+        sha256 = hashlib.sha256
         current_level = leaves
         while len(current_level) > 1:
-            next_level = []
-            for i in range(0, len(current_level), 2):
-                left = current_level[i]
-                right = current_level[i + 1] if i + 1 < len(current_level) else left
-                parent_hash = self.hash_pair(left, right)
-                next_level.append(parent_hash)
-            self._tree_levels.append(next_level)
-            current_level = next_level
+            current_level = [
+                sha256((left + right).encode('utf-8')).hexdigest()
+                for left, right in zip(current_level[0::2], current_level[1::2])
+            ]
+            self._tree_levels.append(current_level)
         
         # Root is the only node at the top level
         self._root = MerkleNode(hash=current_level[0]) if current_level else None
@@ -237,11 +243,18 @@ class MerkleTree:
         Returns:
             List of 1-indexed page numbers that differ
         """
-        tampered = []
-        for i, (original, current) in enumerate(zip(original_hashes, self._page_hashes)):
-            if original != current:
-                tampered.append(i + 1)
-        return tampered
+        return [
+            page
+            for page, (original, current)
+            in enumerate(zip(original_hashes, self._page_hashes), start=1)
+            if original != current
+        ]
+
+
+# Page text dicts are large and encoding them dominates page hashing. One
+# shared encoder matches json.dumps(..., sort_keys=True) byte for byte;
+# get_text() output is a tree of fresh dicts/lists, so cycle checks are moot.
+_PAGE_JSON = json.JSONEncoder(sort_keys=True, check_circular=False)
 
 
 def extract_page_hashes_from_pdf(pdf_path: str) -> Generator[PageHash, None, None]:
@@ -265,7 +278,7 @@ def extract_page_hashes_from_pdf(pdf_path: str) -> Generator[PageHash, None, Non
             
             # Get page content as bytes (includes text, images, etc.)
             page_bytes = page.get_text("rawdict", flags=fitz.TEXT_PRESERVE_WHITESPACE)
-            page_json = json.dumps(page_bytes, sort_keys=True).encode('utf-8')
+            page_json = _PAGE_JSON.encode(page_bytes).encode('utf-8')
             
             # Hash the page content
             page_hash = hashlib.sha256(page_json).hexdigest()
@@ -320,7 +333,8 @@ class W3CVerifiableCredential:
         issuance_date: Optional[str] = None,
         expiration_date: Optional[str] = None,
         document_hash: Optional[str] = None,
-        signature: Optional[str] = None
+        signature: Optional[str] = None,
+        created_at: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Creates a W3C Verifiable Credential for academic credentials.
@@ -339,19 +353,17 @@ class W3CVerifiableCredential:
             expiration_date: Optional expiration date
             document_hash: SHA-256 hash of associated document
             signature: Ed25519 signature (base64)
+            created_at: Timestamp for proof.created (and the default
+                        issuance date); defaults to now
             
         Returns:
             W3C VC compliant JSON-LD document
         """
-        now = datetime.now(timezone.utc).isoformat()
+        now = created_at or datetime.now(timezone.utc).isoformat()
         
         credential = {
-            "@context": [
-                W3CVerifiableCredential.CONTEXT_VC_V2,
-                W3CVerifiableCredential.CONTEXT_ACADEMIC
-            ],
+            **_credential_fields(_ACADEMIC_SKELETON),
             "id": f"urn:uuid:{credential_id}",
-            "type": ["VerifiableCredential", "AcademicCredential"],
             "issuer": {
                 "id": issuer_id,
                 "name": issuer_name
@@ -395,7 +407,9 @@ class W3CVerifiableCredential:
         gender: str,
         address: Dict[str, str],
         photo_hash: Optional[str] = None,
-        signature: Optional[str] = None
+        signature: Optional[str] = None,
+        issuance_date: Optional[str] = None,
+        created_at: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Creates a UIDAI-compliant Aadhaar e-KYC credential.
@@ -412,30 +426,23 @@ class W3CVerifiableCredential:
             address: Address components
             photo_hash: SHA-256 hash of photo (not the photo itself)
             signature: Ed25519 signature
+            issuance_date: Date credential was issued (defaults to now)
+            created_at: Timestamp for proof.created (and the default
+                        issuance date); defaults to now
             
         Returns:
             Aadhaar e-KYC compliant JSON document
         """
-        now = datetime.now(timezone.utc).isoformat()
+        now = created_at or datetime.now(timezone.utc).isoformat()
         
         credential = {
-            "@context": [
-                W3CVerifiableCredential.CONTEXT_VC_V2,
-                {
-                    "@context": {
-                        "AadhaarCredential": "https://uidai.gov.in/vocab#AadhaarCredential",
-                        "maskedAadhaar": "https://uidai.gov.in/vocab#maskedAadhaar",
-                        "photoHash": "https://uidai.gov.in/vocab#photoHash"
-                    }
-                }
-            ],
+            **_credential_fields(_AADHAAR_SKELETON),
             "id": f"urn:uuid:{credential_id}",
-            "type": ["VerifiableCredential", "AadhaarCredential"],
             "issuer": {
                 "id": issuer_id,
                 "name": "Unique Identification Authority of India"
             },
-            "issuanceDate": now,
+            "issuanceDate": issuance_date or now,
             "credentialSubject": {
                 "maskedAadhaar": masked_aadhaar,
                 "name": name,
@@ -460,6 +467,62 @@ class W3CVerifiableCredential:
         return credential
 
 
+# Invariant top-level fields of each credential type. "id" is a
+# placeholder so the merged document keeps its original key order. Lists
+# are stored as tuples; _credential_fields gives every credential its own
+# copies, so mutating one issued credential never leaks into the next.
+_ACADEMIC_SKELETON = MappingProxyType({
+    "@context": (
+        W3CVerifiableCredential.CONTEXT_VC_V2,
+        W3CVerifiableCredential.CONTEXT_ACADEMIC
+    ),
+    "id": None,
+    "type": ("VerifiableCredential", "AcademicCredential"),
+})
+
+_AADHAAR_SKELETON = MappingProxyType({
+    "@context": (
+        W3CVerifiableCredential.CONTEXT_VC_V2,
+        {
+            "@context": {
+                "AadhaarCredential": "https://uidai.gov.in/vocab#AadhaarCredential",
+                "maskedAadhaar": "https://uidai.gov.in/vocab#maskedAadhaar",
+                "photoHash": "https://uidai.gov.in/vocab#photoHash"
+            }
+        }
+    ),
+    "id": None,
+    "type": ("VerifiableCredential", "AadhaarCredential"),
+})
+
+_GENERIC_SKELETON = MappingProxyType({
+    "@context": (W3CVerifiableCredential.CONTEXT_VC_V2,),
+    "id": None,
+    "type": ("VerifiableCredential",),
+})
+
+
+def _credential_fields(skeleton: MappingProxyType) -> Dict[str, Any]:
+    """
+    Fresh top-level fields for one credential from a skeleton.
+    
+    Args:
+        skeleton: One of the *_SKELETON mappings
+        
+    Returns:
+        Dict in skeleton key order with its own @context and type lists
+        (inline context dicts deep-copied)
+    """
+    return {
+        **skeleton,
+        "@context": [
+            copy.deepcopy(context) if isinstance(context, dict) else context
+            for context in skeleton["@context"]
+        ],
+        "type": list(skeleton["type"]),
+    }
+
+
 class TemplateEngine:
     """
     Dynamic document template engine.
@@ -616,22 +679,137 @@ class TemplateEngine:
         else:
             # Generic credential
             now = datetime.now(timezone.utc).isoformat()
-            return {
-                "@context": [W3CVerifiableCredential.CONTEXT_VC_V2],
-                "id": f"urn:uuid:{credential_id}",
-                "type": ["VerifiableCredential"],
-                "issuer": {
-                    "id": f"did:certitrust:{institution_id}",
-                    "name": institution_name
-                },
-                "issuanceDate": now,
-                "credentialSubject": credential_data,
-                "proof": {
-                    "type": "Ed25519Signature2020",
-                    "created": now,
-                    "proofValue": signature
-                } if signature else None
-            }
+            return self._build_generic_credential(
+                credential_id, institution_id, institution_name,
+                credential_data, signature, now
+            )
+    
+    def generate_credentials(
+        self,
+        template_type: DocumentType,
+        institution_id: str,
+        institution_name: str,
+        records: List[Dict[str, Any]],
+        signatures: Optional[List[str]] = None,
+        document_hashes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generates credentials for a batch of records in one pass.
+        
+        Bulk-issuance counterpart of generate_credential(): credential IDs
+        and fallback subject IDs are drawn from a single os.urandom() call, the timestamp (used for
+        both issuanceDate and proof.created) is taken once for the whole
+        batch, and the template-type branch is
+        resolved before the loop instead of per record.
+        
+        Args:
+            template_type: Type of credential to generate
+            institution_id: Issuing institution ID
+            institution_name: Name of issuing institution
+            records: Credential data, one dict per credential
+            signatures: Optional signatures, aligned with records
+            document_hashes: Optional document hashes, aligned with records
+            
+        Returns:
+            List of generated credential documents, in record order
+            
+        Raises:
+            TemplateError: If signatures/document_hashes do not align with records
+        """
+        n = len(records)
+        if signatures is not None and len(signatures) != n:
+            raise TemplateError("signatures must have one entry per record")
+        if document_hashes is not None and len(document_hashes) != n:
+            raise TemplateError("document_hashes must have one entry per record")
+        
+        signatures = signatures or [None] * n
+        document_hashes = document_hashes or [None] * n
+        
+        # One urandom call covers every credential ID plus a fallback
+        # subject ID per record
+        raw = os.urandom(32 * n)
+        ids = [
+            str(uuid.UUID(bytes=raw[i * 16:(i + 1) * 16], version=4))
+            for i in range(2 * n)
+        ]
+        credential_ids, subject_ids = ids[:n], ids[n:]
+        now = datetime.now(timezone.utc).isoformat()
+        
+        if template_type == DocumentType.ACADEMIC or template_type == DocumentType.W3C_VC:
+            issuer_id = f"did:certitrust:{institution_id}"
+            create = W3CVerifiableCredential.create_academic_credential
+            return [
+                create(
+                    credential_id=credential_id,
+                    issuer_id=issuer_id,
+                    issuer_name=institution_name,
+                    subject_id=data.get("subject_id") or f"did:example:{subject_uuid}",
+                    subject_name=data.get("subject_name", ""),
+                    degree=data.get("degree", ""),
+                    major=data.get("major", ""),
+                    graduation_date=data.get("graduation_date", ""),
+                    gpa=data.get("gpa"),
+                    issuance_date=now,
+                    document_hash=document_hash,
+                    signature=signature,
+                    created_at=now
+                )
+                for credential_id, subject_uuid, data, signature, document_hash
+                in zip(credential_ids, subject_ids, records, signatures, document_hashes)
+            ]
+        
+        if template_type == DocumentType.AADHAAR:
+            create = W3CVerifiableCredential.create_aadhaar_credential
+            return [
+                create(
+                    credential_id=credential_id,
+                    issuer_id="did:uidai:issuer",
+                    masked_aadhaar=data.get("masked_aadhaar", "XXXX-XXXX-0000"),
+                    name=data.get("name", ""),
+                    dob=data.get("dob", ""),
+                    gender=data.get("gender", ""),
+                    address=data.get("address", {}),
+                    photo_hash=data.get("photo_hash"),
+                    signature=signature,
+                    issuance_date=now,
+                    created_at=now
+                )
+                for credential_id, data, signature
+                in zip(credential_ids, records, signatures)
+            ]
+        
+        build = self._build_generic_credential
+        return [
+            build(credential_id, institution_id, institution_name, data, signature, now)
+            for credential_id, data, signature
+            in zip(credential_ids, records, signatures)
+        ]
+    
+    @staticmethod
+    def _build_generic_credential(
+        credential_id: str,
+        institution_id: str,
+        institution_name: str,
+        credential_data: Dict[str, Any],
+        signature: Optional[str],
+        now: str
+    ) -> Dict[str, Any]:
+        """Builds a generic (untyped) W3C VC document."""
+        return {
+            **_credential_fields(_GENERIC_SKELETON),
+            "id": f"urn:uuid:{credential_id}",
+            "issuer": {
+                "id": f"did:certitrust:{institution_id}",
+                "name": institution_name
+            },
+            "issuanceDate": now,
+            "credentialSubject": credential_data,
+            "proof": {
+                "type": "Ed25519Signature2020",
+                "created": now,
+                "proofValue": signature
+            } if signature else None
+        }
     
     def build_qr_payload(
         self,
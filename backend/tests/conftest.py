@@ -7,18 +7,68 @@ import pytest
 import os
 import sys
 import tempfile
+import zlib
 from pathlib import Path
 from unittest.mock import MagicMock
 
-# Add backend to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+import httpx
+import fitz
 
-# Set up test environment variables
+# Add backend's parent to path for imports, once per session (and once per
+# xdist worker) rather than in each test module. backend/ itself stays off
+# the path: tests import `backend.services...`, and the app's
+# backend-relative imports (`from services...`) must fall back to the same
+# names, or each module would load twice with separate module-level state.
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR.parent) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR.parent))
+
+# Pre-generated Ed25519 keypair used by the legacy signer fixture
+TEST_SIGNING_KEY_PATH = Path(__file__).parent / "fixtures" / "test_ed25519.pem"
+
+# Set up test environment variables at import time so every xdist worker
+# sees them before backend.main is imported
 os.environ.setdefault('SUPABASE_URL', 'http://test.supabase.co')
 os.environ.setdefault('SUPABASE_SERVICE_ROLE_KEY', 'test_service_role_key_' + 'x' * 200)
 os.environ.setdefault('ISSUER_PRIVATE_KEY', '')
 
 
+def supabase_route_handler(request: httpx.Request) -> httpx.Response:
+    """
+    Canned Supabase REST responses keyed on method and table.
+    
+    Backs the shared MockTransport so API tests exercise the real
+    httpx client path without touching the network.
+    """
+    path = request.url.path
+    
+    if request.method == "POST" and path.endswith("/institutions"):
+        return httpx.Response(201, json=[{"id": "new-inst-id"}])
+    if request.method == "POST" and path.endswith("/document_templates"):
+        return httpx.Response(201, json=[{"id": "new-template-id"}])
+    if request.method == "POST" and path.endswith("/rpc/verify_audit_chain"):
+        return httpx.Response(200, json=[
+            {"is_valid": True, "broken_at": None, "last_position": None, "last_hash": None}
+        ])
+    if request.method == "POST":
+        return httpx.Response(201, json=[])
+    return httpx.Response(200, json=[])
+
+
+@pytest.fixture(scope="session")
+def shared_http_client():
+    """Async HTTP client over a MockTransport, built once per session."""
+    return httpx.AsyncClient(transport=httpx.MockTransport(supabase_route_handler))
+
+
+@pytest.fixture(scope="session")
+def shared_audit_client():
+    """Sync HTTP client for AuditService over the same MockTransport routes."""
+    client = httpx.Client(transport=httpx.MockTransport(supabase_route_handler))
+    yield client
+    client.close()
+
+
 @pytest.fixture
 def temp_file(tmp_path):
     """Create a temporary text file for testing."""
@@ -32,8 +82,6 @@ def temp_file(tmp_path):
 @pytest.fixture
 def temp_pdf(tmp_path):
     """Create a minimal test PDF file."""
-    import fitz
-    
     pdf_path = tmp_path / "test_document.pdf"
     doc = fitz.open()
     
@@ -49,12 +97,79 @@ def temp_pdf(tmp_path):
     return pdf_path
 
 
+@pytest.fixture(scope="session")
+def legacy_signer():
+    """Legacy Ed25519 signer loaded from the fixed test keypair, created once."""
+    from backend.services.kms import LegacyDocumentSigner
+    return LegacyDocumentSigner(key_pem=TEST_SIGNING_KEY_PATH.read_bytes())
+
+
+@pytest.fixture(scope="session")
+def kms():
+    """KMSService with a fixed test key, derived once per session."""
+    from backend.services.kms import KMSService
+    return KMSService(supabase_url='http://test.co', supabase_key='test_key')
+
+
+KEYPAIR_POOL_SIZE = 8
+
+
+@pytest.fixture(scope="module")
+def keypair_pool(kms):
+    """Ed25519 keypairs generated once per module."""
+    return [kms.generate_keypair() for _ in range(KEYPAIR_POOL_SIZE)]
+
+
 @pytest.fixture
+def keypair(keypair_pool, request):
+    """A pooled (private_key, public_key) pair, chosen stably per test name."""
+    return keypair_pool[zlib.crc32(request.node.name.encode()) % KEYPAIR_POOL_SIZE]
+
+
+@pytest.fixture(scope="session")
+def big_pattern_file(tmp_path_factory):
+    """File of CHUNK_SIZE * 2 + 100 bytes, written once per session (read-only)."""
+    from backend.utils import CHUNK_SIZE
+    path = tmp_path_factory.mktemp("big") / "big.bin"
+    path.write_bytes(b"a" * (CHUNK_SIZE * 2 + 100))
+    return path
+
+
+@pytest.fixture(scope="session")
 def sample_document_hash():
-    """Provide a sample document hash."""
+    """Provide a sample document hash (shared across the session)."""
     return "a" * 64  # Valid SHA-256 hash format
 
 
+class FakeResp:
+    """
+    Minimal stand-in for an httpx.Response.
+    
+    Cheaper than a MagicMock attribute chain when a test only needs
+    status_code, json() and raise_for_status().
+    """
+    
+    def __init__(self, status_code: int, data=None):
+        self.status_code = status_code
+        self._data = data
+        self.text = "" if data is None else str(data)
+    
+    def json(self):
+        return self._data
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise httpx.HTTPStatusError(
+                f"HTTP {self.status_code}", request=None, response=None
+            )
+
+
+@pytest.fixture(scope="session")
+def fake_resp():
+    """Provide the FakeResp class for building canned responses."""
+    return FakeResp
+
+
 @pytest.fixture
 def mock_supabase():
     """Mock Supabase client for testing."""
@@ -138,3 +253,15 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "memory: marks tests for memory-sensitive operations"
     )
+
+
+# Fixtures whose setup dominates the tests that request them. Tests using
+# any of these are marked slow so PR gating can run `-n auto -m "not slow"`.
+SLOW_FIXTURES = frozenset({"stamped_pdf"})
+
+
+def pytest_collection_modifyitems(config, items):
+    """Mark tests depending on expensive fixtures as slow."""
+    for item in items:
+        if SLOW_FIXTURES.intersection(getattr(item, "fixturenames", ())):
+            item.add_marker(pytest.mark.slow)
@@ -5,45 +5,153 @@ Tests for the full document issuance and verification pipeline.
 """
 
 import pytest
+import pytest_asyncio
+import asyncio
 import os
 import json
-from unittest.mock import patch, MagicMock, AsyncMock
-from fastapi.testclient import TestClient
+import httpx
+import fitz
 
-# Set environment before imports
-os.environ['SUPABASE_URL'] = 'http://test.supabase.co'
-os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test_key_' + 'x' * 200
+from backend.main import app, get_http_client, get_audit_client
+from conftest import supabase_route_handler
 
-from backend.main import app
+# Every test shares the session event loop so the ASGI client is reused
+pytestmark = pytest.mark.asyncio(loop_scope="session")
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client(shared_http_client, shared_audit_client):
+    """Async client calling the FastAPI app in-process (shared across the session)."""
+    app.dependency_overrides[get_http_client] = lambda: shared_http_client
+    app.dependency_overrides[get_audit_client] = lambda: shared_audit_client
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.pop(get_http_client, None)
+    app.dependency_overrides.pop(get_audit_client, None)
 
 
 @pytest.fixture
-def sample_pdf(tmp_path):
-    """Create a sample PDF for testing."""
-    import fitz
+def audit_entries(client, shared_audit_client):
+    """
+    Serve the given audit_logs rows to AuditService for one test.
+    
+    Call with a list of rows; the shared audit client is restored afterwards.
+    Writes and RPC calls fall through to the shared Supabase routes.
+    """
+    clients = []
+    
+    def serve(rows):
+        def handler(request):
+            if request.method == "GET":
+                return httpx.Response(200, json=rows)
+            return supabase_route_handler(request)
+        
+        audit_client = httpx.Client(transport=httpx.MockTransport(handler))
+        clients.append(audit_client)
+        app.dependency_overrides[get_audit_client] = lambda: audit_client
     
-    pdf_path = tmp_path / "sample.pdf"
+    yield serve
+    app.dependency_overrides[get_audit_client] = lambda: shared_audit_client
+    for audit_client in clients:
+        audit_client.close()
+
+
+@pytest.fixture(scope="session")
+def signed_fixture(legacy_signer, sample_document_hash):
+    """Verification request body signed once per session."""
+    document_hash = sample_document_hash
+    return {
+        "document_hash": document_hash,
+        "signature": legacy_signer.sign_document(document_hash),
+        "public_key_pem": legacy_signer.get_public_key_pem()
+    }
+
+
+BATCH_SIZE = 32
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def batch_verification(client, legacy_signer):
+    """Sign BATCH_SIZE hashes once and verify them in a single batch call."""
+    items = []
+    for i in range(BATCH_SIZE):
+        document_hash = f"{i:064x}"
+        items.append({
+            "document_hash": document_hash,
+            "signature": legacy_signer.sign_document(document_hash)
+        })
+    
+    response = await client.post(
+        "/verify/document/batch",
+        json={"items": items, "public_key_pem": legacy_signer.get_public_key_pem()}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture(scope="session")
+def sample_pdf_bytes():
+    """Build a sample PDF once per session and keep its bytes in memory."""
     doc = fitz.open()
     page = doc.new_page()
     page.insert_text((72, 72), "Sample Document Content")
-    doc.save(str(pdf_path))
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    
+    return pdf_bytes
+
+
+@pytest.fixture(scope="session")
+def large_pdf_bytes():
+    """Build a 10-page PDF once per session and keep its bytes in memory."""
+    doc = fitz.open()
+    for i in range(10):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1} content")
+        page.insert_text((72, 200), "Lorem ipsum " * 100)
+    pdf_bytes = doc.tobytes()
     doc.close()
     
-    return pdf_path
+    return pdf_bytes
+
+
+def encode_upload(filename, content, content_type="application/pdf", data=None):
+    """
+    Pre-encode a multipart upload so tests can POST the raw body.
+    
+    Returns keyword arguments (content + Content-Type header with the
+    boundary) to splat into client.post().
+    """
+    request = httpx.Request(
+        "POST", "http://test",
+        files={"file": (filename, content, content_type)},
+        data=data
+    )
+    return {
+        "content": request.read(),
+        "headers": {"Content-Type": request.headers["Content-Type"]}
+    }
+
+
+@pytest.fixture(scope="session")
+def sample_pdf_upload(sample_pdf_bytes):
+    """Multipart body for the sample PDF, encoded once per session."""
+    return encode_upload("test.pdf", sample_pdf_bytes)
+
+
+@pytest.fixture(scope="session")
+def large_pdf_upload(large_pdf_bytes):
+    """Multipart body for the 10-page PDF, encoded once per session."""
+    return encode_upload("large.pdf", large_pdf_bytes)
 
 
 class TestHealthEndpoint:
     """Tests for the health check endpoint."""
     
-    def test_health_check(self, client):
+    async def test_health_check(self, client):
         """Test basic health check."""
-        response = client.get("/health")
+        response = await client.get("/health")
         
         assert response.status_code == 200
         data = response.json()
@@ -51,42 +159,182 @@ class TestHealthEndpoint:
         assert data["version"] == "2.0.0"
 
 
+class TestAppImports:
+    """Tests for how the app's modules are loaded under test."""
+    
+    def test_backend_modules_load_once(self):
+        """Test backend-relative imports resolve to the backend.* modules."""
+        import sys
+        from backend.services import kms
+        
+        assert "services.kms" not in sys.modules
+        assert sys.modules["backend.main"].InstitutionSigner is kms.InstitutionSigner
+
+
+class TestHTTPClientPool:
+    """Tests for the lifespan-managed Supabase HTTP client."""
+    
+    async def test_lifespan_shares_pooled_client(self):
+        """Test every request gets the same pooled client until shutdown."""
+        from starlette.requests import Request
+        from backend.main import lifespan
+        
+        async with lifespan(app):
+            pooled = app.state.http_client
+            pooled_audit = app.state.audit_client
+            request = Request({"type": "http", "app": app})
+            
+            for _ in range(100):
+                async for http_client in get_http_client(request):
+                    assert http_client is pooled
+                for audit_client in get_audit_client(request):
+                    assert audit_client is pooled_audit
+            
+            assert not pooled.is_closed
+            assert not pooled_audit.is_closed
+        
+        assert pooled.is_closed
+        assert pooled_audit.is_closed
+        assert not hasattr(app.state, "http_client")
+        assert not hasattr(app.state, "audit_client")
+    
+    async def test_lifespan_shuts_down_inference_pool(self):
+        """Test shutdown stops the AI inference pool and leaves a usable one."""
+        from backend import main
+        
+        async with main.lifespan(app):
+            executor = main._ai_executor
+        
+        with pytest.raises(RuntimeError):
+            executor.submit(lambda: None)
+        assert main._ai_executor is not executor
+        assert main._ai_executor.submit(lambda: 42).result() == 42
+
+
+class TestOffloadedWork:
+    """Tests for keeping blocking upload and inference work off the event loop."""
+    
+    async def test_save_upload_copies_off_event_loop(self, tmp_path):
+        """Test uploads are copied intact from a worker thread."""
+        import io
+        import threading
+        from unittest.mock import patch
+        from starlette.datastructures import UploadFile
+        from backend import main
+        
+        content = os.urandom(3 * (1 << 20) + 123)  # spans several chunks
+        upload = UploadFile(file=io.BytesIO(content), filename="big.pdf")
+        threads = []
+        real_write = main._write_upload
+        
+        def write(src, path):
+            threads.append(threading.current_thread())
+            real_write(src, path)
+        
+        with patch.object(main, "_write_upload", write):
+            await main.save_upload(upload, tmp_path / "big.pdf")
+        
+        assert (tmp_path / "big.pdf").read_bytes() == content
+        assert threads and threads[0] is not threading.main_thread()
+    
+    async def test_batch_verification_runs_off_event_loop(self):
+        """Test batch signature checks run on a worker thread, not the loop."""
+        import threading
+        from unittest.mock import patch
+        from backend import main
+        
+        threads = []
+        
+        def verify(data):
+            threads.append(threading.current_thread())
+            return [True] * len(data.items)
+        
+        request = main.BatchVerificationRequest(items=[
+            main.BatchVerificationItem(document_hash="a" * 64, signature="sig")
+        ])
+        with patch.object(main, "_verify_batch", verify):
+            response = await main.verify_document_batch(request)
+        
+        assert response.all_valid and response.total == 1
+        assert threads and threads[0] is not threading.main_thread()
+    
+    async def test_ai_scoring_runs_on_inference_pool(self):
+        """Test AI image decoding and the batched forward run on the inference pool."""
+        import threading
+        from unittest.mock import patch
+        from backend import main
+        from backend.services.forensics import MicroBatcher
+        
+        def prepare(image_file):
+            return threading.current_thread().name
+        
+        def forward(batch):
+            return [(prepared, threading.current_thread().name) for prepared in batch]
+        
+        batcher = MicroBatcher(forward, executor=main._ai_executor, max_wait_ms=0)
+        with patch.object(main, "_prepare_ai_image", prepare), \
+                patch.object(main, "_ai_batcher", batcher):
+            prepare_thread, forward_thread = await main.score_ai_image(None)
+        
+        assert prepare_thread.startswith("ai-inference")
+        assert forward_thread.startswith("ai-inference")
+
+    async def test_detector_batch_results_follow_request_order(self):
+        """Test one stacked forward pass is split back per request, in order."""
+        torch = pytest.importorskip("torch")
+        from types import SimpleNamespace
+        from unittest.mock import patch
+        from backend import main
+        
+        calls = []
+        
+        def model(pixel_values):
+            calls.append(pixel_values.shape[0])
+            # Logit for "artificial" grows with the request's pixel value
+            logits = torch.stack([torch.zeros(len(pixel_values)), pixel_values.mean(dim=(1, 2, 3))], dim=1)
+            return SimpleNamespace(logits=logits)
+        
+        batch = [{"pixel_values": torch.full((1, 3, 4, 4), float(i))} for i in range(4)]
+        with patch.object(main.LazyModelLoader, "load_ai_detector", return_value=(None, model)):
+            results = main._run_ai_detector_batch(batch)
+        
+        assert calls == [4]
+        artificial = [artificial for _, artificial in results]
+        assert artificial == sorted(artificial) and len(set(artificial)) == 4
+        for human, artificial in results:
+            assert human + artificial == pytest.approx(1.0)
+        assert results[0] == pytest.approx((0.5, 0.5))
+
+
 class TestLegacyDocumentIssuance:
     """Tests for legacy document issuance (without institution)."""
     
-    def test_issue_document_success(self, client, sample_pdf):
+    async def test_issue_document_success(self, client, sample_pdf_upload):
         """Test successful document issuance."""
-        with open(sample_pdf, "rb") as f:
-            response = client.post(
-                "/issue/document",
-                files={"file": ("test.pdf", f, "application/pdf")}
-            )
+        response = await client.post(
+            "/issue/document",
+            **sample_pdf_upload
+        )
         
         assert response.status_code == 200
         assert response.headers["content-type"] == "application/pdf"
     
-    def test_issue_document_non_pdf_rejected(self, client, tmp_path):
+    async def test_issue_document_non_pdf_rejected(self, client):
         """Test that non-PDF files are rejected."""
-        text_file = tmp_path / "test.txt"
-        text_file.write_text("Not a PDF")
-        
-        with open(text_file, "rb") as f:
-            response = client.post(
-                "/issue/document",
-                files={"file": ("test.txt", f, "text/plain")}
-            )
+        response = await client.post(
+            "/issue/document",
+            **encode_upload("test.txt", b"Not a PDF", "text/plain")
+        )
         
         assert response.status_code == 400
         assert "PDF" in response.json()["detail"]
     
-    def test_issue_document_with_document_type(self, client, sample_pdf):
+    async def test_issue_document_with_document_type(self, client, sample_pdf_bytes):
         """Test issuance with document type parameter."""
-        with open(sample_pdf, "rb") as f:
-            response = client.post(
-                "/issue/document",
-                files={"file": ("test.pdf", f, "application/pdf")},
-                data={"document_type": "academic"}
-            )
+        response = await client.post(
+            "/issue/document",
+            **encode_upload("test.pdf", sample_pdf_bytes, data={"document_type": "academic"})
+        )
         
         assert response.status_code == 200
 
@@ -94,20 +342,9 @@ class TestLegacyDocumentIssuance:
 class TestInstitutionOnboarding:
     """Tests for institution onboarding endpoints."""
     
-    @patch('backend.main.httpx.AsyncClient')
-    def test_onboard_institution_success(self, mock_client_class, client):
+    async def test_onboard_institution_success(self, client):
         """Test successful institution onboarding."""
-        # Mock the async client
-        mock_client = MagicMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock()
-        mock_client.post = AsyncMock(return_value=MagicMock(
-            status_code=201,
-            json=MagicMock(return_value=[{"id": "new-inst-id"}])
-        ))
-        mock_client_class.return_value = mock_client
-        
-        response = client.post(
+        response = await client.post(
             "/admin/onboard",
             json={
                 "name": "Test University",
@@ -122,9 +359,9 @@ class TestInstitutionOnboarding:
         assert data["name"] == "Test University"
         assert "public_key_pem" in data
     
-    def test_onboard_institution_invalid_slug(self, client):
+    async def test_onboard_institution_invalid_slug(self, client):
         """Test that invalid slug format is rejected."""
-        response = client.post(
+        response = await client.post(
             "/admin/onboard",
             json={
                 "name": "Test University",
@@ -139,34 +376,20 @@ class TestInstitutionOnboarding:
 class TestDocumentVerification:
     """Tests for document verification endpoints."""
     
-    def test_verify_document_valid_signature(self, client):
+    async def test_verify_document_valid_signature(self, client, signed_fixture):
         """Test verification with valid signature."""
-        from backend.services.kms import LegacyDocumentSigner
-        
-        signer = LegacyDocumentSigner()
-        test_hash = "a" * 64
-        signature = signer.sign_document(test_hash)
-        public_key_pem = signer.get_public_key_pem()
-        
-        response = client.post(
-            "/verify/document",
-            json={
-                "document_hash": test_hash,
-                "signature": signature,
-                "public_key_pem": public_key_pem
-            }
-        )
+        response = await client.post("/verify/document", json=signed_fixture)
         
         assert response.status_code == 200
         data = response.json()
         assert data["is_valid"] is True
     
-    def test_verify_document_invalid_signature(self, client):
+    async def test_verify_document_invalid_signature(self, client, sample_document_hash):
         """Test verification with invalid signature."""
-        response = client.post(
+        response = await client.post(
             "/verify/document",
             json={
-                "document_hash": "a" * 64,
+                "document_hash": sample_document_hash,
                 "signature": "invalid_signature_base64=="
             }
         )
@@ -175,13 +398,74 @@ class TestDocumentVerification:
         data = response.json()
         assert data["is_valid"] is False
     
-    def test_verify_file_upload(self, client, sample_pdf):
+    async def test_verify_document_concurrent(self, client, signed_fixture):
+        """Test concurrent verification requests all succeed."""
+        responses = await asyncio.gather(*[
+            client.post("/verify/document", json=signed_fixture)
+            for _ in range(8)
+        ])
+        
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["is_valid"] is True for r in responses)
+    
+    @pytest.mark.parametrize("index", range(BATCH_SIZE))
+    async def test_verify_document_batch_item(self, batch_verification, index):
+        """Test each signature in the shared batch verifies."""
+        assert batch_verification["total"] == BATCH_SIZE
+        assert batch_verification["results"][index] is True
+    
+    async def test_verify_document_batch_mixed(self, client, signed_fixture):
+        """Test batch verification reports invalid items individually."""
+        response = await client.post(
+            "/verify/document/batch",
+            json={
+                "items": [
+                    {"document_hash": signed_fixture["document_hash"],
+                     "signature": signed_fixture["signature"]},
+                    {"document_hash": "b" * 64,
+                     "signature": signed_fixture["signature"]},
+                    {"document_hash": "c" * 64,
+                     "signature": "invalid_signature_base64=="}
+                ],
+                "public_key_pem": signed_fixture["public_key_pem"]
+            }
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["results"] == [True, False, False]
+        assert data["all_valid"] is False
+        assert data["valid_count"] == 1
+    
+    async def test_verify_document_batch_key_errors(self, client, signed_fixture):
+        """Test bad keys are a 400 while lookup failures are not reported as one."""
+        from unittest.mock import patch
+        from backend import main
+        from backend.services.kms import KMSError
+        
+        items = [{"document_hash": signed_fixture["document_hash"],
+                  "signature": signed_fixture["signature"]}]
+        response = await client.post(
+            "/verify/document/batch",
+            json={"items": items, "public_key_pem": "not a pem"}
+        )
+        assert response.status_code == 400
+        
+        request = main.BatchVerificationRequest(
+            items=[main.BatchVerificationItem(**item) for item in items],
+            institution_id="inst-1"
+        )
+        with patch.object(main.InstitutionSigner, "_fetch_institution",
+                          side_effect=KMSError("Supabase unreachable")):
+            with pytest.raises(KMSError):
+                main._verify_batch(request)
+    
+    async def test_verify_file_upload(self, client, sample_pdf_upload):
         """Test file upload verification."""
-        with open(sample_pdf, "rb") as f:
-            response = client.post(
-                "/verify/file",
-                files={"file": ("test.pdf", f, "application/pdf")}
-            )
+        response = await client.post(
+            "/verify/file",
+            **sample_pdf_upload
+        )
         
         assert response.status_code == 200
         data = response.json()
@@ -192,28 +476,23 @@ class TestDocumentVerification:
 class TestAuditEndpoints:
     """Tests for audit log endpoints."""
     
-    @patch('backend.services.audit.httpx.get')
-    def test_get_audit_logs(self, mock_get, client):
+    async def test_get_audit_logs(self, client, audit_entries):
         """Test retrieving audit logs."""
-        mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = [
+        audit_entries([
             {"event_type": "document_issued", "document_hash": "hash1"}
-        ]
+        ])
         
-        response = client.get("/audit/logs")
+        response = await client.get("/audit/logs")
         
         assert response.status_code == 200
         data = response.json()
         assert "entries" in data
         assert "chain_valid" in data
+        assert data["entries"][0]["document_hash"] == "hash1"
     
-    @patch('backend.services.audit.httpx.get')
-    def test_verify_audit_chain(self, mock_get, client):
+    async def test_verify_audit_chain(self, client):
         """Test audit chain verification endpoint."""
-        mock_get.return_value.status_code = 200
-        mock_get.return_value.json.return_value = []
-        
-        response = client.get("/audit/verify-chain")
+        response = await client.get("/audit/verify-chain")
         
         assert response.status_code == 200
         data = response.json()
@@ -223,19 +502,9 @@ class TestAuditEndpoints:
 class TestTemplateEndpoints:
     """Tests for template management endpoints."""
     
-    @patch('backend.main.httpx.AsyncClient')
-    def test_create_template(self, mock_client_class, client):
+    async def test_create_template(self, client):
         """Test template creation."""
-        mock_client = MagicMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock()
-        mock_client.post = AsyncMock(return_value=MagicMock(
-            status_code=201,
-            raise_for_status=MagicMock()
-        ))
-        mock_client_class.return_value = mock_client
-        
-        response = client.post(
+        response = await client.post(
             "/templates",
             json={
                 "institution_id": "inst-123",
@@ -249,9 +518,9 @@ class TestTemplateEndpoints:
         data = response.json()
         assert "id" in data
     
-    def test_create_template_invalid_type(self, client):
+    async def test_create_template_invalid_type(self, client):
         """Test template creation with invalid type."""
-        response = client.post(
+        response = await client.post(
             "/templates",
             json={
                 "institution_id": "inst-123",
@@ -262,20 +531,9 @@ class TestTemplateEndpoints:
         
         assert response.status_code == 400
     
-    @patch('backend.main.httpx.AsyncClient')
-    def test_list_templates(self, mock_client_class, client):
+    async def test_list_templates(self, client):
         """Test listing templates."""
-        mock_client = MagicMock()
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock()
-        mock_client.get = AsyncMock(return_value=MagicMock(
-            status_code=200,
-            json=MagicMock(return_value=[]),
-            raise_for_status=MagicMock()
-        ))
-        mock_client_class.return_value = mock_client
-        
-        response = client.get("/templates")
+        response = await client.get("/templates")
         
         assert response.status_code == 200
 
@@ -283,62 +541,49 @@ class TestTemplateEndpoints:
 class TestFullPipeline:
     """End-to-end pipeline tests."""
     
-    def test_issue_and_verify_document(self, client, sample_pdf):
+    async def test_issue_and_verify_document(self, client, sample_pdf_upload):
         """Test full issue and verify cycle."""
         # Issue document
-        with open(sample_pdf, "rb") as f:
-            issue_response = client.post(
-                "/issue/document",
-                files={"file": ("test.pdf", f, "application/pdf")}
-            )
+        issue_response = await client.post(
+            "/issue/document",
+            **sample_pdf_upload
+        )
         
         assert issue_response.status_code == 200
         
         # The stamped PDF should be larger (has QR code)
         assert len(issue_response.content) > 0
     
-    def test_issue_preserves_pdf_content(self, client, sample_pdf):
+    async def test_issue_preserves_pdf_content(self, client, sample_pdf_upload):
         """Test that stamping preserves original PDF content."""
-        import fitz
-        import tempfile
-        
-        with open(sample_pdf, "rb") as f:
-            response = client.post(
-                "/issue/document",
-                files={"file": ("test.pdf", f, "application/pdf")}
-            )
-        
-        # Save stamped PDF
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-            tmp.write(response.content)
-            tmp_path = tmp.name
-        
-        try:
-            # Open and verify content exists
-            doc = fitz.open(tmp_path)
-            assert len(doc) > 0
-            
-            # Check first page has our text
-            page = doc[0]
-            text = page.get_text()
-            assert "Sample Document Content" in text
-            
-            doc.close()
-        finally:
-            os.unlink(tmp_path)
+        response = await client.post(
+            "/issue/document",
+            **sample_pdf_upload
+        )
+        
+        # Open the stamped PDF straight from the response bytes
+        doc = fitz.open(stream=response.content, filetype="pdf")
+        assert len(doc) > 0
+        
+        # Check first page has our text
+        page = doc[0]
+        text = page.get_text()
+        assert "Sample Document Content" in text
+        
+        doc.close()
 
 
 class TestErrorHandling:
     """Tests for error handling."""
     
-    def test_missing_file_upload(self, client):
+    async def test_missing_file_upload(self, client):
         """Test error when file is missing."""
-        response = client.post("/issue/document")
+        response = await client.post("/issue/document")
         assert response.status_code == 422
     
-    def test_invalid_json_body(self, client):
+    async def test_invalid_json_body(self, client):
         """Test error with invalid JSON."""
-        response = client.post(
+        response = await client.post(
             "/verify/document",
             content="not json",
             headers={"Content-Type": "application/json"}
@@ -350,26 +595,8 @@ class TestErrorHandling:
 class TestPerformance:
     """Performance-related tests."""
     
-    def test_large_pdf_processing(self, client, tmp_path):
+    async def test_large_pdf_processing(self, client, large_pdf_upload):
         """Test processing a larger PDF."""
-        import fitz
-        
-        # Create a 10-page PDF
-        pdf_path = tmp_path / "large.pdf"
-        doc = fitz.open()
-        
-        for i in range(10):
-            page = doc.new_page()
-            page.insert_text((72, 72), f"Page {i + 1} content")
-            page.insert_text((72, 200), "Lorem ipsum " * 100)
-        
-        doc.save(str(pdf_path))
-        doc.close()
-        
-        with open(pdf_path, "rb") as f:
-            response = client.post(
-                "/issue/document",
-                files={"file": ("large.pdf", f, "application/pdf")}
-            )
+        response = await client.post("/issue/document", **large_pdf_upload)
         
         assert response.status_code == 200
@@ -1,54 +1,93 @@
-"""Legacy audit log tests - updated for new audit service."""
-import os
+"""Audit log tests covering both AuditService and the legacy log_audit_event."""
 import httpx
-from unittest.mock import patch, MagicMock
-
-# Set test environment
-os.environ["SUPABASE_URL"] = "http://test.com"
-os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "secret"
+import pytest
 
 from backend.services.audit import AuditService, AuditEventType
 
-@patch("backend.services.audit.httpx.post")
-@patch("backend.services.audit.httpx.get")
-def test_audit_log_hash_chain(mock_get, mock_post):
-    """Test that audit service creates hash chain links."""
-    # Mock previous entry
-    mock_get.return_value.status_code = 200
-    mock_get.return_value.json.return_value = [{"log_hash": "prev_hash_123", "chain_position": 5}]
 
-    # Mock post response
-    mock_post.return_value.status_code = 201
+def make_audit_client(previous_entries, calls=None):
+    """
+    Build an httpx.Client whose audit_logs reads return previous_entries.
+    
+    If a calls list is given, each request's method is appended to it.
+    """
+    def handler(request):
+        if calls is not None:
+            calls.append(request.method)
+        if request.method == "POST":
+            return httpx.Response(201)
+        return httpx.Response(200, json=previous_entries)
+    
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
 
-    service = AuditService()
-    entry = service.log_event(
+def log_with_service(client, document_hash):
+    """Log a DOCUMENT_ISSUED event through AuditService directly."""
+    return AuditService(client=client).log_event(
         event_type=AuditEventType.DOCUMENT_ISSUED,
-        document_hash="current_hash_456"
+        document_hash=document_hash
     )
 
+
+def log_with_legacy(client, document_hash):
+    """Log through the legacy backend.main.log_audit_event wrapper."""
+    from backend.main import log_audit_event
+    return log_audit_event(document_hash, client=client)
+
+
+@pytest.fixture(params=["service", "legacy"])
+def log_document(request):
+    """Audit logging entry point under test."""
+    return {"service": log_with_service, "legacy": log_with_legacy}[request.param]
+
+
+@pytest.fixture(scope="module")
+def chained_client():
+    """Client whose latest audit entry sits at chain position 5."""
+    client = make_audit_client([{"log_hash": "prev_hash_123", "chain_position": 5}])
+    yield client
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def empty_client():
+    """Client with no previous audit entries."""
+    client = make_audit_client([])
+    yield client
+    client.close()
+
+
+def test_audit_log_hash_chain(chained_client, log_document):
+    """Test that audit logging creates hash chain links."""
+    entry = log_document(chained_client, "current_hash_456")
+
     # Check that entry was created with chain link
     assert entry is not None
     assert entry.previous_log_hash == "prev_hash_123"
     assert entry.chain_position == 6
     assert entry.document_hash == "current_hash_456"
 
-@patch("backend.services.audit.httpx.post")
-@patch("backend.services.audit.httpx.get")
-def test_audit_log_no_previous_hash(mock_get, mock_post):
+def test_audit_log_no_previous_hash(empty_client, log_document):
     """Test audit log for first entry (no previous hash)."""
-    # Mock no previous entry
-    mock_get.return_value.status_code = 200
-    mock_get.return_value.json.return_value = []
-
-    mock_post.return_value.status_code = 201
-
-    service = AuditService()
-    entry = service.log_event(
-        event_type=AuditEventType.DOCUMENT_ISSUED,
-        document_hash="first_hash_789"
-    )
+    entry = log_document(empty_client, "first_hash_789")
 
     assert entry is not None
     assert entry.document_hash == "first_hash_789"
     assert entry.previous_log_hash is None
     assert entry.chain_position == 1
+
+def test_audit_log_reuses_chain_tip():
+    """Test that only the first write fetches the previous entry."""
+    calls = []
+    client = make_audit_client(
+        [{"log_hash": "prev_hash_123", "chain_position": 5}], calls
+    )
+    service = AuditService(client=client)
+
+    first = service.log_event(AuditEventType.DOCUMENT_ISSUED, document_hash="h1")
+    second = service.log_event(AuditEventType.DOCUMENT_ISSUED, document_hash="h2")
+    client.close()
+
+    assert calls == ["GET", "POST", "POST"]
+    assert second.previous_log_hash == first.log_hash
+    assert second.chain_position == 7
@@ -0,0 +1,126 @@
+"""
+Test Suite for Forensics Preprocessing
+======================================
+Tests for the fused ViT image transform and inference micro-batching.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from backend.services.forensics import FusedImageTransform, MicroBatcher
+
+
+class ViTImageProcessor:
+    """Stand-in carrying the attributes of a HuggingFace ViT processor."""
+    do_resize = True
+    do_rescale = True
+    do_normalize = True
+    size = {"height": 224, "width": 224}
+    resample = Image.Resampling.BILINEAR
+    rescale_factor = 1 / 255
+    image_mean = [0.485, 0.456, 0.406]
+    image_std = [0.229, 0.224, 0.225]
+
+
+def reference_pixel_values(processor, img):
+    """The HuggingFace processor's resize/rescale/normalize steps."""
+    size = (processor.size["width"], processor.size["height"])
+    image = np.asarray(img.resize(size, resample=processor.resample))
+    image = (image.astype(np.float64) * processor.rescale_factor).astype(np.float32)
+    mean = np.array(processor.image_mean, dtype=np.float32)
+    std = np.array(processor.image_std, dtype=np.float32)
+    image = (image - mean) / std
+    return image.transpose(2, 0, 1)[None]
+
+
+class TestFusedImageTransform:
+    """Tests for FusedImageTransform."""
+    
+    def test_matches_processor_pipeline(self):
+        """Fused output is identical to the step-by-step pipeline."""
+        rng = np.random.default_rng(0)
+        img = Image.fromarray(rng.integers(0, 256, (300, 410, 3), dtype=np.uint8))
+        processor = ViTImageProcessor()
+        
+        transform = FusedImageTransform.from_processor(processor)
+        result = transform(img)
+        
+        assert result.dtype == np.float32
+        assert result.shape == (1, 3, 224, 224)
+        np.testing.assert_array_equal(result, reference_pixel_values(processor, img))
+    
+    def test_matches_huggingface_processor(self):
+        """Fused output is identical to the real HuggingFace ViT processor."""
+        transformers = pytest.importorskip("transformers")
+        # transformers 5 names the PIL-backed class ViTImageProcessorPil;
+        # its plain ViTImageProcessor resizes with torchvision
+        processor_cls = getattr(transformers, "ViTImageProcessorPil", None) \
+            or transformers.ViTImageProcessor
+        rng = np.random.default_rng(1)
+        img = Image.fromarray(rng.integers(0, 256, (300, 410, 3), dtype=np.uint8))
+        
+        for kwargs in ({}, {"image_mean": [0.485, 0.456, 0.406], "image_std": [0.229, 0.224, 0.225]}):
+            processor = processor_cls(**kwargs)
+            transform = FusedImageTransform.from_processor(processor)
+            assert transform is not None
+            
+            expected = processor(images=img, return_tensors="np")["pixel_values"]
+            np.testing.assert_array_equal(transform(img), expected)
+    
+    def test_unsupported_processor_falls_back(self):
+        """Processors with extra steps or a torchvision resize are not fused."""
+        class ConvNextImageProcessor(ViTImageProcessor):
+            crop_pct = 0.875
+        
+        class TorchvisionBackend:
+            pass
+        
+        class TorchvisionViT(ViTImageProcessor, TorchvisionBackend):
+            pass
+        TorchvisionViT.__name__ = "ViTImageProcessor"
+        
+        processor = ViTImageProcessor()
+        processor.size = {"shortest_edge": 224}
+        
+        assert FusedImageTransform.from_processor(ConvNextImageProcessor()) is None
+        assert FusedImageTransform.from_processor(TorchvisionViT()) is None
+        assert FusedImageTransform.from_processor(processor) is None
+
+
+class TestMicroBatcher:
+    """Tests for coalescing concurrent inference calls."""
+    
+    def test_concurrent_requests_share_batches(self):
+        """Concurrent submits are batched, capped at max_batch, in order."""
+        batches = []
+        
+        def run_batch(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+        
+        async def main():
+            batcher = MicroBatcher(run_batch, max_batch=4, max_wait_ms=50)
+            return await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+        
+        results = asyncio.run(main())
+        
+        assert results == [i * 10 for i in range(6)]
+        assert batches == [[0, 1, 2, 3], [4, 5]]
+    
+    def test_batch_errors_reach_every_caller(self):
+        """An exception in run_batch is raised to each request in the batch."""
+        def run_batch(items):
+            raise RuntimeError("model failed")
+        
+        async def main():
+            batcher = MicroBatcher(run_batch, max_wait_ms=1)
+            return await asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            )
+        
+        results = asyncio.run(main())
+        
+        assert [str(result) for result in results] == ["model failed"] * 2
@@ -5,15 +5,17 @@ Tests for memory-efficient chunked SHA-256 hashing.
 """
 
 import hashlib
+import io
 import os
 import pytest
 from io import BytesIO
 
 from backend.utils import (
-    secure_hash, hash_bytes, hash_string, chunked_file_reader,
-    hash_stream, compare_hashes, validate_hash_format,
-    hash_file_range, CHUNK_SIZE, is_safe_for_memory,
-    mask_sensitive_data
+    secure_hash, secure_hash_many, hash_bytes, hash_string, chunked_file_reader,
+    hash_stream, compare_hashes, validate_hash_format, validate_hash_format_many,
+    hash_file_range, tree_hash, CHUNK_SIZE, is_safe_for_memory,
+    is_safe_for_memory_batch, mask_sensitive_data, calculate_trust_score,
+    calculate_trust_scores_batch
 )
 
 
@@ -28,18 +30,31 @@ class TestSecureHash:
         calculated_hash = secure_hash(temp_file)
         assert calculated_hash == expected_hash
 
-    def test_large_file_hashing(self, tmp_path):
-        """Test hashing a file larger than CHUNK_SIZE (64KB)."""
-        large_file = tmp_path / "large.bin"
-        size = CHUNK_SIZE * 2 + 100
-        content = b"a" * size
-        large_file.write_bytes(content)
+    def test_large_file_hashing(self, big_pattern_file):
+        """Test hashing a file larger than CHUNK_SIZE (1MB)."""
+        content = b"a" * (CHUNK_SIZE * 2 + 100)
 
         expected_hash = hashlib.sha256(content).hexdigest()
-        calculated_hash = secure_hash(large_file)
+        calculated_hash = secure_hash(big_pattern_file)
 
         assert calculated_hash == expected_hash
     
+    def test_chunked_fallback_above_memory_threshold(self, tmp_path, monkeypatch):
+        """Test files above MAX_MEMORY_FILE_SIZE take the chunked path with the same result."""
+        content = os.urandom(CHUNK_SIZE + 17)
+        big_file = tmp_path / "big.bin"
+        big_file.write_bytes(content)
+        
+        mmap_hash = secure_hash(big_file)
+        monkeypatch.setattr("backend.utils.MAX_MEMORY_FILE_SIZE", 1024)
+        file_digest_hash = secure_hash(big_file)
+        
+        # Interpreters without hashlib.file_digest use the readinto loop
+        monkeypatch.delattr(hashlib, "file_digest", raising=False)
+        chunked_hash = secure_hash(big_file)
+        
+        assert mmap_hash == file_digest_hash == chunked_hash == hashlib.sha256(content).hexdigest()
+    
     def test_empty_file_hashing(self, tmp_path):
         """Test hashing an empty file."""
         empty_file = tmp_path / "empty.txt"
@@ -116,13 +131,9 @@ class TestHashString:
 class TestChunkedFileReader:
     """Tests for the chunked file reader generator."""
     
-    def test_chunked_reader_yields_correct_chunks(self, tmp_path):
+    def test_chunked_reader_yields_correct_chunks(self, big_pattern_file):
         """Test that chunked reader yields correct chunks."""
-        test_file = tmp_path / "test.bin"
-        content = b"x" * (CHUNK_SIZE * 2 + 100)
-        test_file.write_bytes(content)
-        
-        chunks = list(chunked_file_reader(test_file))
+        chunks = list(chunked_file_reader(big_pattern_file))
         
         # Should have 3 chunks
         assert len(chunks) == 3
@@ -163,6 +174,54 @@ class TestHashStream:
         
         # Should be able to read from beginning
         assert stream.read() == content
+    
+    def test_hash_stream_rewinds_without_seekable(self):
+        """Test streams with seek() but no seekable() are still rewound."""
+        content = b"upload content"
+        
+        class UploadWrapper:
+            def __init__(self, data):
+                self._inner = BytesIO(data)
+            
+            def read(self, size=-1):
+                return self._inner.read(size)
+            
+            def seek(self, offset):
+                return self._inner.seek(offset)
+        
+        class PipeLike(UploadWrapper):
+            def seek(self, offset):
+                raise io.UnsupportedOperation("seek")
+        
+        stream = UploadWrapper(content)
+        assert hash_stream(stream) == hashlib.sha256(content).hexdigest()
+        assert stream.read() == content
+        assert hash_stream(PipeLike(content)) == hashlib.sha256(content).hexdigest()
+    
+    def test_hash_stream_chunked_and_read_only(self):
+        """Test multi-chunk readinto streams and streams without readinto."""
+        content = os.urandom(10_000)
+        expected = hashlib.sha256(content).hexdigest()
+        
+        class ReadOnlyStream:
+            def __init__(self, data):
+                self._inner = BytesIO(data)
+            
+            def read(self, size=-1):
+                return self._inner.read(size)
+        
+        assert hash_stream(BytesIO(content), chunk_size=4096) == expected
+        assert hash_stream(ReadOnlyStream(content), chunk_size=4096) == expected
+    
+    def test_hash_stream_from_current_position(self):
+        """Test BytesIO streams are hashed from the current position."""
+        stream = BytesIO(b"header:payload")
+        stream.seek(7)
+        
+        assert hash_stream(stream) == hashlib.sha256(b"payload").hexdigest()
+        # Buffer views are released, so the stream can still grow
+        stream.seek(0, os.SEEK_END)
+        stream.write(b"more")
 
 
 class TestCompareHashes:
@@ -190,13 +249,33 @@ class TestCompareHashes:
         assert compare_hashes(hash1, hash2) is True
 
 
+class TestSecureHashMany:
+    """Tests for concurrent multi-file hashing."""
+    
+    def test_matches_per_file_hash(self, tmp_path):
+        """Test results equal secure_hash for each of 32 files."""
+        paths = []
+        for i in range(32):
+            f = tmp_path / f"file{i}.bin"
+            f.write_bytes(os.urandom(1000 + i))
+            paths.append(f)
+        
+        result = secure_hash_many(paths, workers=4)
+        
+        assert list(result) == paths
+        assert result == {p: secure_hash(p) for p in paths}
+    
+    def test_empty_input(self):
+        """Test hashing no files returns an empty mapping."""
+        assert secure_hash_many([]) == {}
+
+
 class TestValidateHashFormat:
     """Tests for hash format validation."""
     
-    def test_valid_sha256_hash(self):
+    def test_valid_sha256_hash(self, sample_document_hash):
         """Test validation of valid SHA-256 hash."""
-        valid_hash = "a" * 64
-        assert validate_hash_format(valid_hash) is True
+        assert validate_hash_format(sample_document_hash) is True
     
     def test_invalid_length(self):
         """Test validation fails for wrong length."""
@@ -209,6 +288,13 @@ class TestValidateHashFormat:
         invalid_hash = "g" * 64  # 'g' is not valid hex
         assert validate_hash_format(invalid_hash) is False
     
+    def test_int_literal_syntax_rejected(self):
+        """Test strings int(x, 16) would accept are still rejected."""
+        assert validate_hash_format("0x" + "a" * 62) is False
+        assert validate_hash_format("a_" * 32) is False
+        assert validate_hash_format(" " + "a" * 63) is False
+        assert validate_hash_format("+" + "a" * 63) is False
+    
     def test_empty_string(self):
         """Test validation fails for empty string."""
         assert validate_hash_format("") is False
@@ -216,6 +302,18 @@ class TestValidateHashFormat:
     def test_none_value(self):
         """Test validation fails for None."""
         assert validate_hash_format(None) is False
+    
+    def test_bulk_validation_matches_single(self, sample_document_hash):
+        """Test bulk validation agrees with per-item validation."""
+        valid = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(100)]
+        assert validate_hash_format_many(valid) == [True] * 100
+        
+        mixed = valid[:3] + [
+            sample_document_hash.upper(), "a" * 63, "a" * 65, "g" * 64,
+            "0x" + "a" * 62, "", None, "é" * 64
+        ]
+        assert validate_hash_format_many(mixed) == [validate_hash_format(h) for h in mixed]
+        assert validate_hash_format_many([]) == []
 
 
 class TestHashFileRange:
@@ -243,6 +341,47 @@ class TestHashFileRange:
         expected = hashlib.sha256(b"2345").hexdigest()
         
         assert result == expected
+    
+    def test_hash_file_range_unaligned_and_past_eof(self, tmp_path):
+        """Test ranges starting off a mapping boundary, past EOF, and empty."""
+        import mmap
+        
+        test_file = tmp_path / "test.bin"
+        content = os.urandom(mmap.ALLOCATIONGRANULARITY * 2 + 123)
+        test_file.write_bytes(content)
+        start = mmap.ALLOCATIONGRANULARITY + 7
+        
+        assert hash_file_range(test_file, start, start + 1000) == \
+            hashlib.sha256(content[start:start + 1000]).hexdigest()
+        assert hash_file_range(test_file, start, len(content) + 50) == \
+            hashlib.sha256(content[start:]).hexdigest()
+        assert hash_file_range(test_file, 5, 5) == hashlib.sha256(b"").hexdigest()
+    
+    def test_tree_hash_combines_range_leaves(self, big_pattern_file, tmp_path):
+        """Test tree_hash leaves are CHUNK_SIZE range hashes and the root combines them."""
+        content = big_pattern_file.read_bytes()
+        root, leaves = tree_hash(big_pattern_file)
+        
+        assert leaves == [
+            hashlib.sha256(content[:CHUNK_SIZE]).hexdigest(),
+            hashlib.sha256(content[CHUNK_SIZE:2 * CHUNK_SIZE]).hexdigest(),
+            hashlib.sha256(content[2 * CHUNK_SIZE:]).hexdigest(),
+        ]
+        node = lambda l, r: hashlib.sha256(b"NODE" + l + r).digest()
+        a, b, c = (bytes.fromhex(leaf) for leaf in leaves)
+        assert root == node(node(a, b), node(c, c)).hex()
+        
+        # Small or empty files collapse to a single leaf, which is the root
+        empty = tmp_path / "empty.bin"
+        empty.write_bytes(b"")
+        assert tree_hash(empty) == (hashlib.sha256(b"").hexdigest(), [hashlib.sha256(b"").hexdigest()])
+    
+    def test_tree_hash_independent_of_workers(self, big_pattern_file):
+        """Test the tree_hash root does not depend on the worker count."""
+        expected = tree_hash(big_pattern_file)
+        
+        for workers in (1, 2, 3):
+            assert tree_hash(big_pattern_file, workers=workers) == expected
 
 
 class TestIsSafeForMemory:
@@ -262,6 +401,32 @@ class TestIsSafeForMemory:
         
         assert is_safe_for_memory(test_file, threshold=500) is False
         assert is_safe_for_memory(test_file, threshold=2000) is True
+    
+    def test_batch_matches_single_checks(self, tmp_path, monkeypatch):
+        """Test batch check keeps every input key and stats each file once."""
+        from unittest.mock import patch
+        
+        paths = []
+        for i in range(20):
+            f = tmp_path / f"doc{i}.bin"
+            f.write_bytes(b"x" * (i * 100))
+            paths.append(f)
+        
+        with patch("backend.utils.os.stat", wraps=os.stat) as stat_call:
+            result = is_safe_for_memory_batch(paths + [str(paths[0])], threshold=1000)
+        
+        assert stat_call.call_count == 20
+        assert result == {
+            **{p: is_safe_for_memory(p, threshold=1000) for p in paths},
+            str(paths[0]): True,
+        }
+        assert is_safe_for_memory_batch([tmp_path / "missing.bin", tmp_path]) == {}
+        
+        # Aliases of one file each get their own entry
+        monkeypatch.chdir(tmp_path)
+        assert is_safe_for_memory_batch(["doc1.bin", "./doc1.bin"]) == {
+            "doc1.bin": True, "./doc1.bin": True
+        }
 
 
 class TestMaskSensitiveData:
@@ -281,6 +446,54 @@ class TestMaskSensitiveData:
         """Test masking empty string."""
         result = mask_sensitive_data("")
         assert result == ""
+    
+    def test_mask_beyond_prebuilt_lengths(self):
+        """Test masking strings longer than the prebuilt mask table."""
+        data = "x" * 200 + "tail"
+        
+        assert mask_sensitive_data(data) == "*" * 200 + "tail"
+        assert mask_sensitive_data(data, visible_chars=300) == "*" * 204
+
+
+class TestTrustScoreBatch:
+    """Tests for batched Trust Score calculation."""
+    
+    def test_batch_matches_scalar(self):
+        """Test batch scores and grades match calculate_trust_score exactly."""
+        # Includes grade-boundary sums (0.6, 0.9), out-of-range and NaN inputs
+        nan = float("nan")
+        cases = [
+            (True, 0.0, 0.0, 0.0),
+            (False, 0.0, 0.0, 0.0),
+            (True, 1.0 / 3.0, 0.0, 0.0),
+            (True, 0.5, 0.5, 1.0),
+            (False, -0.2, 1.7, 0.25),
+            (True, 0.123456, 0.654321, 0.999),
+            (False, nan, 0.0, 0.0),
+            (True, 0.3, nan, nan),
+        ]
+        scores, grades = calculate_trust_scores_batch(*zip(*cases))
+        
+        expected = [calculate_trust_score(*case) for case in cases]
+        assert scores == [r["trust_score"] for r in expected]
+        assert grades == [r["grade"] for r in expected]
+    
+    def test_empty_batch(self):
+        """Test an empty batch yields empty results."""
+        assert calculate_trust_scores_batch([], [], [], []) == ([], [])
+    
+    def test_repeat_scores_are_independent_copies(self):
+        """Test memoized scores can be mutated without affecting later calls."""
+        first = calculate_trust_score(True, 0.2, 0.1, 0.05)
+        first["grade"] = "F"
+        first["components"]["ela_analysis"]["score"] = -1
+        
+        second = calculate_trust_score(True, 0.2, 0.1, 0.05)
+        assert second["grade"] == "A"
+        assert second["components"]["ela_analysis"]["score"] == 0.8
+        # Equal-but-differently-typed inputs are cached separately
+        valid = calculate_trust_score(1, 0.2, 0.1, 0.05)["components"]["cryptographic_signature"]["valid"]
+        assert type(valid) is int
 
 
 @pytest.mark.memory
@@ -299,6 +512,21 @@ class TestMemoryEfficiency:
         current, peak = tracemalloc.get_traced_memory()
         tracemalloc.stop()
         
-        # Peak memory should not exceed 2MB (well under the 64KB chunk + overhead)
+        # Peak memory should not exceed 2MB (one 1MB chunk buffer + overhead)
         # This is generous to account for Python overhead
         assert peak < 2 * 1024 * 1024, f"Peak memory usage too high: {peak / 1024 / 1024:.2f}MB"
+    
+    def test_chunked_hash_reuses_buffer(self, large_file, monkeypatch):
+        """Test the streaming fallback holds a single chunk buffer."""
+        import tracemalloc
+        import backend.utils as utils
+        
+        monkeypatch.setattr(utils, "MAX_MEMORY_FILE_SIZE", 0)
+        
+        tracemalloc.start()
+        digest = secure_hash(large_file)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        assert digest == hashlib.sha256(large_file.read_bytes()).hexdigest()
+        assert peak < CHUNK_SIZE + 256 * 1024, f"Peak memory usage too high: {peak / 1024 / 1024:.2f}MB"
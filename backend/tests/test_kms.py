@@ -9,26 +9,33 @@ import os
 import base64
 from unittest.mock import patch, MagicMock
 
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from backend.services.kms import (
+    KMSService, KMSError, KeyEncryptionError, InstitutionKeys,
+    LegacyDocumentSigner, verify_signatures_batch, clear_verification_cache,
+    _derive_master_key, _NonceRing
+)
+
 
 class TestKMSService:
     """Tests for KMSService class."""
     
-    def test_initialization_with_env_vars(self):
+    def test_initialization_with_env_vars(self, monkeypatch):
         """Test KMS initializes with environment variables."""
         # Set specific env vars for this test
         test_url = 'http://test.supabase.co'
         test_key = 'test_key_' + 'x' * 200
+        monkeypatch.setenv('SUPABASE_URL', test_url)
+        monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', test_key)
         
-        with patch.dict(os.environ, {'SUPABASE_URL': test_url, 'SUPABASE_SERVICE_ROLE_KEY': test_key}):
-            from backend.services.kms import KMSService
-            kms = KMSService()
-            assert kms._supabase_url == test_url
-            assert kms._master_key is not None
-            assert len(kms._master_key) == 32  # AES-256 key
+        kms = KMSService()
+        assert kms._supabase_url == test_url
+        assert kms._master_key is not None
+        assert len(kms._master_key) == 32  # AES-256 key
     
     def test_initialization_with_explicit_params(self):
         """Test KMS initializes with explicit parameters."""
-        from backend.services.kms import KMSService
         kms = KMSService(
             supabase_url='http://custom.url',
             supabase_key='custom_key'
@@ -37,58 +44,54 @@ class TestKMSService:
     
     def test_initialization_fails_without_credentials(self):
         """Test KMS raises error without credentials."""
-        from backend.services.kms import KMSService, KMSError
         with patch.dict(os.environ, {}, clear=True):
             with pytest.raises(KMSError):
                 KMSService(supabase_url=None, supabase_key=None)
     
     def test_master_key_derivation_deterministic(self):
         """Test that master key derivation is deterministic."""
-        from backend.services.kms import KMSService
-        with patch.dict(os.environ, {'SUPABASE_URL': 'http://test.co', 'SUPABASE_SERVICE_ROLE_KEY': 'test_key'}):
-            kms1 = KMSService()
-            kms2 = KMSService()
-            assert kms1._master_key == kms2._master_key
+        kms1 = KMSService(supabase_url='http://test.co', supabase_key='test_key')
+        kms2 = KMSService(supabase_url='http://test.co', supabase_key='test_key')
+        assert kms1._master_key == kms2._master_key
     
     def test_master_key_derivation_changes_with_key(self):
         """Test that different service keys produce different master keys."""
-        from backend.services.kms import KMSService
         kms1 = KMSService(supabase_url='http://test.co', supabase_key='key1')
         kms2 = KMSService(supabase_url='http://test.co', supabase_key='key2')
         assert kms1._master_key != kms2._master_key
+    
+    def test_master_key_derivation_memoized(self):
+        """Test repeated construction with the same key reuses the derivation."""
+        KMSService(supabase_url='http://test.co', supabase_key='memo_key')
+        hits = _derive_master_key.cache_info().hits
+        kms = KMSService(supabase_url='http://other.co', supabase_key='memo_key')
+        
+        assert _derive_master_key.cache_info().hits == hits + 1
+        assert kms._master_key == _derive_master_key('memo_key')
 
 
 class TestKeyGeneration:
     """Tests for keypair generation."""
     
-    def test_generate_keypair(self):
+    def test_generate_keypair(self, kms):
         """Test Ed25519 keypair generation."""
-        from backend.services.kms import KMSService
-        from cryptography.hazmat.primitives.asymmetric import ed25519
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
         private_key, public_key = kms.generate_keypair()
         
         assert isinstance(private_key, ed25519.Ed25519PrivateKey)
         assert isinstance(public_key, ed25519.Ed25519PublicKey)
     
-    def test_keypair_uniqueness(self):
+    @pytest.mark.slow
+    def test_keypair_uniqueness(self, kms):
         """Test that each generation produces unique keys."""
-        from backend.services.kms import KMSService
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        
         pairs = [kms.generate_keypair() for _ in range(5)]
-        private_keys = [kms.serialize_private_key(p[0]) for p in pairs]
+        # Compare raw 32-byte scalars; PEM encoding adds nothing to the check
+        private_keys = [p[0].private_bytes_raw() for p in pairs]
         
         # All private keys should be unique
         assert len(set(private_keys)) == 5
     
-    def test_public_key_serialization(self):
+    def test_public_key_serialization(self, kms):
         """Test public key serialization to PEM."""
-        from backend.services.kms import KMSService
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
         _, public_key = kms.generate_keypair()
         
         pem = kms.serialize_public_key(public_key)
@@ -97,11 +100,8 @@ class TestKeyGeneration:
         assert '-----BEGIN PUBLIC KEY-----' in pem
         assert '-----END PUBLIC KEY-----' in pem
     
-    def test_private_key_serialization(self):
+    def test_private_key_serialization(self, kms):
         """Test private key serialization to PEM bytes."""
-        from backend.services.kms import KMSService
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
         private_key, _ = kms.generate_keypair()
         
         pem_bytes = kms.serialize_private_key(private_key)
@@ -113,12 +113,9 @@ class TestKeyGeneration:
 class TestKeyEncryption:
     """Tests for key encryption and decryption."""
     
-    def test_encrypt_private_key(self):
+    def test_encrypt_private_key(self, kms, keypair):
         """Test private key encryption produces valid output."""
-        from backend.services.kms import KMSService
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        private_key, _ = kms.generate_keypair()
+        private_key, _ = keypair
         
         encrypted, nonce = kms.encrypt_private_key(private_key)
         
@@ -130,12 +127,9 @@ class TestKeyEncryption:
         base64.b64decode(encrypted)
         base64.b64decode(nonce)
     
-    def test_encrypt_decrypt_roundtrip(self):
+    def test_encrypt_decrypt_roundtrip(self, kms, keypair):
         """Test encryption followed by decryption returns original key."""
-        from backend.services.kms import KMSService
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        private_key, _ = kms.generate_keypair()
+        private_key, _ = keypair
         
         # Get original key bytes for comparison
         original_bytes = kms.serialize_private_key(private_key)
@@ -148,12 +142,9 @@ class TestKeyEncryption:
         decrypted_bytes = kms.serialize_private_key(decrypted_key)
         assert original_bytes == decrypted_bytes
     
-    def test_decrypt_with_wrong_nonce_fails(self):
+    def test_decrypt_with_wrong_nonce_fails(self, kms, keypair):
         """Test decryption fails with incorrect nonce."""
-        from backend.services.kms import KMSService, KeyEncryptionError
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        private_key, _ = kms.generate_keypair()
+        private_key, _ = keypair
         
         encrypted, _ = kms.encrypt_private_key(private_key)
         
@@ -163,28 +154,33 @@ class TestKeyEncryption:
         with pytest.raises(KeyEncryptionError):
             kms.decrypt_private_key(encrypted, wrong_nonce)
     
-    def test_decrypt_with_corrupted_data_fails(self):
+    def test_decrypt_with_corrupted_data_fails(self, kms, keypair):
         """Test decryption fails with corrupted ciphertext."""
-        from backend.services.kms import KMSService, KeyEncryptionError
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        private_key, _ = kms.generate_keypair()
+        private_key, _ = keypair
         
         _, nonce = kms.encrypt_private_key(private_key)
         corrupted = base64.b64encode(b'corrupted_data').decode('utf-8')
         
         with pytest.raises(KeyEncryptionError):
             kms.decrypt_private_key(corrupted, nonce)
+    
+    def test_nonce_ring_never_repeats(self):
+        """Test pooled nonces are unique across refills and reset after fork."""
+        ring = _NonceRing(count=4)
+        nonces = [ring.next() for _ in range(10)]
+        ring._reset_after_fork()
+        nonces.append(ring.next())
+        
+        assert all(len(n) == 12 for n in nonces)
+        assert len(set(nonces)) == len(nonces)
 
 
+@pytest.mark.slow
 class TestInstitutionKeys:
     """Tests for institution key creation."""
     
-    def test_create_institution_keys(self):
+    def test_create_institution_keys(self, kms):
         """Test complete institution keys creation."""
-        from backend.services.kms import KMSService, InstitutionKeys
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
         keys = kms.create_institution_keys()
         
         assert isinstance(keys, InstitutionKeys)
@@ -195,12 +191,8 @@ class TestInstitutionKeys:
         # Verify public key format
         assert '-----BEGIN PUBLIC KEY-----' in keys.public_key_pem
     
-    def test_institution_keys_are_unique(self):
+    def test_institution_keys_are_unique(self, kms):
         """Test each call produces unique keys."""
-        from backend.services.kms import KMSService
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        
         keys1 = kms.create_institution_keys()
         keys2 = kms.create_institution_keys()
         
@@ -211,68 +203,108 @@ class TestInstitutionKeys:
 class TestLegacyDocumentSigner:
     """Tests for legacy document signer."""
     
-    def test_sign_and_verify(self):
+    def test_sign_and_verify(self, legacy_signer):
         """Test signing and verifying with legacy signer."""
-        from backend.services.kms import LegacyDocumentSigner
-        
-        signer = LegacyDocumentSigner()
-        
         data_hash = "abc123def456"
-        signature = signer.sign_document(data_hash)
+        signature = legacy_signer.sign_document(data_hash)
         
         assert isinstance(signature, str)
-        assert signer.verify_signature(data_hash, signature)
+        assert legacy_signer.verify_signature(data_hash, signature)
     
-    def test_verify_fails_with_wrong_hash(self):
+    def test_verify_fails_with_wrong_hash(self, legacy_signer):
         """Test verification fails with different hash."""
-        from backend.services.kms import LegacyDocumentSigner
-        
-        signer = LegacyDocumentSigner()
-        
-        signature = signer.sign_document("original_hash")
-        assert not signer.verify_signature("different_hash", signature)
+        signature = legacy_signer.sign_document("original_hash")
+        assert not legacy_signer.verify_signature("different_hash", signature)
     
-    def test_verify_fails_with_wrong_signature(self):
+    def test_verify_fails_with_wrong_signature(self, legacy_signer):
         """Test verification fails with invalid signature."""
-        from backend.services.kms import LegacyDocumentSigner
+        wrong_sig = base64.b64encode(b'wrong_signature').decode('utf-8')
+        assert not legacy_signer.verify_signature("some_hash", wrong_sig)
+    
+    def test_repeat_verification_skips_curve_check(self):
+        """Test a repeated valid verification is answered from the cache."""
+        from conftest import TEST_SIGNING_KEY_PATH
         
-        signer = LegacyDocumentSigner()
+        signer = LegacyDocumentSigner(key_pem=TEST_SIGNING_KEY_PATH.read_bytes())
+        spy = MagicMock(wraps=signer._public_key)
+        signer._public_key = spy
         
-        wrong_sig = base64.b64encode(b'wrong_signature').decode('utf-8')
-        assert not signer.verify_signature("some_hash", wrong_sig)
+        data_hash = os.urandom(32).hex()
+        signature = signer.sign_document(data_hash)
+        
+        assert signer.verify_signature(data_hash, signature)
+        assert signer.verify_signature(data_hash, signature)
+        assert spy.verify.call_count == 1
+        
+        # Failures are never cached
+        assert not signer.verify_signature("different_hash", signature)
+        assert not signer.verify_signature("different_hash", signature)
+        assert spy.verify.call_count == 3
+        
+        # Clearing the cache forces a fresh curve check
+        clear_verification_cache()
+        assert signer.verify_signature(data_hash, signature)
+        assert spy.verify.call_count == 4
     
-    def test_get_public_key_pem(self):
+    def test_get_public_key_pem(self, legacy_signer):
         """Test getting public key in PEM format."""
-        from backend.services.kms import LegacyDocumentSigner
+        pem = legacy_signer.get_public_key_pem()
         
-        signer = LegacyDocumentSigner()
+        assert '-----BEGIN PUBLIC KEY-----' in pem
+        assert legacy_signer.get_public_key_pem() is pem  # serialized once
+    
+    def test_injected_key_pem(self, legacy_signer):
+        """Test that an injected PEM key yields the same keypair."""
+        from conftest import TEST_SIGNING_KEY_PATH
         
-        pem = signer.get_public_key_pem()
+        signer = LegacyDocumentSigner(key_pem=TEST_SIGNING_KEY_PATH.read_bytes())
         
-        assert '-----BEGIN PUBLIC KEY-----' in pem
+        assert signer.get_public_key_pem() == legacy_signer.get_public_key_pem()
+        assert signer.verify_signature("hash", legacy_signer.sign_document("hash"))
+
+
+class TestBatchVerification:
+    """Tests for multi-key signature verification."""
+    
+    def test_batch_verify_roundtrip(self, keypair_pool):
+        """Test batched multi-key verification matches a scalar loop over 64 docs."""
+        public_keys, data_hashes, signatures = [], [], []
+        for i in range(64):
+            private_key, public_key = keypair_pool[i % len(keypair_pool)]
+            data_hash = os.urandom(32).hex()
+            signature = private_key.sign(data_hash.encode('utf-8'))
+            if i % 5 == 0:
+                data_hash = "tampered" + data_hash[8:]
+            public_keys.append(public_key)
+            data_hashes.append(data_hash)
+            signatures.append(base64.b64encode(signature).decode('utf-8'))
+        
+        def scalar(public_key, data_hash, signature_b64):
+            try:
+                public_key.verify(base64.b64decode(signature_b64), data_hash.encode('utf-8'))
+                return True
+            except Exception:
+                return False
+        
+        expected = [scalar(*args) for args in zip(public_keys, data_hashes, signatures)]
+        
+        assert verify_signatures_batch(public_keys, data_hashes, signatures) == expected
+        assert expected.count(False) == 13
 
 
 class TestKeyLoading:
     """Tests for loading public keys."""
     
-    def test_load_public_key_from_pem(self):
+    def test_load_public_key_from_pem(self, kms, keypair):
         """Test loading a public key from PEM string."""
-        from backend.services.kms import KMSService
-        from cryptography.hazmat.primitives.asymmetric import ed25519
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        _, public_key = kms.generate_keypair()
+        _, public_key = keypair
         pem = kms.serialize_public_key(public_key)
         
         loaded = kms.load_public_key(pem)
         
         assert isinstance(loaded, ed25519.Ed25519PublicKey)
     
-    def test_load_public_key_invalid_pem_fails(self):
+    def test_load_public_key_invalid_pem_fails(self, kms):
         """Test loading invalid PEM fails gracefully."""
-        from backend.services.kms import KMSService, KMSError
-        
-        kms = KMSService(supabase_url='http://test.co', supabase_key='test_key')
-        
         with pytest.raises(KMSError):
             kms.load_public_key("not a valid PEM")
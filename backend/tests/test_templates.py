@@ -61,6 +61,18 @@ class TestMerkleTree:
         # Should pad to 4 and build tree
         assert tree.root_hash is not None
     
+    def test_many_page_tree_matches_hash_pair(self):
+        """Test a 100-page tree matches a reference built from hash_pair."""
+        hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(100)]
+        tree = MerkleTree(hashes)
+        
+        level = hashes + [hashes[-1]] * 28  # padded to 128
+        while len(level) > 1:
+            level = [MerkleTree.hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        
+        assert tree.root_hash == level[0]
+        assert all(MerkleTree.verify_proof(tree.get_proof(i)) for i in (0, 63, 99))
+    
     def test_hash_pair_deterministic(self):
         """Test that hash_pair is deterministic."""
         result1 = MerkleTree.hash_pair("left", "right")
@@ -74,6 +86,14 @@ class TestMerkleTree:
         result2 = MerkleTree.hash_pair("b", "a")
         
         assert result1 != result2
+    
+    def test_hash_pair_matches_concatenation(self):
+        """Test that hash_pair equals hashing the concatenated pair."""
+        left, right = "a" * 64, "b" * 64
+        expected = hashlib.sha256((left + right).encode('utf-8')).hexdigest()
+        
+        assert MerkleTree.hash_pair(left, right) == expected
+        assert MerkleTree.hash_pair(left.encode(), right.encode()) == expected
 
 
 class TestMerkleProof:
@@ -139,32 +159,23 @@ class TestMerkleProof:
             tree.get_proof(-1)
 
 
+@pytest.fixture(scope="module")
+def current_tree():
+    """Four-page tree of the document as it is now, shared by tamper tests."""
+    return MerkleTree(["a", "b", "c", "d"])
+
+
 class TestTamperDetection:
     """Tests for tamper detection functionality."""
     
-    def test_find_tampered_pages_none(self):
-        """Test detection when no pages tampered."""
-        original = ["a", "b", "c"]
-        tree = MerkleTree(original)
-        
-        tampered = tree.find_tampered_pages(original)
-        assert tampered == []
-    
-    def test_find_tampered_pages_single(self):
-        """Test detection of single tampered page."""
-        original = ["a", "b", "c"]
-        tree = MerkleTree(["a", "TAMPERED", "c"])
-        
-        tampered = tree.find_tampered_pages(original)
-        assert tampered == [2]  # 1-indexed
-    
-    def test_find_tampered_pages_multiple(self):
-        """Test detection of multiple tampered pages."""
-        original = ["a", "b", "c", "d"]
-        tree = MerkleTree(["X", "b", "Y", "d"])
-        
-        tampered = tree.find_tampered_pages(original)
-        assert set(tampered) == {1, 3}
+    @pytest.mark.parametrize("original, expected", [
+        (["a", "b", "c", "d"], []),           # nothing tampered
+        (["a", "TAMPERED", "c"], [2]),        # single page, 1-indexed
+        (["X", "b", "Y", "d"], [1, 3]),       # multiple pages
+    ])
+    def test_find_tampered_pages(self, current_tree, original, expected):
+        """Test detection of tampered pages against one shared tree."""
+        assert current_tree.find_tampered_pages(original) == expected
 
 
 class TestW3CVerifiableCredential:
@@ -252,6 +263,27 @@ class TestW3CVerifiableCredential:
     def test_credential_context_is_valid(self):
         """Test that W3C VC context URLs are correct."""
         assert W3CVerifiableCredential.CONTEXT_VC_V2 == "https://www.w3.org/ns/credentials/v2"
+    
+    def test_credential_skeleton_copied_and_ordered(self):
+        """Test that credentials get their own skeleton copies, in key order."""
+        kwargs = dict(
+            issuer_id="did:example:university",
+            issuer_name="Test University",
+            subject_id="did:example:student",
+            subject_name="John Doe",
+            degree="Bachelor of Science",
+            major="Computer Science",
+            graduation_date="2026-05-15"
+        )
+        first = W3CVerifiableCredential.create_academic_credential(credential_id="a", **kwargs)
+        second = W3CVerifiableCredential.create_academic_credential(credential_id="b", **kwargs)
+        
+        assert first["@context"] == second["@context"]
+        assert first["@context"] is not second["@context"]
+        assert first["@context"][1] == W3CVerifiableCredential.CONTEXT_ACADEMIC
+        assert first["@context"][1] is not W3CVerifiableCredential.CONTEXT_ACADEMIC
+        assert list(first)[:3] == ["@context", "id", "type"]
+        assert first["id"] == "urn:uuid:a"
 
 
 class TestTemplateEngine:
@@ -292,7 +324,95 @@ class TestTemplateEngine:
         )
         
         assert "AcademicCredential" in cred["type"]
-    
+
+    def test_credentials_do_not_share_mutable_fields(self):
+        """Test mutating one credential's context/type leaves later ones intact."""
+        engine = TemplateEngine()
+
+        for template_type in (DocumentType.ACADEMIC, DocumentType.AADHAAR, DocumentType.GENERIC):
+            first, second = engine.generate_credentials(
+                template_type=template_type,
+                institution_id="inst-123",
+                institution_name="Test Institution",
+                records=[{}, {}]
+            )
+            first["type"].append("Injected")
+            first["@context"].append("https://evil.example/ctx")
+            for context in first["@context"]:
+                if isinstance(context, dict):
+                    context["@context"]["injected"] = "x"
+            
+            third = engine.generate_credentials(
+                template_type=template_type,
+                institution_id="inst-123",
+                institution_name="Test Institution",
+                records=[{}]
+            )[0]
+            for cred in (second, third):
+                assert "Injected" not in cred["type"]
+                assert "https://evil.example/ctx" not in cred["@context"]
+                assert all(
+                    "injected" not in context["@context"]
+                    for context in cred["@context"] if isinstance(context, dict)
+                )
+
+    def test_generate_credentials_batch(self):
+        """Test batch credential generation shares one timestamp, unique IDs."""
+        engine = TemplateEngine()
+        records = [{"subject_name": f"Student {i}", "degree": "BSc"} for i in range(5)]
+
+        creds = engine.generate_credentials(
+            template_type=DocumentType.ACADEMIC,
+            institution_id="univ-456",
+            institution_name="State University",
+            records=records,
+            signatures=[f"sig{i}" for i in range(5)],
+            document_hashes=[f"hash{i}" for i in range(5)]
+        )
+
+        assert len(creds) == 5
+        assert len({c["id"] for c in creds}) == 5
+        assert len({c["issuanceDate"] for c in creds}) == 1
+        assert {c["proof"]["created"] for c in creds} == {creds[0]["issuanceDate"]}
+        assert creds[3]["credentialSubject"]["name"] == "Student 3"
+        assert creds[3]["proof"]["documentHash"] == "hash3"
+
+    def test_generate_credentials_subject_ids(self):
+        """Test supplied subject IDs are kept and fallbacks come from the batch pool."""
+        from unittest.mock import patch
+
+        engine = TemplateEngine()
+        records = [{"subject_id": "did:example:alice"}, {}, {"subject_id": ""}]
+
+        with patch("backend.services.templates.uuid.uuid4") as uuid4:
+            creds = engine.generate_credentials(
+                template_type=DocumentType.ACADEMIC,
+                institution_id="univ-456",
+                institution_name="State University",
+                records=records
+            )
+
+        uuid4.assert_not_called()
+        subject_ids = [c["credentialSubject"]["id"] for c in creds]
+        assert subject_ids[0] == "did:example:alice"
+        assert all(s.startswith("did:example:") for s in subject_ids[1:])
+        assert len(set(subject_ids)) == 3
+
+    def test_generate_credentials_misaligned_signatures(self):
+        """Test batch generation rejects signatures not aligned with records."""
+        from backend.services.templates import TemplateError
+
+        engine = TemplateEngine()
+
+        with pytest.raises(TemplateError):
+            engine.generate_credentials(
+                template_type=DocumentType.GENERIC,
+                institution_id="inst-123",
+                institution_name="Test Institution",
+                records=[{"a": 1}, {"b": 2}],
+                signatures=["only-one"]
+            )
+
     def test_build_qr_payload(self):
         """Test QR payload generation for W3C compliance."""
         engine = TemplateEngine()
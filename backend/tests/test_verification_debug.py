@@ -16,32 +16,24 @@ Run with:
 
 import pytest
 import os
-import sys
 import json
 import base64
 import hashlib
-import tempfile
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
-# Add backend to path for imports
-import sys
-import os
-
-# Ensure backend parent directory is in path for consistent imports
-backend_dir = os.path.dirname(os.path.dirname(__file__))
-backend_parent = os.path.dirname(backend_dir)
-if backend_parent not in sys.path:
-    sys.path.insert(0, backend_parent)
-if backend_dir not in sys.path:
-    sys.path.insert(0, backend_dir)
+import fitz
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 
+# backend/'s parent is put on sys.path by conftest.py
 # Import using backend.* to be consistent with test_api.py
 from backend.utils import secure_hash, hash_string
 from backend.services.kms import KMSService, LegacyDocumentSigner
 from backend.services.scanner import (
     PDFQRScanner, QRPayload, CleanDocumentHasher,
-    verify_document_signature, scan_and_verify,
+    verify_document_signature, verify_document_signatures_batch,
+    scan_and_verify, scan_and_verify_batch,
     VerificationErrorCode, QRNotFoundError, InvalidPayloadError
 )
 from backend.qr_service import (
@@ -53,59 +45,49 @@ from backend.qr_service import (
 # Fixtures
 # ============================================================
 
-@pytest.fixture
-def verification_temp_pdf():
-    """Creates a minimal valid PDF for testing verification."""
-    import fitz
-    
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-        doc = fitz.open()
+@pytest.fixture(scope="session")
+def verification_temp_pdf(tmp_path_factory):
+    """
+    Creates a minimal valid PDF for testing verification.
+    
+    Built once per session and never modified; tests write stamped
+    output to their own paths.
+    """
+    path = tmp_path_factory.mktemp("verification") / "single_page.pdf"
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((100, 100), "Test Document Content")
+    page.insert_text((100, 150), "This is a test certificate.")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def multi_page_pdf(tmp_path_factory):
+    """Creates a multi-page PDF for Merkle tree testing (once per session, read-only)."""
+    path = tmp_path_factory.mktemp("verification") / "multi_page.pdf"
+    doc = fitz.open()
+    
+    for i in range(5):
         page = doc.new_page()
-        page.insert_text((100, 100), "Test Document Content")
-        page.insert_text((100, 150), "This is a test certificate.")
-        doc.save(f.name)
-        doc.close()
-        yield f.name
+        page.insert_text((100, 100), f"Page {i + 1} Content")
+        page.insert_text((100, 150), f"This is page {i + 1} of the document.")
     
-    # Cleanup
-    try:
-        os.unlink(f.name)
-    except:
-        pass
+    doc.save(str(path))
+    doc.close()
+    return str(path)
 
 
-@pytest.fixture
-def multi_page_pdf():
-    """Creates a multi-page PDF for Merkle tree testing."""
-    import fitz
+@pytest.fixture(scope="session")
+def qr_asset(verification_temp_pdf, legacy_signer):
+    """
+    Signed W3C payload and rendered QR for the base PDF, built once.
     
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
-        doc = fitz.open()
-        
-        for i in range(5):
-            page = doc.new_page()
-            page.insert_text((100, 100), f"Page {i + 1} Content")
-            page.insert_text((100, 150), f"This is page {i + 1} of the document.")
-        
-        doc.save(f.name)
-        doc.close()
-        yield f.name
+    The QR is kept as PNG bytes so each test gets its own Image object.
+    """
+    from io import BytesIO
     
-    try:
-        os.unlink(f.name)
-    except:
-        pass
-
-
-@pytest.fixture
-def legacy_signer():
-    """Creates a legacy document signer."""
-    return LegacyDocumentSigner()
-
-
-@pytest.fixture
-def stamped_pdf(verification_temp_pdf, legacy_signer):
-    """Creates a stamped PDF with QR code."""
     # Calculate hash
     doc_hash = secure_hash(verification_temp_pdf)
     
@@ -123,18 +105,35 @@ def stamped_pdf(verification_temp_pdf, legacy_signer):
     )
     
     # Generate QR image
-    qr_img = generate_qr(payload)
+    buffer = BytesIO()
+    generate_qr(payload).save(buffer, format="PNG")
+    
+    return buffer.getvalue(), payload, signature, doc_hash
+
+
+@pytest.fixture(scope="session")
+def stamped_pdf_bytes(verification_temp_pdf, qr_asset):
+    """Stamps the base PDF in memory once per session."""
+    from io import BytesIO
+    from PIL import Image
     
-    # Stamp document
-    output_path = verification_temp_pdf.replace(".pdf", "_stamped.pdf")
-    stamp_document(verification_temp_pdf, output_path, qr_img)
+    qr_png = qr_asset[0]
+    return stamp_document(
+        None, None, Image.open(BytesIO(qr_png)),
+        in_stream=Path(verification_temp_pdf).read_bytes()
+    )
+
+
+@pytest.fixture
+def stamped_pdf(stamped_pdf_bytes, qr_asset, tmp_path):
+    """Creates a stamped PDF with QR code."""
+    _, payload, signature, doc_hash = qr_asset
     
-    yield output_path, doc_hash, signature, payload
+    # Write into a per-test path so tests may tamper with the output
+    output_path = tmp_path / "single_page_stamped.pdf"
+    output_path.write_bytes(stamped_pdf_bytes)
     
-    try:
-        os.unlink(output_path)
-    except:
-        pass
+    return str(output_path), doc_hash, signature, payload
 
 
 # ============================================================
@@ -202,6 +201,21 @@ class TestQRExtractionPipeline:
             assert len(decoded) == 64, f"Signature wrong length after decode: {len(decoded)}"
         except Exception as e:
             pytest.fail(f"Signature is not valid base64: {e}")
+    
+    def test_in_memory_stamp_matches_file_stamp(self, verification_temp_pdf, qr_asset,
+                                                stamped_pdf_bytes, tmp_path):
+        """Test that stamping from bytes yields the same pages as stamping a file."""
+        from io import BytesIO
+        from PIL import Image
+        
+        file_path = str(tmp_path / "file_stamped.pdf")
+        stamp_document(verification_temp_pdf, file_path, Image.open(BytesIO(qr_asset[0])))
+        
+        with fitz.open(file_path) as from_file, \
+                fitz.open(stream=stamped_pdf_bytes, filetype="pdf") as from_bytes:
+            assert len(from_file) == len(from_bytes)
+            assert from_file[0].get_text() == from_bytes[0].get_text()
+            assert len(from_file[0].get_images()) == len(from_bytes[0].get_images()) == 1
 
 
 # ============================================================
@@ -213,8 +227,6 @@ class TestTamperDetection:
     
     def test_tampered_pdf_fails_verification(self, stamped_pdf, legacy_signer):
         """Test that modifying PDF text causes signature mismatch."""
-        import fitz
-        
         output_path, original_hash, signature, payload = stamped_pdf
         
         # Tamper with the document
@@ -257,8 +269,6 @@ class TestTamperDetection:
         This tests the cryptographic integrity guarantee - even the smallest
         change must be detected.
         """
-        import fitz
-        
         output_path, original_hash, signature, payload = stamped_pdf
         
         # Read original file bytes
@@ -318,8 +328,6 @@ class TestTamperDetection:
         Some attackers might try to change only metadata thinking it won't
         affect the cryptographic hash.
         """
-        import fitz
-        
         output_path, original_hash, signature, payload = stamped_pdf
         
         # Open and modify metadata
@@ -395,9 +403,24 @@ class TestTamperDetection:
 class TestMerkleTreeVerification:
     """Tests for multi-page PDF Merkle tree verification."""
     
+    def test_page_hashes_match_json_dumps_canonical_form(self, multi_page_pdf):
+        """Test page hashes are unchanged from the json.dumps(sort_keys=True) form."""
+        from backend.services.templates import extract_page_hashes_from_pdf
+        
+        with fitz.open(multi_page_pdf) as doc:
+            expected = [
+                hashlib.sha256(json.dumps(
+                    page.get_text("rawdict", flags=fitz.TEXT_PRESERVE_WHITESPACE),
+                    sort_keys=True
+                ).encode('utf-8')).hexdigest()
+                for page in doc
+            ]
+        
+        assert [ph.hash for ph in extract_page_hashes_from_pdf(multi_page_pdf)] == expected
+    
     def test_multipage_merkle_root_in_qr(self, multi_page_pdf, legacy_signer):
         """Test that multi-page PDFs have Merkle root in QR."""
-        from services.templates import MerkleTree, extract_page_hashes_from_pdf
+        from backend.services.templates import MerkleTree, extract_page_hashes_from_pdf
         
         # Calculate page hashes
         page_hashes = list(extract_page_hashes_from_pdf(multi_page_pdf))
@@ -456,6 +479,95 @@ class TestScannerRobustness:
         
         assert result is None, "Should return None for PDF without QR"
     
+    def test_decoded_qr_cached_until_file_changes(self, tmp_path):
+        """Test repeat scans of an unchanged file skip decoding."""
+        pdf_path = tmp_path / "cached.pdf"
+        pdf_path.write_bytes(b"%PDF-1.4 placeholder")
+        scanner = PDFQRScanner()
+        
+        with patch.object(PDFQRScanner, "_decode_page", return_value='{"id": "x"}') as decode:
+            first = scanner.extract_qr_from_page(str(pdf_path))
+            second = scanner.extract_qr_from_page(str(pdf_path))
+            assert decode.call_count == 1
+            assert first == second == {"id": "x"}
+            assert first is not second
+            
+            pdf_path.write_bytes(b"%PDF-1.4 placeholder, rewritten")
+            scanner.extract_qr_from_page(str(pdf_path))
+            assert decode.call_count == 2
+        
+        with patch.object(PDFQRScanner, "_decode_page", return_value=None) as decode:
+            other = tmp_path / "blank.pdf"
+            other.write_bytes(b"%PDF-1.4 blank")
+            assert scanner.extract_qr_from_page(str(other)) is None
+            assert scanner.extract_qr_from_page(str(other)) is None
+            assert decode.call_count == 2  # misses are retried
+    
+    def test_scan_all_pages_opens_document_once(self, multi_page_pdf, tmp_path):
+        """Test scan_all_pages decodes every page from a single open document."""
+        # Private copy so the stubbed decode never lands in the shared QR cache
+        pdf_path = tmp_path / "pages.pdf"
+        pdf_path.write_bytes(Path(multi_page_pdf).read_bytes())
+        pages_seen = []
+        
+        def decode(doc, page_num):
+            pages_seen.append(page_num)
+            return '{"page": 3}' if page_num == 3 else None
+        
+        scanner = PDFQRScanner()
+        with patch.object(PDFQRScanner, "_decode_doc_page", side_effect=decode), \
+                patch("backend.services.scanner.fitz.open", wraps=fitz.open) as opened:
+            result, page = scanner.scan_all_pages(str(pdf_path))
+        
+        assert (result, page) == ({"page": 3}, 3)
+        assert pages_seen == [0, 1, 2, 3]
+        assert opened.call_count == 1
+    
+    def test_render_fallback_tries_stamp_region_first(self, verification_temp_pdf):
+        """Test page rendering starts with the default stamp region, not the full page."""
+        clips = []
+        real_render = PDFQRScanner._render_page_to_image
+        
+        def render(self, page, dpi, clip=None):
+            clips.append(clip)
+            return real_render(self, page, dpi, clip)
+        
+        scanner = PDFQRScanner()
+        with fitz.open(verification_temp_pdf) as doc, \
+                patch.object(PDFQRScanner, "_render_page_to_image", render), \
+                patch.object(PDFQRScanner, "_decode_embedded_images", return_value=None), \
+                patch.object(PDFQRScanner, "_decode_qr_pyzbar", return_value=None), \
+                patch.object(PDFQRScanner, "_decode_qr_opencv",
+                             side_effect=['{"found": true}']):
+            qr_data = scanner._decode_doc_page(doc, 0)
+            width = doc[0].rect.width
+        
+        assert qr_data == '{"found": true}'
+        assert clips == [fitz.Rect(width - 136 - 18, 36 - 18, width - 36 + 18, 136 + 18)]
+    
+    def test_render_fallback_escalates_dpi(self, verification_temp_pdf):
+        """Test each region is rendered at min_dpi before the full DPI."""
+        attempts = []
+        real_render = PDFQRScanner._render_page_to_image
+        
+        def render(self, page, dpi, clip=None):
+            attempts.append((clip is None, dpi))
+            return real_render(self, page, dpi, clip)
+        
+        scanner = PDFQRScanner(dpi=300, min_dpi=150)
+        with fitz.open(verification_temp_pdf) as doc, \
+                patch.object(PDFQRScanner, "_render_page_to_image", render), \
+                patch.object(PDFQRScanner, "_decode_embedded_images", return_value=None), \
+                patch.object(PDFQRScanner, "_decode_qr_pyzbar", return_value=None), \
+                patch.object(PDFQRScanner, "_decode_qr_opencv",
+                             side_effect=[None, None, '{"found": true}']):
+            qr_data = scanner._decode_doc_page(doc, 0)
+        
+        assert qr_data == '{"found": true}'
+        # (full page?, dpi): stamp region at 150 then 300, then full page at 150
+        assert attempts == [(False, 150), (False, 300), (True, 150)]
+        assert PDFQRScanner(dpi=300, min_dpi=None)._render_dpis() == (300,)
+    
     def test_scan_all_pages_finds_qr(self, stamped_pdf):
         """Test scanning all pages finds the QR."""
         output_path, _, _, _ = stamped_pdf
@@ -575,6 +687,33 @@ class TestSignatureVerification:
         
         assert result is False
     
+    def test_wrong_length_signature_rejected_before_verify(self, legacy_signer):
+        """Test that truncated signatures never reach Ed25519 verification."""
+        doc_hash = "test_document_hash_12345"
+        signature = base64.b64decode(legacy_signer.sign_document(doc_hash))
+        truncated = base64.b64encode(signature[:-1]).decode()
+        public_key_pem = legacy_signer.get_public_key_pem()
+        
+        key = MagicMock(spec=ed25519.Ed25519PublicKey)
+        with patch("backend.services.scanner._load_ed25519_public_key", return_value=key):
+            assert verify_document_signature(doc_hash, truncated, public_key_pem) is False
+        key.verify.assert_not_called()
+    
+    def test_repeat_verification_answered_from_cache(self, legacy_signer):
+        """Test re-verifying the same hash/signature/key skips the curve check."""
+        from backend.services.scanner import _load_ed25519_public_key
+        
+        doc_hash = os.urandom(32).hex()
+        signature = legacy_signer.sign_document(doc_hash)
+        public_key_pem = legacy_signer.get_public_key_pem()
+        spy = MagicMock(wraps=_load_ed25519_public_key(public_key_pem))
+        
+        with patch("backend.services.scanner._load_ed25519_public_key", return_value=spy):
+            assert verify_document_signature(doc_hash, signature, public_key_pem)
+            assert verify_document_signature(doc_hash, signature, public_key_pem)
+        
+        assert spy.verify.call_count == 1
+    
     def test_wrong_hash_fails(self, legacy_signer):
         """Test that wrong hash fails verification."""
         doc_hash = "original_hash"
@@ -594,18 +733,46 @@ class TestSignatureVerification:
         # Generate a different key
         different_signer = LegacyDocumentSigner()
         # Force new key generation
-        from cryptography.hazmat.primitives.asymmetric import ed25519
         different_private = ed25519.Ed25519PrivateKey.generate()
         different_public_pem = different_private.public_key().public_bytes(
-            encoding=__import__('cryptography.hazmat.primitives.serialization', 
-                              fromlist=['Encoding']).Encoding.PEM,
-            format=__import__('cryptography.hazmat.primitives.serialization',
-                            fromlist=['PublicFormat']).PublicFormat.SubjectPublicKeyInfo
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
         ).decode()
         
         result = verify_document_signature(doc_hash, signature, different_public_pem)
         
         assert result is False
+    
+    def test_batch_verification_matches_single(self, legacy_signer):
+        """Test batch verification agrees with one-at-a-time verification."""
+        public_key_pem = legacy_signer.get_public_key_pem()
+        items = []
+        for i in range(6):
+            doc_hash = f"batch_hash_{i}"
+            items.append((doc_hash, legacy_signer.sign_document(doc_hash), public_key_pem))
+        items.append(("batch_hash_0", items[1][1], public_key_pem))  # wrong signature
+        items.append(("batch_hash_0", items[0][1], "not a PEM"))       # bad key
+        
+        expected = [verify_document_signature(*item) for item in items]
+        
+        assert verify_document_signatures_batch(items) == expected
+        assert expected == [True] * 6 + [False, False]
+    
+    def test_public_key_parsed_once_per_pem(self, legacy_signer):
+        """Test repeated verifications reuse the parsed public key."""
+        from backend.services.scanner import _load_ed25519_public_key
+        
+        public_key_pem = legacy_signer.get_public_key_pem()
+        _load_ed25519_public_key.cache_clear()
+        
+        for i in range(5):
+            doc_hash = f"cached_key_hash_{i}"
+            signature = legacy_signer.sign_document(doc_hash)
+            assert verify_document_signature(doc_hash, signature, public_key_pem)
+        assert not verify_document_signature("h", "c2ln", "not a PEM")
+        
+        info = _load_ed25519_public_key.cache_info()
+        assert (info.misses, info.hits) == (2, 4)
 
 
 # ============================================================
@@ -684,6 +851,43 @@ class TestEndToEndIntegration:
         assert result.error_code == VerificationErrorCode.SUCCESS
         assert result.signature_valid is True
         assert result.payload.document_hash == doc_hash
+    
+    def test_scan_and_verify_batch_fetches_each_issuer_once(self, verification_temp_pdf,
+                                                           legacy_signer):
+        """Test batch scanning verifies every PDF and looks up each issuer once."""
+        good = generate_w3c_qr_payload("batch-1", "hash-1", "legacy",
+                                       legacy_signer.sign_document("hash-1"))
+        forged = generate_w3c_qr_payload("batch-2", "hash-2", "legacy",
+                                         legacy_signer.sign_document("hash-1"))
+        unknown = generate_w3c_qr_payload("batch-3", "hash-3", "nobody",
+                                          legacy_signer.sign_document("hash-3"))
+        qr_by_path = {"good.pdf": good, "forged.pdf": forged,
+                      "unknown.pdf": unknown, "blank.pdf": None}
+        
+        lookups = []
+        
+        def fetch_institution(issuer_id):
+            lookups.append(issuer_id)
+            if issuer_id == "legacy":
+                return {"name": "Legacy Issuer",
+                        "public_key_pem": legacy_signer.get_public_key_pem()}
+            return None
+        
+        with patch.object(PDFQRScanner, "extract_qr_from_page",
+                          side_effect=lambda path, page_num=0: qr_by_path[path]), \
+                patch.object(PDFQRScanner, "scan_all_pages", return_value=(None, None)), \
+                patch.object(CleanDocumentHasher, "calculate_clean_hash", return_value="h"):
+            results = scan_and_verify_batch(list(qr_by_path), fetch_institution)
+        
+        assert [r.error_code for r in results] == [
+            VerificationErrorCode.SUCCESS,
+            VerificationErrorCode.SIGNATURE_MISMATCH,
+            VerificationErrorCode.INSTITUTION_NOT_FOUND,
+            VerificationErrorCode.QR_NOT_FOUND,
+        ]
+        assert results[0].signature_valid is True
+        assert results[0].institution_name == "Legacy Issuer"
+        assert sorted(lookups) == ["legacy", "nobody"]
 
 
 # ============================================================
@@ -0,0 +1,47 @@
+-- ================================================
+-- CertiTrust Audit Checkpoints Migration
+-- ================================================
+-- Seals fixed windows of the audit hash chain with a Merkle root.
+--
+-- Design:
+-- - One row per window of AuditService.CHECKPOINT_WINDOW (1024) entries
+-- - merkle_root covers the log_hash of every entry in the window
+-- - A single entry is proven with log2(window) hashes instead of
+--   replaying the whole chain
+--
+-- Run this AFTER migrate_multitenant.sql
+
+-- ================================================
+-- AUDIT CHECKPOINTS TABLE
+-- ================================================
+CREATE TABLE IF NOT EXISTS audit_checkpoints (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    institution_id UUID REFERENCES institutions(id) ON DELETE SET NULL,
+    
+    -- Window covered by this checkpoint (inclusive chain positions)
+    window_start BIGINT NOT NULL,
+    window_end BIGINT NOT NULL,
+    entry_count INTEGER NOT NULL,
+    
+    -- Merkle root over the window's log hashes
+    merkle_root TEXT NOT NULL,
+    
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- One checkpoint per window and chain. institution_id is NULL for the
+-- global chain, and NULLs never conflict in a plain UNIQUE constraint, so
+-- the global chain gets its own partial index.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_checkpoints_window
+    ON audit_checkpoints(institution_id, window_start) WHERE institution_id IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_checkpoints_global_window
+    ON audit_checkpoints(window_start) WHERE institution_id IS NULL;
+
+-- ================================================
+-- ROW LEVEL SECURITY
+-- ================================================
+ALTER TABLE audit_checkpoints ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role full access on audit_checkpoints" 
+    ON audit_checkpoints FOR ALL 
+    USING (auth.role() = 'service_role');
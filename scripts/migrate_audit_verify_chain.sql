@@ -0,0 +1,61 @@
+-- ================================================
+-- CertiTrust Audit Chain Verification Migration
+-- ================================================
+-- Moves the audit hash-chain link check into Postgres, so
+-- AuditService.verify_chain_integrity makes one RPC call instead of
+-- paging every row to the backend.
+--
+-- Design:
+-- - Each entry's previous_log_hash must equal the log_hash of the entry
+--   before it (LAG over chain_position)
+-- - The first checked entry links to after_hash when resuming from a
+--   verified checkpoint, and is otherwise unchecked
+-- - Recomputing log_hash stays in the backend: its input is Python's
+--   canonical JSON, which jsonb::text does not reproduce
+--
+-- Run this AFTER migrate_multitenant.sql
+
+-- ================================================
+-- VERIFY AUDIT CHAIN
+-- ================================================
+CREATE OR REPLACE FUNCTION verify_audit_chain(
+    inst_id UUID DEFAULT NULL,
+    max_entries BIGINT DEFAULT NULL,
+    after_position BIGINT DEFAULT NULL,
+    after_hash TEXT DEFAULT NULL
+)
+RETURNS TABLE(is_valid BOOLEAN, broken_at BIGINT, last_position BIGINT, last_hash TEXT) AS $$
+    WITH checked AS (
+        SELECT
+            a.chain_position,
+            a.log_hash,
+            a.previous_log_hash,
+            ROW_NUMBER() OVER w AS rn,
+            LAG(a.log_hash) OVER w AS expected_previous
+        FROM audit_logs a
+        WHERE (inst_id IS NULL OR a.institution_id = inst_id)
+          AND (after_position IS NULL OR a.chain_position > after_position)
+        WINDOW w AS (ORDER BY a.chain_position)
+        ORDER BY a.chain_position
+        LIMIT max_entries
+    ),
+    broken AS (
+        SELECT MIN(chain_position) AS position
+        FROM checked
+        WHERE (rn > 1 AND previous_log_hash IS DISTINCT FROM expected_previous)
+           OR (rn = 1 AND after_hash IS NOT NULL AND previous_log_hash IS DISTINCT FROM after_hash)
+    ),
+    tip AS (
+        SELECT chain_position, log_hash
+        FROM checked
+        ORDER BY chain_position DESC
+        LIMIT 1
+    )
+    SELECT
+        broken.position IS NULL,
+        broken.position,
+        tip.chain_position,
+        tip.log_hash
+    FROM broken
+    LEFT JOIN tip ON TRUE;
+$$ LANGUAGE sql STABLE;